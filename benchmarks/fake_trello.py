@@ -0,0 +1,157 @@
+"""
+In-memory Trello REST API for benchmarks.
+
+Serves the endpoints the server uses (board, lists, cards) on a local port, so
+Trello sync can be measured without network access or rate limits. Point the
+server at it with TRELLO_API_BASE_URL=<FakeTrello.base_url>. throttle() makes it
+answer the next requests with 429, as Trello does when a rate limit is exceeded.
+"""
+
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+BOARD_ID = "5f0000000000000000000001"
+
+
+class FakeTrello:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        # Arrival time of every request, and the most requests ever handled at once
+        self.request_times = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # 429 responses still to send, their Retry-After header, and how many were sent
+        self.throttle_remaining = 0
+        self.retry_after = None
+        self.throttled = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.board = {"id": BOARD_ID, "name": "Benchmark board", "desc": "", "closed": False,
+                      "url": "", "idOrganization": None, "prefs": {}}
+        self.lists = {}
+        self.cards = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/1"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def throttle(self, count: int, retry_after=None):
+        """Answer the next count requests with 429 Too Many Requests"""
+        with self._lock:
+            self.throttle_remaining = count
+            self.retry_after = retry_after
+
+    def _begin(self):
+        """Count a request in; returns the Retry-After value (or "") if it is to be throttled"""
+        with self._lock:
+            self.request_times.append(time.monotonic())
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if not self.throttle_remaining:
+                return None
+            self.throttle_remaining -= 1
+            self.throttled += 1
+            return self.retry_after or ""
+
+    def _end(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _new_id(self) -> str:
+        return f"{next(self._ids):024x}"
+
+    def _card_json(self, card: dict) -> dict:
+        return {**card, "due": None, "dueComplete": False, "closed": False, "url": "", "shortUrl": "",
+                "pos": 1, "idMembers": [], "idLabels": [], "labels": [], "idBoard": BOARD_ID, "idShort": 1,
+                "badges": {"checkItems": 0}, "idChecklists": [], "dateLastActivity": "2024-01-01T00:00:00Z"}
+
+    def handle(self, method: str, path: str, body: dict):
+        """Return (status, JSON payload) for one API request"""
+        parts = path.strip("/").split("/")[1:]  # drop the API version
+        with self._lock:
+            self.requests += 1
+            if method == "GET" and parts == ["boards", BOARD_ID]:
+                return 200, self.board
+            if method == "GET" and parts[:3] == ["boards", BOARD_ID, "lists"]:
+                return 200, list(self.lists.values())
+            if method == "GET" and parts[:3] == ["boards", BOARD_ID, "cards"]:
+                if len(parts) == 4 and parts[3] not in ("open", "all"):
+                    card = self.cards.get(parts[3])
+                    return (200, self._card_json(card)) if card else (404, {"message": "not found"})
+                return 200, [self._card_json(card) for card in self.cards.values()]
+            if method == "GET" and parts[:1] == ["cards"] and len(parts) == 2:
+                card = self.cards.get(parts[1])
+                return (200, self._card_json(card)) if card else (404, {"message": "not found"})
+            if method == "POST" and parts == ["lists"]:
+                list_id = self._new_id()
+                self.lists[list_id] = {"id": list_id, "name": body["name"], "closed": False,
+                                       "pos": 1, "idBoard": BOARD_ID}
+                return 200, self.lists[list_id]
+            if method == "POST" and parts == ["cards"]:
+                card_id = self._new_id()
+                self.cards[card_id] = {"id": card_id, "name": body["name"], "desc": body.get("desc", ""),
+                                       "idList": body["idList"]}
+                return 200, self._card_json(self.cards[card_id])
+            if method == "PUT" and parts[:1] == ["cards"] and len(parts) in (2, 3):
+                card = self.cards.get(parts[1])
+                if card is None:
+                    return 404, {"message": "not found"}
+                if len(parts) == 3:
+                    card[parts[2]] = body["value"]
+                else:
+                    card.update({key: value for key, value in body.items() if key in ("name", "desc", "idList")})
+                return 200, self._card_json(card)
+        return 404, {"message": f"no fake for {method} {path}"}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this, delayed ACKs stall keep-alive connections
+            disable_nagle_algorithm = True
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = json.loads(raw) if raw else {}
+                retry_after = fake._begin()
+                try:
+                    if fake.latency:
+                        time.sleep(fake.latency)
+                    if retry_after is None:
+                        status, payload = fake.handle(self.command, urlsplit(self.path).path, body)
+                    else:
+                        status, payload = 429, {"message": "API token limit exceeded"}
+                finally:
+                    fake._end()
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                if retry_after:
+                    self.send_header("Retry-After", retry_after)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
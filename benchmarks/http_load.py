@@ -0,0 +1,188 @@
+"""
+Load-test the HTTP transport with many concurrent client sessions on one server process.
+
+Usage: python benchmarks/http_load.py [--clients N] [--rounds N] [--transport streamable|sse]
+                                      [--storage MODE] [--max-connections N] [--agent-ids]
+
+Starts the server with TASK_TRANSPORT=http in a fresh working directory and opens --clients
+MCP sessions at once. Each session runs --rounds rounds of create_task, write_comment,
+assign_task, get_status and list_tasks, then switches its own role to coder, completes the
+task and returns to orchestrator, while the other sessions keep their roles. With
+--agent-ids each client names itself with _meta.agent_id instead of relying on its session.
+Latencies per tool are printed as JSON. Afterwards the server is stopped and the saved store
+is loaded again: every created task must be there, commented and completed by the coder,
+otherwise the script exits non-zero with the lost updates.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, "..", "src"))
+SERVER_FILE = os.path.join(BENCHMARKS_DIR, "..", "src", "task_orchectrator_mcp", "server.py")
+
+from suite import summarize  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"Server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    sys.exit(f"Server did not listen on port {port} within {timeout}s")
+
+
+def open_session(url: str, transport: str):
+    from mcp.client.sse import sse_client
+    from mcp.client.streamable_http import streamablehttp_client
+
+    if transport == "sse":
+        return sse_client(f"{url}/sse")
+    return streamablehttp_client(f"{url}/mcp")
+
+
+async def call_tool(session, latencies: dict, name: str, meta=None, **arguments) -> str:
+    started = time.perf_counter()
+    result = await session.call_tool(name, arguments, meta=meta)
+    latencies.setdefault(name, []).append(time.perf_counter() - started)
+    text = result.content[0].text
+    if result.isError or text.startswith("❌"):
+        raise RuntimeError(f"{name} failed: {text}")
+    return text
+
+
+async def run_client(number: int, url: str, args, ready: list, start: asyncio.Event, latencies: dict):
+    from mcp import ClientSession
+
+    created = []
+    meta = {"agent_id": f"load-agent-{number}"} if args.agent_ids else None
+    async with open_session(url, args.transport) as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+            # Start the measured calls once every session is connected
+            ready.append(number)
+            if len(ready) == args.clients:
+                start.set()
+            await start.wait()
+            for round_number in range(args.rounds):
+                text = await call_tool(session, latencies, "create_task", meta,
+                                       title=f"Client {number} task {round_number}",
+                                       description="Created by the HTTP load test", create_trello_card=False)
+                task_id = re.search(r"TASK-\d+", text).group(0)
+                # Nobody else touches this task, so it must still be at the version it was created with
+                await call_tool(session, latencies, "write_comment", meta, task_id=task_id,
+                                comment=f"Comment from client {number}", expected_version=1)
+                await call_tool(session, latencies, "assign_task", meta, task_id=task_id, role="coder")
+                await call_tool(session, latencies, "get_status", meta)
+                await call_tool(session, latencies, "list_tasks", meta, limit=20)
+                # Only this session's role changes; the other clients keep creating and assigning
+                await call_tool(session, latencies, "switch_role", meta, role="coder")
+                await call_tool(session, latencies, "complete_task", meta, task_id=task_id, completion_notes="Done")
+                await call_tool(session, latencies, "return_to_orchestrator", meta)
+                created.append(task_id)
+    return created
+
+
+async def run_clients(url: str, args) -> tuple:
+    ready, start, latencies = [], asyncio.Event(), {}
+    clients = asyncio.gather(*(run_client(number, url, args, ready, start, latencies)
+                               for number in range(args.clients)))
+    # A client that fails before connecting ends the run instead of leaving the others waiting
+    await asyncio.wait([clients, asyncio.ensure_future(start.wait())], return_when=asyncio.FIRST_COMPLETED)
+    started = time.perf_counter()
+    created = await clients
+    return [task_id for ids in created for task_id in ids], latencies, time.perf_counter() - started
+
+
+def lost_updates(work_dir: str, storage: str, created: list) -> list:
+    """Load the store the server left behind and list every change that is missing from it"""
+    os.chdir(work_dir)
+    os.environ["TASK_STORAGE_MODE"] = storage
+    from task_orchectrator_mcp import server
+
+    server.load_tasks_locally()
+    problems = []
+    if len(set(created)) != len(created):
+        problems.append(f"{len(created) - len(set(created))} task ids were handed out twice")
+    for task_id in created:
+        task = server.tasks.get(task_id)
+        if task is None:
+            problems.append(f"{task_id} is missing")
+        elif task.status != server.TaskStatus.DONE or task.assigned_role != server.RoleType.CODER:
+            problems.append(f"{task_id} is {task.status.value} for {task.assigned_role}, not DONE for coder")
+        elif [comment["role"] for comment in task.comments] != ["orchestrator", "coder"]:
+            problems.append(f"{task_id} has comments from {[comment['role'] for comment in task.comments]}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--transport", default="streamable", choices=["streamable", "sse"])
+    parser.add_argument("--storage", default="journal", choices=["json", "journal", "sqlite", "snapshot", "shared"])
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--agent-ids", action="store_true", help="identify clients by _meta.agent_id")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="orchestrator-http-load-")
+    port = free_port()
+    env = {
+        **os.environ,
+        "TASK_TRANSPORT": "http",
+        "TASK_HTTP_PORT": str(port),
+        "TASK_HTTP_MAX_CONNECTIONS": str(args.max_connections),
+        "TASK_STORAGE_MODE": args.storage,
+        "TASK_LOG_LEVEL": "WARNING",
+    }
+    for name in ("TRELLO_API_KEY", "TRELLO_TOKEN"):
+        env.pop(name, None)
+    process = subprocess.Popen([sys.executable, SERVER_FILE], cwd=work_dir, env=env)
+    try:
+        wait_for_port(port, process)
+        created, latencies, seconds = asyncio.run(run_clients(f"http://127.0.0.1:{port}", args))
+    finally:
+        # SIGINT lets the server drain its storage queue before exiting
+        process.send_signal(signal.SIGINT)
+        process.wait(timeout=30)
+
+    calls = sum(len(values) for values in latencies.values())
+    print(json.dumps({
+        "clients": args.clients,
+        "transport": args.transport,
+        "storage": args.storage,
+        "calls": calls,
+        "seconds": round(seconds, 3),
+        "calls_per_s": round(calls / seconds, 1),
+        "tools": {name: summarize(values) for name, values in sorted(latencies.items())},
+    }, indent=2))
+
+    problems = lost_updates(work_dir, args.storage, created)
+    if problems:
+        sys.exit(f"{len(problems)} lost updates:\n  " + "\n  ".join(problems[:20]))
+    print(f"All {len(created)} tasks were saved with their comments and completions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
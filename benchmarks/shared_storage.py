@@ -0,0 +1,176 @@
+"""
+Stress-test shared storage mode with several server processes in one working directory.
+
+Usage: python benchmarks/shared_storage.py [--processes N] [--rounds N] [--compact-threshold N]
+                                           [--segment-bytes N]
+
+Starts --processes stdio servers with TASK_STORAGE_MODE=shared in a fresh working directory,
+each driven by its own MCP client, the way several MCP clients share a project directory.
+One client first creates a hot task. Then every client runs --rounds rounds of create_task,
+write_comment on its own task and on the hot task, assign_task, list_tasks, switch_role to
+coder, complete_task and return_to_orchestrator. Calls rejected with a version conflict are
+retried, as a client would. A low --compact-threshold and --segment-bytes make the processes
+compact the journal and close transition segments under each other.
+
+Latencies and conflict counts are printed as JSON. Afterwards the store is loaded again:
+every task must be there once, commented and completed, the hot task must hold every
+client's comments and the transition log every transition, otherwise the script exits
+non-zero with the lost updates.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, "..", "src"))
+SERVER_FILE = os.path.join(BENCHMARKS_DIR, "..", "src", "task_orchectrator_mcp", "server.py")
+
+from suite import summarize  # noqa: E402
+
+# Transitions recorded per round: assign_task, switch_role, complete_task, return_to_orchestrator
+TRANSITIONS_PER_ROUND = 4
+MAX_ATTEMPTS = 50
+
+
+async def call_tool(session, stats: dict, name: str, **arguments) -> str:
+    """Call a tool, retrying while another process keeps winning the compare-and-swap"""
+    for _ in range(MAX_ATTEMPTS):
+        started = time.perf_counter()
+        result = await session.call_tool(name, arguments)
+        stats["latencies"].setdefault(name, []).append(time.perf_counter() - started)
+        text = result.content[0].text
+        if text.startswith("❌ Conflict"):
+            stats["conflicts"][name] = stats["conflicts"].get(name, 0) + 1
+            continue
+        if result.isError or text.startswith("❌"):
+            raise RuntimeError(f"{name} failed: {text}")
+        return text
+    raise RuntimeError(f"{name} still conflicted after {MAX_ATTEMPTS} attempts")
+
+
+async def run_client(number: int, work_dir: str, env: dict, args, shared: dict, stats: dict):
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    parameters = StdioServerParameters(command=sys.executable, args=[SERVER_FILE], env=env, cwd=work_dir)
+    created = []
+    with open(os.path.join(work_dir, f"server-{number}.log"), "w") as errlog:
+        async with stdio_client(parameters, errlog=errlog) as streams:
+            async with ClientSession(streams[0], streams[1]) as session:
+                await session.initialize()
+                if number == 0:
+                    text = await call_tool(session, stats, "create_task", title="Hot task",
+                                           description="Commented on by every process", create_trello_card=False)
+                    shared["hot_task"] = re.search(r"TASK-\d+", text).group(0)
+                # Start the measured calls once every server is up and the hot task exists
+                shared["ready"].append(number)
+                if len(shared["ready"]) == args.processes:
+                    shared["start"].set()
+                await shared["start"].wait()
+                for round_number in range(args.rounds):
+                    text = await call_tool(session, stats, "create_task",
+                                           title=f"Process {number} task {round_number}",
+                                           description="Created by the shared storage stress test",
+                                           create_trello_card=False)
+                    task_id = re.search(r"TASK-\d+", text).group(0)
+                    await call_tool(session, stats, "write_comment", task_id=task_id,
+                                    comment=f"Comment from process {number}", expected_version=1)
+                    await call_tool(session, stats, "write_comment", task_id=shared["hot_task"],
+                                    comment=f"Process {number} round {round_number}")
+                    await call_tool(session, stats, "assign_task", task_id=task_id, role="coder")
+                    await call_tool(session, stats, "list_tasks", limit=20)
+                    await call_tool(session, stats, "switch_role", role="coder")
+                    await call_tool(session, stats, "complete_task", task_id=task_id, completion_notes="Done")
+                    await call_tool(session, stats, "return_to_orchestrator")
+                    created.append(task_id)
+    return created
+
+
+async def run_clients(work_dir: str, env: dict, args) -> tuple:
+    shared = {"ready": [], "start": asyncio.Event()}
+    stats = {"latencies": {}, "conflicts": {}}
+    clients = asyncio.gather(*(run_client(number, work_dir, env, args, shared, stats)
+                               for number in range(args.processes)))
+    # A server that fails before connecting ends the run instead of leaving the others waiting
+    await asyncio.wait([clients, asyncio.ensure_future(shared["start"].wait())],
+                       return_when=asyncio.FIRST_COMPLETED)
+    started = time.perf_counter()
+    created = await clients
+    return [task_id for ids in created for task_id in ids], shared.get("hot_task"), stats, time.perf_counter() - started
+
+
+def lost_updates(work_dir: str, args, created: list, hot_task: str) -> list:
+    """Load the store the servers left behind and list every change that is missing from it"""
+    os.chdir(work_dir)
+    os.environ["TASK_STORAGE_MODE"] = "shared"
+    from task_orchectrator_mcp import server
+
+    server.load_tasks_locally()
+    server.load_transitions_locally()
+    problems = []
+    if len(set(created)) != len(created):
+        problems.append(f"{len(created) - len(set(created))} task ids were handed out twice")
+    for task_id in created:
+        task = server.tasks.get(task_id)
+        if task is None:
+            problems.append(f"{task_id} is missing")
+        elif task.status != server.TaskStatus.DONE or task.assigned_role != server.RoleType.CODER:
+            problems.append(f"{task_id} is {task.status.value} for {task.assigned_role}, not DONE for coder")
+        elif [comment["role"] for comment in task.comments] != ["orchestrator", "coder"]:
+            problems.append(f"{task_id} has comments from {[comment['role'] for comment in task.comments]}")
+    hot_comments = len(server.tasks[hot_task].comments) if hot_task in server.tasks else 0
+    if hot_comments != args.processes * args.rounds:
+        problems.append(f"{hot_task} has {hot_comments} comments, expected {args.processes * args.rounds}")
+    expected_transitions = args.processes * args.rounds * TRANSITIONS_PER_ROUND
+    if len(server.transitions) != expected_transitions:
+        problems.append(f"the transition log has {len(server.transitions)} entries, expected {expected_transitions}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=25)
+    parser.add_argument("--compact-threshold", type=int, default=100)
+    parser.add_argument("--segment-bytes", type=int, default=16384)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="orchestrator-shared-")
+    env = {
+        **os.environ,
+        "TASK_STORAGE_MODE": "shared",
+        "TASK_JOURNAL_COMPACT_THRESHOLD": str(args.compact_threshold),
+        "TASK_TRANSITION_SEGMENT_BYTES": str(args.segment_bytes),
+        "TASK_LOG_LEVEL": "WARNING",
+    }
+    for name in ("TRELLO_API_KEY", "TRELLO_TOKEN"):
+        env.pop(name, None)
+    created, hot_task, stats, seconds = asyncio.run(run_clients(work_dir, env, args))
+
+    calls = sum(len(values) for values in stats["latencies"].values())
+    print(json.dumps({
+        "processes": args.processes,
+        "rounds": args.rounds,
+        "calls": calls,
+        "conflicts": stats["conflicts"],
+        "seconds": round(seconds, 3),
+        "calls_per_s": round(calls / seconds, 1),
+        "tools": {name: summarize(values) for name, values in sorted(stats["latencies"].items())},
+    }, indent=2))
+
+    problems = lost_updates(work_dir, args, created, hot_task)
+    if problems:
+        sys.exit(f"{len(problems)} lost updates (server logs in {work_dir}):\n  " + "\n  ".join(problems[:20]))
+    print(f"All {len(created)} tasks, {args.processes * args.rounds} hot task comments and "
+          f"{len(created) * TRANSITIONS_PER_ROUND} transitions were saved", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
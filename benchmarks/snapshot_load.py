@@ -0,0 +1,107 @@
+"""
+Compare cold-start task loading from the JSON backup with the compact msgpack snapshot.
+
+Usage: python benchmarks/snapshot_load.py [task counts...]
+Needs the msgpack package (pip install "task-orchectrator-mcp[snapshot]").
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from task_orchectrator_mcp import server  # noqa: E402
+
+
+def make_tasks(count: int) -> dict:
+    now = datetime.now()
+    made = {}
+    for number in range(1, count + 1):
+        task_id = f"TASK-{number:03d}"
+        made[task_id] = server.Task(
+            id=task_id,
+            title=f"Task {number}",
+            description=f"Benchmark task number {number} with a description of typical length",
+            status=list(server.TaskStatus)[number % len(server.TaskStatus)],
+            assigned_role=list(server.RoleType)[number % len(server.RoleType)] if number % 3 else None,
+            created_by=server.RoleType.ORCHESTRATOR,
+            created_at=now,
+            updated_at=now,
+            dependencies=[f"TASK-{number // 2:03d}"] if number > 1 else [],
+            git_branch=None,
+            comments=[{"role": "coder", "comment": "Progress note", "timestamp": now.isoformat()}],
+            subtasks=[],
+        )
+    return made
+
+
+def timed(load) -> float:
+    gc.collect()
+    started = time.perf_counter()
+    load()
+    return time.perf_counter() - started
+
+
+def load_json():
+    repository = server.TaskRepository()
+    loaded = server.JsonTaskStorage().load_tasks()
+    gc.disable()
+    try:
+        repository.update(loaded)
+    finally:
+        gc.enable()
+    return max(server.task_number(task_id) for task_id in repository)
+
+
+def load_snapshot():
+    repository = server.TaskRepository()
+    gc.disable()
+    try:
+        snapshot = server.read_task_snapshot(server.TASKS_SNAPSHOT_FILE)
+        repository.load_snapshot(snapshot)
+    finally:
+        gc.enable()
+    return snapshot.task_counter
+
+
+def load_snapshot_and_build_all():
+    repository = server.TaskRepository()
+    gc.disable()
+    try:
+        repository.load_snapshot(server.read_task_snapshot(server.TASKS_SNAPSHOT_FILE))
+        list(repository.values())
+    finally:
+        gc.enable()
+
+
+def main():
+    if not server.MSGPACK_AVAILABLE:
+        sys.exit("msgpack is not installed")
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+
+    os.chdir(tempfile.mkdtemp(prefix="snapshot-bench-"))
+    print(f"{'tasks':>8} {'json MB':>8} {'snap MB':>8} {'json s':>8} {'snap s':>8} {'snap+build s':>12} {'speedup':>8}")
+    for count in counts:
+        records = {task_id: server.serialize_task(task) for task_id, task in make_tasks(count).items()}
+        server.JsonTaskStorage().write_records(records)
+        server.SnapshotTaskStorage().write_records(records)
+        del records
+
+        json_seconds = timed(load_json)
+        snapshot_seconds = timed(load_snapshot)
+        build_seconds = timed(load_snapshot_and_build_all)
+        print(
+            f"{count:>8} "
+            f"{os.path.getsize(server.TASKS_FILE) / 1e6:>8.1f} "
+            f"{os.path.getsize(server.TASKS_SNAPSHOT_FILE) / 1e6:>8.1f} "
+            f"{json_seconds:>8.3f} {snapshot_seconds:>8.3f} {build_seconds:>12.3f} "
+            f"{json_seconds / snapshot_seconds:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Measure how long the server takes to import and to answer the MCP initialize request.
+
+Usage: python benchmarks/startup.py [--runs N] [--trello-delay SECONDS] [--max-import-ms MS] [--max-handshake-ms MS]
+
+Each run starts a fresh interpreter. The handshake runs are made with Trello credentials
+pointing at a local stub that answers after --trello-delay seconds, so a Trello
+initialization that blocks startup shows up as a slow handshake. With --max-* limits
+the script exits non-zero when the median is over budget, to catch regressions.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "task_orchectrator_mcp")
+SRC_DIR = os.path.dirname(SERVER_DIR)
+
+IMPORT_PROBE = """
+import sys, time
+started = time.perf_counter()
+import task_orchectrator_mcp.server
+elapsed = time.perf_counter() - started
+print(elapsed, "trello" in sys.modules)
+"""
+
+
+class SlowTrelloHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = json.dumps({"id": "bench-board", "name": "Benchmark board", "closed": False,
+                           "url": "", "desc": "", "descData": None, "idOrganization": None})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def measure_import() -> tuple:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        env={**os.environ, "PYTHONPATH": SRC_DIR},
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return float(output[0]), output[1] == "True"
+
+
+def measure_handshake(env: dict, work_dir: str) -> float:
+    initialize = {
+        "jsonrpc": "2.0", "id": 1, "method": "initialize",
+        "params": {"protocolVersion": "2024-11-05", "capabilities": {},
+                   "clientInfo": {"name": "startup-benchmark", "version": "0"}},
+    }
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(SERVER_DIR, "server.py")],
+        cwd=work_dir, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        process.stdin.write(json.dumps(initialize) + "\n")
+        process.stdin.flush()
+        response = json.loads(process.stdout.readline())
+        elapsed = time.perf_counter() - started
+        if "result" not in response:
+            raise RuntimeError(f"initialize failed: {response}")
+        return elapsed
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--trello-delay", type=float, default=2.0)
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-handshake-ms", type=float)
+    args = parser.parse_args()
+
+    SlowTrelloHandler.delay = args.trello_delay
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), SlowTrelloHandler)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    env = {
+        **os.environ,
+        "TRELLO_API_KEY": "bench-key",
+        "TRELLO_TOKEN": "bench-token",
+        "TRELLO_WORKING_BOARD_ID": "bench-board",
+        "TRELLO_API_BASE_URL": f"http://127.0.0.1:{stub.server_port}/1",
+        "TASK_LOG_LEVEL": "WARNING",
+    }
+
+    imports = [measure_import() for _ in range(args.runs)]
+    import_ms = statistics.median(seconds for seconds, _ in imports) * 1000
+    trello_imported = any(loaded for _, loaded in imports)
+    with tempfile.TemporaryDirectory(prefix="startup-bench-") as work_dir:
+        handshake_ms = statistics.median(measure_handshake(env, work_dir) for _ in range(args.runs)) * 1000
+    stub.shutdown()
+
+    print(f"import:     {import_ms:8.1f} ms (median of {args.runs}), py-trello imported: {trello_imported}")
+    print(f"handshake:  {handshake_ms:8.1f} ms (median of {args.runs}), Trello stub delay {args.trello_delay:.1f} s")
+
+    over_budget = []
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        over_budget.append(f"import {import_ms:.1f} ms > {args.max_import_ms} ms")
+    if args.max_handshake_ms is not None and handshake_ms > args.max_handshake_ms:
+        over_budget.append(f"handshake {handshake_ms:.1f} ms > {args.max_handshake_ms} ms")
+    if trello_imported:
+        over_budget.append("py-trello is imported with the server module")
+    if over_budget:
+        sys.exit("Startup regression: " + "; ".join(over_budget))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Benchmark the orchestrator's core operations at several task counts.
+
+Usage: python benchmarks/suite.py [--sizes 100 1000 10000 100000] [--storage MODE] [--ops N]
+                                  [--queries N] [--max-sync-tasks N] [--output FILE]
+                                  [--baseline FILE] [--tolerance FRACTION]
+
+Each task count runs in a fresh interpreter and working directory. The store is seeded
+with that many tasks, then the benchmark measures:
+  - cold start: load_tasks_locally and load_transitions_locally
+  - create_task, assign_task, write_comment and complete_task, --ops calls each
+  - list_tasks (first page, and filtered by status) and get_status, --queries calls each
+  - search_tasks: building the search index on the first query, then --queries searches
+    each for selective words, with status and role filters, for a word every task uses,
+    and matching any word
+  - sync_to_trello against a local fake Trello server, once creating every card and once
+    with nothing to change (only up to --max-sync-tasks tasks)
+Tools are called through handle_call_tool in-process. Results are printed (or written to
+--output) as JSON. With --baseline, per-operation p50 latencies are compared with an
+earlier result file and the script exits non-zero when any is slower than the tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, "..", "src"))
+
+
+def summarize(latencies: list) -> dict:
+    """Throughput and latency percentiles of one measured operation"""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+
+    def percentile(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {
+        "ops": len(ordered),
+        "seconds": round(total, 4),
+        "ops_per_s": round(len(ordered) / total, 1) if total else None,
+        "p50_ms": percentile(0.5),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def make_tasks(server, count: int) -> dict:
+    """Seed tasks: 60% TODO and ready, the rest in progress, in review or done; every 10th depends on its predecessor"""
+    now = datetime.now()
+    cycle = [server.TaskStatus.TODO] * 6 + [server.TaskStatus.IN_PROGRESS, server.TaskStatus.REVIEW,
+                                            server.TaskStatus.DONE, server.TaskStatus.DONE]
+    roles = [server.RoleType.CODER, server.RoleType.ARCHITECT, server.RoleType.ANALYST, server.RoleType.DEVOPS]
+    made = {}
+    for number in range(1, count + 1):
+        status = cycle[number % len(cycle)]
+        task_id = f"TASK-{number:03d}"
+        made[task_id] = server.Task(
+            id=task_id,
+            title=f"Benchmark task {number}",
+            description=f"Seeded task number {number} with a description of typical length for planning work",
+            status=status,
+            assigned_role=None if status == server.TaskStatus.TODO else roles[number % len(roles)],
+            created_by=server.RoleType.ORCHESTRATOR,
+            created_at=now,
+            updated_at=now,
+            dependencies=[f"TASK-{number - 1:03d}"] if number % 10 == 0 else [],
+            git_branch=None,
+            comments=[{"role": "orchestrator", "comment": "Seeded", "timestamp": now.isoformat()}],
+            subtasks=[],
+        )
+    return made
+
+
+class NullSession:
+    """Stands in for the client session; notifications go nowhere"""
+
+    async def send_resource_list_changed(self):
+        pass
+
+    async def send_resource_updated(self, uri):
+        pass
+
+    async def send_progress_notification(self, *args, **kwargs):
+        pass
+
+
+async def call_tool(server, name: str, **arguments) -> float:
+    started = time.perf_counter()
+    result = await server.handle_call_tool(name, arguments)
+    elapsed = time.perf_counter() - started
+    if result[0].text.startswith("❌"):
+        raise RuntimeError(f"{name} failed: {result[0].text}")
+    return elapsed
+
+
+async def run_size(count: int, ops: int, queries: int, max_sync_tasks: int, fake_trello) -> dict:
+    from mcp.server.lowlevel.server import request_ctx
+    from mcp.shared.context import RequestContext
+
+    from task_orchectrator_mcp import server
+
+    # sync_to_trello reads the request metadata, so run every call inside a request context
+    request_ctx.set(RequestContext(request_id=1, meta=None, session=NullSession(), lifespan_context=None))
+    results = {"tasks": count, "storage": server.storage.mode.value}
+
+    server.storage.save_changed_tasks(list(make_tasks(server, count).values()))
+    started = time.perf_counter()
+    server.load_tasks_locally()
+    server.load_transitions_locally()
+    results["cold_start"] = {"seconds": round(time.perf_counter() - started, 4), "tasks": len(server.tasks)}
+
+    ops = min(ops, count)
+    results["create_task"] = summarize([
+        await call_tool(server, "create_task", title=f"New task {number}", description="Created by the benchmark",
+                        create_trello_card=False)
+        for number in range(ops)
+    ])
+
+    ready_ids = [task.id for task in server.tasks.ready_tasks()][:ops]
+    results["assign_task"] = summarize([
+        await call_tool(server, "assign_task", task_id=task_id, role="coder") for task_id in ready_ids
+    ])
+    results["write_comment"] = summarize([
+        await call_tool(server, "write_comment", task_id=task_id, comment="Benchmark comment") for task_id in ready_ids
+    ])
+    await call_tool(server, "switch_role", role="coder")
+    results["complete_task"] = summarize([
+        await call_tool(server, "complete_task", task_id=task_id, completion_notes="Done") for task_id in ready_ids
+    ])
+    await call_tool(server, "return_to_orchestrator")
+
+    results["list_tasks"] = summarize([await call_tool(server, "list_tasks") for _ in range(queries)])
+    results["list_tasks_by_status"] = summarize([
+        await call_tool(server, "list_tasks", status="IN_PROGRESS") for _ in range(queries)
+    ])
+    results["get_status"] = summarize([await call_tool(server, "get_status") for _ in range(queries)])
+
+    started = time.perf_counter()
+    await call_tool(server, "search_tasks", query="benchmark")
+    results["search_index_build"] = {"seconds": round(time.perf_counter() - started, 4)}
+    results["search_tasks"] = summarize([
+        await call_tool(server, "search_tasks", query=f"task {number + 1}") for number in range(queries)
+    ])
+    results["search_tasks_filtered"] = summarize([
+        await call_tool(server, "search_tasks", query="seeded planning", status="IN_PROGRESS", role="coder")
+        for _ in range(queries)
+    ])
+    # "planning" is in every description, so these rank the whole store
+    results["search_tasks_common_word"] = summarize([
+        await call_tool(server, "search_tasks", query="planning") for _ in range(queries)
+    ])
+    results["search_tasks_any_word"] = summarize([
+        await call_tool(server, "search_tasks", query=f"task {number + 1}", match="any") for number in range(queries)
+    ])
+
+    if fake_trello and count <= max_sync_tasks:
+        await server.trello_executor.run(server.init_trello_client)
+        if server.trello_mode != server.TrelloMode.DIRECT_API:
+            raise RuntimeError("Could not connect to the fake Trello server")
+        requests_before = fake_trello.requests
+        results["sync_to_trello"] = {
+            **summarize([await call_tool(server, "sync_to_trello")]),
+            "requests": fake_trello.requests - requests_before,
+        }
+        requests_before = fake_trello.requests
+        results["sync_to_trello_unchanged"] = {
+            **summarize([await call_tool(server, "sync_to_trello")]),
+            "requests": fake_trello.requests - requests_before,
+        }
+
+    server.storage_executor.shutdown()
+    server.trello_executor.shutdown()
+    return results
+
+
+def run_child(args):
+    """Run one task count; called in a fresh interpreter by main"""
+    from fake_trello import BOARD_ID, FakeTrello
+
+    os.chdir(tempfile.mkdtemp(prefix="orchestrator-bench-"))
+    fake_trello = None
+    if args.run_size <= args.max_sync_tasks:
+        fake_trello = FakeTrello().start()
+        # Read when the server module is imported
+        os.environ.update({
+            "TRELLO_API_KEY": "bench-key",
+            "TRELLO_TOKEN": "bench-token",
+            "TRELLO_WORKING_BOARD_ID": BOARD_ID,
+            "TRELLO_API_BASE_URL": fake_trello.base_url,
+            "TRELLO_RATE_LIMIT_PER_KEY": "1000000",
+            "TRELLO_RATE_LIMIT_PER_TOKEN": "1000000",
+        })
+    os.environ["TASK_STORAGE_MODE"] = args.storage
+
+    try:
+        results = asyncio.run(run_size(args.run_size, args.ops, args.queries, args.max_sync_tasks, fake_trello))
+    finally:
+        if fake_trello:
+            fake_trello.stop()
+    print(json.dumps(results))
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    """Operations whose p50 latency is more than tolerance slower than in the baseline file"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {entry["tasks"]: entry for entry in json.load(f)["results"]}
+
+    regressions = []
+    for entry in results:
+        before = baseline.get(entry["tasks"], {})
+        for operation, measured in entry.items():
+            previous = before.get(operation)
+            if not isinstance(measured, dict) or not isinstance(previous, dict) or "p50_ms" not in measured:
+                continue
+            if previous.get("p50_ms") and measured["p50_ms"] > previous["p50_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{operation} at {entry['tasks']} tasks: p50 {measured['p50_ms']}ms vs {previous['p50_ms']}ms"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--storage", default="journal", choices=["json", "journal", "sqlite", "snapshot", "shared"])
+    parser.add_argument("--ops", type=int, default=1000, help="calls of each mutating tool")
+    parser.add_argument("--queries", type=int, default=100, help="calls of each read-only tool")
+    parser.add_argument("--max-sync-tasks", type=int, default=10000, help="largest store to run sync_to_trello on")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier --output file to compare p50 latencies with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown against the baseline")
+    parser.add_argument("--run-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size is not None:
+        run_child(args)
+        return
+
+    results = []
+    for count in args.sizes:
+        print(f"Running {count} tasks...", file=sys.stderr)
+        child = subprocess.run(
+            [sys.executable, __file__, "--run-size", str(count), "--storage", args.storage, "--ops", str(args.ops),
+             "--queries", str(args.queries), "--max-sync-tasks", str(args.max_sync_tasks)],
+            env={**os.environ, "TASK_LOG_LEVEL": "WARNING"},
+            capture_output=True, text=True,
+        )
+        if child.returncode != 0:
+            sys.exit(f"Benchmark at {count} tasks failed:\n{child.stderr}")
+        results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "storage": args.storage,
+            "ops": args.ops,
+            "queries": args.queries,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            sys.exit("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,177 @@
 import asyncio
+import atexit
+import bisect
+import contextvars
+import gc
+import base64
+import copy
+from collections import Counter, deque
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Set
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from enum import Enum
+import hashlib
+import heapq
+import importlib.util
 import os
 import json
+import math
+import mmap
+import random
+import re
+import struct
 import sys
+import threading
+import time
+import weakref
 import logging
+import logging.handlers
+import queue
 
-# Configure logging for MCP server debugging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stderr),  # Log to stderr for MCP compatibility
-    ]
-)
+# Logging is configured by configure_logging when the server starts, not on import
 logger = logging.getLogger('task-orchectrator-mcp')
 
-# Log startup information
-logger.info("Task Orchestrator MCP Server starting...")
-logger.info(f"Python version: {sys.version}")
-logger.info(f"Working directory: {os.getcwd()}")
-logger.info(f"Environment variables: TRELLO_API_KEY={'SET' if os.getenv('TRELLO_API_KEY') else 'NOT SET'}, TRELLO_TOKEN={'SET' if os.getenv('TRELLO_TOKEN') else 'NOT SET'}")
+# "json" writes one JSON object per record, "text" the classic one-line format
+LOG_FORMAT = os.getenv('TASK_LOG_FORMAT', 'json').lower()
+# Records waiting for the writer thread; further records are dropped rather than blocking callers
+LOG_QUEUE_SIZE = int(os.getenv('TASK_LOG_QUEUE_SIZE', '10000'))
+
+# Fields (tool name, task id) added to every record logged while a tool call runs
+log_context: contextvars.ContextVar[dict] = contextvars.ContextVar("log_context", default={})
+
+# Attributes every LogRecord has; anything else on a record was passed in extra= or by LogContextFilter
+LOG_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class LogContextFilter(logging.Filter):
+    """Copy the current tool call's log_context onto records, in the thread that logged them"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per record with time, level, logger, message and any extra fields"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in LOG_RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hand records to the writer thread without blocking the caller.
+    
+    The caller renders the message and any traceback, since the arguments may change
+    before the writer thread gets to them; the writer thread adds the timestamp, level
+    and fields. When the queue is full the record is dropped.
+    """
+    
+    def __init__(self, record_queue: queue.Queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Like QueueHandler.prepare, but the message keeps its own field instead of the formatted line
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def parse_log_levels(value: str) -> Dict[str, str]:
+    """Parse TASK_LOG_LEVELS, e.g. "mcp=WARNING,task-orchectrator-mcp=DEBUG", into levels by logger name"""
+    levels = {}
+    for item in value.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+log_handler: Optional[NonBlockingQueueHandler] = None
+log_listener: Optional[logging.handlers.QueueListener] = None
+
+def configure_logging():
+    """
+    Log to stderr (stdout carries the MCP stdio transport) through a background writer thread.
+    
+    TASK_LOG_LEVEL sets the root level (default INFO) and TASK_LOG_LEVELS overrides it per logger.
+    """
+    global log_handler, log_listener
+    if log_listener:
+        return
+    
+    stream_handler = logging.StreamHandler(sys.stderr)  # Log to stderr for MCP compatibility
+    if LOG_FORMAT == "text":
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    else:
+        stream_handler.setFormatter(JsonLogFormatter())
+    
+    log_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    log_handler.addFilter(LogContextFilter())
+    root = logging.getLogger()
+    root.addHandler(log_handler)
+    
+    levels = {"": os.getenv('TASK_LOG_LEVEL', 'INFO').upper(), **parse_log_levels(os.getenv('TASK_LOG_LEVELS', ''))}
+    for name, level in levels.items():
+        try:
+            logging.getLogger(name or None).setLevel(level)
+        except ValueError:
+            logger.warning("Unknown log level %s for logger %s", level, name or "root")
+    
+    log_listener = logging.handlers.QueueListener(log_handler.queue, stream_handler)
+    log_listener.start()
+    # Write out whatever is still queued when the process exits
+    atexit.register(log_listener.stop)
 
 try:
     from mcp.server.models import InitializationOptions
     import mcp.types as types
     from mcp.server import NotificationOptions, Server
-    from pydantic import AnyUrl, BaseModel
+    from pydantic import AnyUrl, BaseModel, PrivateAttr
     import mcp.server.stdio
-    logger.info("MCP imports successful")
+    import anyio
 except Exception as e:
-    logger.error(f"Failed to import MCP modules: {e}")
+    logger.error("Failed to import MCP modules: %s", e)
     raise
 
-# Trello integration
+# Trello integration; py-trello (and requests) is only imported once a client is created
+TRELLO_AVAILABLE = importlib.util.find_spec("trello") is not None
+
+# Compact binary snapshots (TASK_STORAGE_MODE=snapshot) need the optional msgpack package
 try:
-    from trello import TrelloClient
-    TRELLO_AVAILABLE = True
-    logger.info("Trello library imported successfully")
-except ImportError as e:
-    TRELLO_AVAILABLE = False
-    logger.warning(f"Trello library not available: {e}")
-except Exception as e:
-    TRELLO_AVAILABLE = False
-    logger.error(f"Unexpected error importing Trello: {e}")
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# Shared storage (TASK_STORAGE_MODE=shared) locks with flock on POSIX and msvcrt.locking on Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
 
 class TaskStatus(str, Enum):
     TODO = "TODO"
@@ -74,9 +201,17 @@ class RoleType(str, Enum):
 
 class TrelloMode(str, Enum):
     NONE = "none"
+    CONNECTING = "connecting"  # Credentials are set and the client is being initialized in the background
     DIRECT_API = "direct_api"
     MCP = "mcp"
 
+class StorageMode(str, Enum):
+    JSON = "json"
+    JOURNAL = "journal"
+    SQLITE = "sqlite"
+    SNAPSHOT = "snapshot"
+    SHARED = "shared"
+
 class RolePermissions(BaseModel):
     """Define permissions for each role"""
     role: RoleType
@@ -175,7 +310,14 @@ class Task(BaseModel):
     git_branch: Optional[str]
     comments: List[Dict[str, str]]
     subtasks: List[str]
+    priority: int = 0  # Higher runs first under the scheduler's priority policy
     trello_card_id: Optional[str] = None  # Link to Trello card
+    trello_synced_hash: Optional[str] = None  # Card content hash at the last successful push
+    trello_synced_at: Optional[datetime] = None  # updated_at of the task at the last successful push
+    version: int = 0  # Incremented by every change; writers compare it before saving
+    sync_revision: int = 0  # Incremented by every save of the Trello fields alone, which leaves version as it is
+    # Stored revision (see task_revision) that this object's unsaved changes build on; None until it is changed
+    _base_revision: Optional[Tuple[int, int]] = PrivateAttr(default=None)
 
 class RoleTransition(BaseModel):
     from_role: RoleType
@@ -184,20 +326,693 @@ class RoleTransition(BaseModel):
     reason: str
     timestamp: datetime
 
+class TaskVersionConflict(Exception):
+    """A write was based on an older revision (see task_revision) of a task than the one stored"""
+    
+    def __init__(self, task_id: str, expected: Optional[Tuple[int, int]], actual: Optional[Tuple[int, int]],
+                 task_ids: List[str] = ()):
+        self.task_id = task_id
+        self.expected = expected
+        self.actual = actual
+        # Every task of the rejected write, so the caller can reload them all
+        self.task_ids = list(task_ids) or [task_id]
+        if expected is None:
+            detail = f"it was created by another writer (version {actual[0]})"
+        elif actual is None:
+            detail = f"it was deleted by another writer (expected version {expected[0]})"
+        elif actual[0] == expected[0]:
+            detail = f"another writer saved its Trello card fields (version {actual[0]})"
+        else:
+            detail = f"it is at version {actual[0]}, expected {expected[0]}"
+        super().__init__(f"Conflict on task {task_id}: {detail}. Read the task again and retry")
+
+class TaskSaveError(Exception):
+    """A change was made in memory but could not be written to storage"""
+    
+    def __init__(self, message: str, task_ids: List[str] = ()):
+        # Tasks whose change was not stored, so the caller can put back their stored state
+        self.task_ids = list(task_ids)
+        super().__init__(message)
+
+def start_change(task: Task):
+    """Remember the revision a change builds on, unless the task already has unsaved changes"""
+    if task._base_revision is None:
+        task._base_revision = task_revision(task)
+
+def touch_task(task: Task):
+    """Record a change to a task: a new updated_at and the next version"""
+    start_change(task)
+    task.updated_at = datetime.now()
+    task.version += 1
+
+def task_revision(task: Task) -> Tuple[int, int]:
+    """
+    The stored state a task is at: its version and its sync_revision. Saves compare it, so
+    a save of the Trello fields alone is a new revision without changing the version clients see.
+    """
+    return (task.version, task.sync_revision)
+
+def storage_copy(task: Task) -> Task:
+    """
+    Copy of a task to hand to a storage job. Taken on the event loop, so the storage
+    thread never reads a task while a handler is changing it.
+    
+    The copy is saved over the revision its changes build on; later changes to the task
+    build on the copy.
+    """
+    copy = task.model_copy(deep=True)
+    task._base_revision = None
+    return copy
+
+def version_mismatch(task: Task, expected_version: Optional[int]) -> Optional[str]:
+    """Conflict message when the caller passed an expected_version the task no longer has"""
+    if expected_version is None or int(expected_version) == task.version:
+        return None
+    return str(TaskVersionConflict(task.id, (int(expected_version), task.sync_revision), task_revision(task)))
+
+def task_number(task_id: str) -> int:
+    return int(task_id.split('-')[1])
+
+class DependencyGraph:
+    """
+    Dependency DAG over task ids.
+    
+    Keeps forward edges (task -> its dependencies), reverse edges (task -> its dependents)
+    and, per task, how many of its dependencies exist and are not DONE. TODO tasks with
+    none left form the ready set, which is maintained incrementally: finishing a task
+    only touches its direct dependents. Dependencies on ids that do not exist do not block.
+    """
+    
+    def __init__(self):
+        self.depends_on: Dict[str, Tuple[str, ...]] = {}
+        self.dependents: Dict[str, Set[str]] = {}
+        self.status: Dict[str, TaskStatus] = {}
+        self.blocking: Dict[str, int] = {}
+        self.ready: Set[str] = set()
+        # Bumped on every change; whole-graph query results are cached against it
+        self.version = 0
+        self._cache: Dict[str, tuple] = {}
+    
+    def _unfinished(self, task_id: str) -> bool:
+        status = self.status.get(task_id)
+        return status is not None and status != TaskStatus.DONE
+    
+    def _refresh_ready(self, task_id: str) -> bool:
+        """Update the task's ready set membership, returning whether it just became ready"""
+        if self.status.get(task_id) == TaskStatus.TODO and self.blocking.get(task_id) == 0:
+            if task_id not in self.ready:
+                self.ready.add(task_id)
+                return True
+        else:
+            self.ready.discard(task_id)
+        return False
+    
+    def _propagate(self, task_id: str, delta: int) -> List[str]:
+        newly_ready = []
+        for dependent_id in self.dependents.get(task_id, ()):
+            self.blocking[dependent_id] += delta
+            if self._refresh_ready(dependent_id):
+                newly_ready.append(dependent_id)
+        return newly_ready
+    
+    def update(self, task_id: str, dependencies, status: TaskStatus) -> List[str]:
+        """Add or change a task, returning the ids of tasks that became ready"""
+        dependencies = tuple(dependencies)
+        old_dependencies = self.depends_on.get(task_id)
+        if old_dependencies == dependencies and self.status.get(task_id) == status:
+            return []
+        self.version += 1
+        was_unfinished = self._unfinished(task_id)
+        
+        if old_dependencies != dependencies:
+            for dep_id in old_dependencies or ():
+                self.dependents[dep_id].discard(task_id)
+            for dep_id in dependencies:
+                self.dependents.setdefault(dep_id, set()).add(task_id)
+            self.depends_on[task_id] = dependencies
+            self.blocking[task_id] = sum(1 for dep_id in set(dependencies) if self._unfinished(dep_id))
+        
+        self.status[task_id] = status
+        newly_ready = []
+        if status != TaskStatus.DONE and not was_unfinished:
+            self._propagate(task_id, 1)
+        elif status == TaskStatus.DONE and was_unfinished:
+            newly_ready = self._propagate(task_id, -1)
+        if self._refresh_ready(task_id):
+            newly_ready.append(task_id)
+        return newly_ready
+    
+    def load(self, task_ids: List[str], dependency_lists: List[list], statuses: List[TaskStatus]):
+        """Add many tasks at once; faster than update() per task, for tasks not yet in the graph"""
+        self.version += 1
+        for task_id, dependencies, status in zip(task_ids, dependency_lists, statuses):
+            self.depends_on[task_id] = tuple(dependencies)
+            self.status[task_id] = status
+            for dep_id in dependencies:
+                self.dependents.setdefault(dep_id, set()).add(task_id)
+        for task_id in task_ids:
+            dependencies = self.depends_on[task_id]
+            self.blocking[task_id] = sum(1 for dep_id in set(dependencies) if self._unfinished(dep_id)) if dependencies else 0
+            self._refresh_ready(task_id)
+    
+    def remove(self, task_id: str):
+        if task_id not in self.status:
+            return
+        self.version += 1
+        if self._unfinished(task_id):
+            self._propagate(task_id, -1)
+        for dep_id in self.depends_on.pop(task_id):
+            self.dependents[dep_id].discard(task_id)
+        del self.status[task_id]
+        del self.blocking[task_id]
+        self.ready.discard(task_id)
+    
+    def find_cycle(self, task_id: str, dependencies) -> Optional[List[str]]:
+        """
+        Return the cycle that giving task_id these dependencies would close, if any,
+        as a path like [A, B, C, A] where each task depends on the next.
+        """
+        parents: Dict[str, Optional[str]] = {}
+        stack = []
+        for dep_id in dependencies:
+            if dep_id == task_id:
+                return [task_id, task_id]
+            if dep_id not in parents:
+                parents[dep_id] = None
+                stack.append(dep_id)
+        
+        while stack:
+            node = stack.pop()
+            for dep_id in self.depends_on.get(node, ()):
+                if dep_id == task_id:
+                    path = [node]
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+                    return [task_id] + path[::-1] + [task_id]
+                if dep_id not in parents:
+                    parents[dep_id] = node
+                    stack.append(dep_id)
+        return None
+    
+    def topological_order(self) -> List[str]:
+        """All task ids with every task after its dependencies, lowest task number first among equals"""
+        cached = self._cache.get("topological_order")
+        if cached and cached[0] == self.version:
+            return cached[1]
+        
+        remaining = {
+            task_id: sum(1 for dep_id in set(deps) if dep_id in self.status)
+            for task_id, deps in self.depends_on.items()
+        }
+        heap = [(task_number(task_id), task_id) for task_id, count in remaining.items() if count == 0]
+        heapq.heapify(heap)
+        order = []
+        while heap:
+            _, task_id = heapq.heappop(heap)
+            order.append(task_id)
+            for dependent_id in self.dependents.get(task_id, ()):
+                remaining[dependent_id] -= 1
+                if remaining[dependent_id] == 0:
+                    heapq.heappush(heap, (task_number(dependent_id), dependent_id))
+        
+        if len(order) < len(remaining):
+            # Only possible with cycles in data written before they were rejected
+            placed = set(order)
+            cyclic = sorted((task_id for task_id in remaining if task_id not in placed), key=task_number)
+            logger.warning("Dependency cycle among tasks: %s", ', '.join(cyclic))
+            order.extend(cyclic)
+        
+        self._cache["topological_order"] = (self.version, order)
+        return order
+    
+    def downstream_depths(self) -> Dict[str, int]:
+        """Per unfinished task, the length of the longest chain of unfinished tasks it starts"""
+        cached = self._cache.get("downstream_depths")
+        if cached and cached[0] == self.version:
+            return cached[1]
+        
+        depths: Dict[str, int] = {}
+        for task_id in reversed(self.topological_order()):
+            if self._unfinished(task_id):
+                depths[task_id] = 1 + max(
+                    (depths[dependent_id] for dependent_id in self.dependents.get(task_id, ()) if dependent_id in depths),
+                    default=0
+                )
+        
+        self._cache["downstream_depths"] = (self.version, depths)
+        return depths
+    
+    def critical_path(self) -> List[str]:
+        """Longest chain of unfinished tasks, each depending on the previous one"""
+        cached = self._cache.get("critical_path")
+        if cached and cached[0] == self.version:
+            return cached[1]
+        
+        length: Dict[str, int] = {}
+        previous: Dict[str, Optional[str]] = {}
+        end = None
+        for task_id in self.topological_order():
+            if not self._unfinished(task_id):
+                continue
+            best = None
+            for dep_id in self.depends_on[task_id]:
+                if dep_id in length and (best is None or length[dep_id] > length[best]):
+                    best = dep_id
+            length[task_id] = length[best] + 1 if best else 1
+            previous[task_id] = best
+            if end is None or length[task_id] > length[end]:
+                end = task_id
+        
+        path = []
+        while end is not None:
+            path.append(end)
+            end = previous[end]
+        path.reverse()
+        
+        self._cache["critical_path"] = (self.version, path)
+        return path
+
+# Words are runs of letters, digits and underscores, compared in lower case
+SEARCH_WORD_PATTERN = re.compile(r"\w+")
+# A word in a title counts as this many occurrences in the description or comments
+SEARCH_TITLE_WEIGHT = 3
+# BM25 term frequency saturation and document length normalization
+SEARCH_BM25_K1 = 1.2
+SEARCH_BM25_B = 0.75
+# Length of the text excerpt shown with each search result
+SEARCH_SNIPPET_CHARS = 160
+
+def search_words(text: str) -> List[str]:
+    return SEARCH_WORD_PATTERN.findall(text.lower())
+
+def search_snippet(task: Task, words: Set[str]) -> str:
+    """Excerpt of the description or first comment that uses a query word, with the matches in bold"""
+    texts = [task.description] + [comment.get("comment", "") for comment in task.comments]
+    for text in texts:
+        matches = [match for match in SEARCH_WORD_PATTERN.finditer(text) if match.group().lower() in words]
+        if not matches:
+            continue
+        start = max(0, matches[0].start() - SEARCH_SNIPPET_CHARS // 4)
+        end = min(len(text), start + SEARCH_SNIPPET_CHARS)
+        parts, position = [], start
+        for match in matches:
+            if match.end() > end:
+                break
+            parts.extend((text[position:match.start()], f"**{match.group()}**"))
+            position = match.end()
+        parts.append(text[position:end])
+        snippet = " ".join("".join(parts).split())
+        return ("…" if start else "") + snippet + ("…" if end < len(text) else "")
+    # Only the title matched
+    snippet = " ".join(task.description[:SEARCH_SNIPPET_CHARS].split())
+    return snippet + ("…" if len(task.description) > SEARCH_SNIPPET_CHARS else "")
+
+class TextIndex:
+    """
+    Inverted index from words to the tasks whose title, description or comments use them.
+    
+    Postings hold each word's weighted count per task, and search ranks tasks with BM25.
+    Like SQLite FTS5, a query matches tasks that use all of its words by default; the
+    candidates come from the shortest posting list, so selective words keep searches fast.
+    Comments are only ever appended, so updating a task whose title and description are
+    unchanged indexes just its new comments. Updates are ignored until a build starts;
+    indexing a task twice is harmless, so a build can run in steps while tasks change.
+    """
+    
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        # Per task: the words indexed for it, its weighted length, the comments indexed so far,
+        # and the title and description they were indexed from
+        self.words: Dict[str, Set[str]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.comment_counts: Dict[str, int] = {}
+        self.heads: Dict[str, tuple] = {}
+        self.total_length = 0
+        # BM25 length normalization per task, against the average length when last computed
+        self.norms: Dict[str, float] = {}
+        self.norm_average = 0.0
+        # Whether changed tasks are indexed, and whether every stored task has been
+        self.ready = False
+        self.complete = False
+    
+    def start(self):
+        """Start a build from an empty index; changed tasks are indexed from now on"""
+        self.__init__()
+        self.ready = True
+    
+    def update(self, task: Task):
+        if self.ready:
+            self.index(task.id, task.title, task.description, task.comments)
+    
+    def index(self, task_id: str, title: str, description: str, comments: List[dict]):
+        indexed_comments = self.comment_counts.get(task_id)
+        if indexed_comments is None or self.heads[task_id] != (title, description) or indexed_comments > len(comments):
+            if indexed_comments is not None:
+                self.remove(task_id)
+            words = search_words(description)
+            words.extend(search_words(title) * SEARCH_TITLE_WEIGHT)
+            indexed_comments = 0
+        elif indexed_comments == len(comments):
+            return
+        else:
+            words = []
+        for comment in comments[indexed_comments:]:
+            words.extend(search_words(comment.get("comment", "")))
+        
+        counts = Counter(words)
+        all_postings = self.postings
+        for word, count in counts.items():
+            postings = all_postings.get(word)
+            if postings is None:
+                all_postings[word] = {task_id: count}
+            else:
+                postings[task_id] = postings.get(task_id, 0) + count
+        task_words = self.words.get(task_id)
+        if task_words is None:
+            self.words[task_id] = set(counts)
+        else:
+            task_words.update(counts)
+        self.lengths[task_id] = self.lengths.get(task_id, 0) + len(words)
+        self.total_length += len(words)
+        if self.norm_average:
+            self.norms[task_id] = self._norm(self.lengths[task_id])
+        self.comment_counts[task_id] = len(comments)
+        self.heads[task_id] = (title, description)
+    
+    def remove(self, task_id: str):
+        for word in self.words.pop(task_id, ()):
+            postings = self.postings[word]
+            del postings[task_id]
+            if not postings:
+                del self.postings[word]
+        self.total_length -= self.lengths.pop(task_id, 0)
+        self.norms.pop(task_id, None)
+        self.comment_counts.pop(task_id, None)
+        self.heads.pop(task_id, None)
+    
+    def _norm(self, length: int) -> float:
+        return SEARCH_BM25_K1 * (1 - SEARCH_BM25_B + SEARCH_BM25_B * length / self.norm_average)
+    
+    def _refresh_norms(self):
+        """Recompute the length normalization once the average length has drifted by more than a tenth"""
+        average = self.total_length / len(self.lengths) or 1.0
+        if abs(average - self.norm_average) <= 0.1 * self.norm_average:
+            return
+        self.norm_average = average
+        self.norms = {task_id: self._norm(length) for task_id, length in self.lengths.items()}
+    
+    def search(self, words: List[str], allowed: Optional[Set[str]] = None, limit: int = 20,
+               match_all: bool = True) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        The best-scoring task ids with their scores, and how many tasks matched. Only tasks in
+        allowed are considered, if given; with match_all=False a task needs just one of the words.
+        """
+        lists = [self.postings.get(word) for word in set(words)]
+        if match_all and not all(lists):
+            return [], 0
+        lists = [postings for postings in lists if postings]
+        if not lists:
+            return [], 0
+        self._refresh_norms()
+        norms = self.norms
+        document_count = len(self.lengths)
+        
+        def weight(postings: Dict[str, int]) -> float:
+            return (SEARCH_BM25_K1 + 1) * math.log(1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+        
+        if match_all:
+            lists.sort(key=len)
+            shortest, others = lists[0], lists[1:]
+            # Walk the shortest posting list (or the filter, if smaller) and keep tasks found in all the others
+            if allowed is not None and len(allowed) < len(shortest):
+                candidates = [(task_id, shortest[task_id]) for task_id in allowed if task_id in shortest]
+            elif allowed is not None:
+                candidates = [(task_id, count) for task_id, count in shortest.items() if task_id in allowed]
+            else:
+                candidates = shortest.items()
+            for postings in others:
+                candidates = [(task_id, count) for task_id, count in candidates if task_id in postings]
+            shortest_weight = weight(shortest)
+            scores = {task_id: shortest_weight * count / (count + norms[task_id]) for task_id, count in candidates}
+            for postings in others:
+                other_weight = weight(postings)
+                scores = {
+                    task_id: score + other_weight * postings[task_id] / (postings[task_id] + norms[task_id])
+                    for task_id, score in scores.items()
+                }
+        else:
+            scores: Dict[str, float] = {}
+            for postings in lists:
+                word_weight = weight(postings)
+                for task_id, count in postings.items():
+                    if allowed is None or task_id in allowed:
+                        scores[task_id] = scores.get(task_id, 0.0) + word_weight * count / (count + norms[task_id])
+        best = heapq.nlargest(limit, scores, key=scores.__getitem__)
+        return [(task_id, scores[task_id]) for task_id in best], len(scores)
+
+class TaskRepository(MutableMapping):
+    """
+    In-memory task store keyed by task id, with secondary indexes.
+    
+    Tasks are indexed by status, assigned role and creator, and their dependencies
+    are kept in a DependencyGraph. Titles, descriptions and comments are kept in a
+    TextIndex for search. Adding a task indexes it; code that changes an indexed field
+    of a stored task (or adds a comment) must call reindex(task) afterwards.
+    
+    Tasks adopted from a TaskSnapshot (a snapshot file, or the indexed columns of the
+    SQLite database) stay as snapshot rows until first accessed.
+    """
+    
+    def __init__(self):
+        self._tasks: Dict[str, Task] = {}
+        # Indexed field values per task, so reindex can remove the stale entries
+        self._indexed: Dict[str, tuple] = {}
+        self.by_status: Dict[TaskStatus, Set[str]] = {status: set() for status in TaskStatus}
+        self.by_role: Dict[Optional[RoleType], Set[str]] = {}
+        self.by_creator: Dict[RoleType, Set[str]] = {}
+        self.graph = DependencyGraph()
+        self.text = TextIndex()
+        self._snapshot: Optional["TaskSnapshot"] = None
+        # Snapshot row of every adopted task whose indexed fields have not changed since
+        self._snapshot_rows: Dict[str, int] = {}
+        # Snapshot rows not yet built into Task objects
+        self._pending_rows: Dict[str, int] = {}
+    
+    def __getitem__(self, task_id: str) -> Task:
+        task = self._tasks.get(task_id)
+        if task is None:
+            if task_id not in self._pending_rows:
+                raise KeyError(task_id)
+            self._build_rows([task_id])
+            task = self._tasks[task_id]
+        return task
+    
+    def __setitem__(self, task_id: str, task: Task):
+        if task_id in self:
+            self._unindex(task_id)
+        self._pending_rows.pop(task_id, None)
+        self._tasks[task_id] = task
+        self.reindex(task)
+    
+    def __delitem__(self, task_id: str):
+        if task_id not in self:
+            raise KeyError(task_id)
+        self._unindex(task_id)
+        self.graph.remove(task_id)
+        self.text.remove(task_id)
+        self._pending_rows.pop(task_id, None)
+        self._tasks.pop(task_id, None)
+    
+    def __contains__(self, task_id) -> bool:
+        return task_id in self._tasks or task_id in self._pending_rows
+    
+    def __iter__(self):
+        yield from self._tasks
+        yield from self._pending_rows
+    
+    def __len__(self) -> int:
+        return len(self._tasks) + len(self._pending_rows)
+    
+    def _build_rows(self, task_ids: List[str]):
+        """Turn snapshot rows into Task objects; a row whose stored task changed since the snapshot is reindexed"""
+        rows = [self._pending_rows.pop(task_id) for task_id in task_ids]
+        for row, task in zip(rows, self._snapshot.build_tasks(rows)):
+            self._tasks[task.id] = task
+            if task.version != self._snapshot.version(row):
+                self.reindex(task)
+    
+    def _build_pending(self):
+        if self._pending_rows:
+            self._build_rows(list(self._pending_rows))
+    
+    def values(self):
+        self._build_pending()
+        return self._tasks.values()
+    
+    def items(self):
+        self._build_pending()
+        return self._tasks.items()
+    
+    def load_snapshot(self, snapshot: "TaskSnapshot"):
+        """Adopt a snapshot's tasks into an empty repository, taking the indexes from the snapshot"""
+        self._snapshot = snapshot
+        self._snapshot_rows = {task_id: row for row, task_id in enumerate(snapshot.ids)}
+        self._pending_rows = dict(self._snapshot_rows)
+        
+        for status in TaskStatus:
+            self.by_status[status] = set(snapshot.indexes["status"].get(status.value, ()))
+        self.by_role = {
+            RoleType(role) if role else None: set(task_ids)
+            for role, task_ids in snapshot.indexes["assigned_role"].items()
+        }
+        self.by_creator = {
+            RoleType(role): set(task_ids) for role, task_ids in snapshot.indexes["created_by"].items()
+        }
+        
+        statuses = {status.value: status for status in TaskStatus}
+        self.graph.load(
+            snapshot.ids,
+            snapshot.columns["dependencies"],
+            [statuses[status] for status in snapshot.columns["status"]]
+        )
+    
+    def reindex(self, task: Task) -> List[str]:
+        """Bring the indexes in line with the task's current fields, returning ids of tasks that became ready"""
+        newly_ready = self.graph.update(task.id, task.dependencies, task.status)
+        fields = (task.status, task.assigned_role, task.created_by)
+        if self._stored_fields(task.id) != fields:
+            self._unindex(task.id)
+            status, assigned_role, created_by = fields
+            self.by_status[status].add(task.id)
+            self.by_role.setdefault(assigned_role, set()).add(task.id)
+            self.by_creator.setdefault(created_by, set()).add(task.id)
+            self._indexed[task.id] = fields
+        self.text.update(task)
+        return newly_ready
+    
+    def _stored_fields(self, task_id: str) -> Optional[tuple]:
+        fields = self._indexed.get(task_id)
+        if fields is None and task_id in self._snapshot_rows:
+            fields = self._snapshot.index_fields(self._snapshot_rows[task_id])
+        return fields
+    
+    def _unindex(self, task_id: str):
+        fields = self._stored_fields(task_id)
+        self._indexed.pop(task_id, None)
+        self._snapshot_rows.pop(task_id, None)
+        if fields is None:
+            return
+        status, assigned_role, created_by = fields
+        self.by_status[status].discard(task_id)
+        self.by_role[assigned_role].discard(task_id)
+        self.by_creator[created_by].discard(task_id)
+    
+    def count_by_status(self) -> Dict[str, int]:
+        return {status.value: len(task_ids) for status, task_ids in self.by_status.items()}
+    
+    def index_text(self, task_ids: List[str]):
+        """Add tasks to the search index, starting it if needed; ids of deleted tasks are skipped"""
+        if not self.text.ready:
+            self.text.start()
+        pending_rows = []
+        for task_id in task_ids:
+            task = self._tasks.get(task_id)
+            if task is not None:
+                self.text.index(task_id, task.title, task.description, task.comments)
+            elif task_id in self._pending_rows:
+                pending_rows.append(self._pending_rows[task_id])
+        # Snapshot rows are indexed from their records, without building Task objects
+        for record in self._snapshot.records(pending_rows) if pending_rows else ():
+            self.text.index(record["id"], record["title"], record["description"], record["comments"])
+    
+    def search(self, query: str, status: Optional[TaskStatus] = None, roles: Optional[List[Optional[RoleType]]] = None,
+               limit: int = 20, match_all: bool = True) -> Tuple[List[Tuple[Task, float]], int]:
+        """Tasks ranked by how well their text matches the query, optionally by status and assigned role"""
+        if not self.text.complete:
+            # The background build has not finished; index whatever it has not reached yet
+            self.index_text(list(self))
+            self.text.complete = True
+        allowed = None
+        if status is not None:
+            allowed = self.by_status[status]
+        if roles is not None:
+            assigned = self.by_role.get(roles[0], set()) if len(roles) == 1 else \
+                set().union(*(self.by_role.get(role, set()) for role in roles))
+            allowed = assigned if allowed is None else allowed & assigned
+        best, match_count = self.text.search(search_words(query), allowed, limit, match_all)
+        return [(self[task_id], score) for task_id, score in best], match_count
+    
+    def with_status(self, status: TaskStatus) -> List[Task]:
+        return [self[task_id] for task_id in self.by_status[status]]
+    
+    def ready_tasks(self) -> List[Task]:
+        """TODO tasks whose dependencies are all DONE"""
+        return [self[task_id] for task_id in self.graph.ready]
+    
+    def find_unfinished_dependency(self, task: Task) -> Optional[str]:
+        """First existing dependency of the task that is not DONE"""
+        if not self.graph.blocking.get(task.id):
+            return None
+        done = self.by_status[TaskStatus.DONE]
+        return next(
+            (dep_id for dep_id in task.dependencies if dep_id in self and dep_id not in done),
+            None
+        )
+
 # Global state
-current_role: RoleType = RoleType.ORCHESTRATOR
-tasks: Dict[str, Task] = {}
-transitions: List[RoleTransition] = []
+tasks: TaskRepository = TaskRepository()
 task_counter: int = 0
 
 # Trello client and mode
-trello_client: Optional[TrelloClient] = None
+trello_client = None
 trello_board = None
 trello_mode: TrelloMode = TrelloMode.NONE
 
+# Trello list each task status maps to
+TRELLO_LIST_NAMES = {
+    TaskStatus.TODO: "To Do",
+    TaskStatus.IN_PROGRESS: "In Progress",
+    TaskStatus.REVIEW: "Review",
+    TaskStatus.DONE: "Done",
+    TaskStatus.BLOCKED: "Blocked"
+}
+
+# Seconds before cached Trello lists and cards are fetched again
+TRELLO_CACHE_TTL = float(os.getenv('TRELLO_CACHE_TTL', '300'))
+
+# Trello API endpoint; point it at a local stub to exercise the integration offline
+TRELLO_DEFAULT_API_BASE_URL = "https://api.trello.com/1"
+TRELLO_API_BASE_URL = os.getenv('TRELLO_API_BASE_URL', TRELLO_DEFAULT_API_BASE_URL).rstrip('/')
+
+# Trello allows 300 requests per 10 seconds per API key and 100 per 10 seconds per token
+TRELLO_RATE_LIMIT_WINDOW = 10.0
+TRELLO_RATE_LIMIT_PER_KEY = int(os.getenv('TRELLO_RATE_LIMIT_PER_KEY', '300'))
+TRELLO_RATE_LIMIT_PER_TOKEN = int(os.getenv('TRELLO_RATE_LIMIT_PER_TOKEN', '100'))
+TRELLO_MAX_RETRIES = int(os.getenv('TRELLO_MAX_RETRIES', '5'))
+TRELLO_SYNC_CONCURRENCY = int(os.getenv('TRELLO_SYNC_CONCURRENCY', '4'))
+
 # Local storage
 TASKS_FILE = "tasks_backup.json"
 TRANSITIONS_FILE = "transitions_backup.json"
+TASKS_JOURNAL_FILE = "tasks_journal.jsonl"
+TASKS_DB_FILE = "tasks.db"
+TASKS_SNAPSHOT_FILE = "tasks_snapshot.bin"
+TASKS_LOCK_FILE = "tasks.lock"
+TRELLO_OUTBOX_FILE = "trello_outbox.json"
+
+def get_storage_mode() -> StorageMode:
+    """Read the storage mode from TASK_STORAGE_MODE, defaulting to JSON"""
+    value = os.getenv('TASK_STORAGE_MODE', StorageMode.JSON.value).strip().lower()
+    try:
+        return StorageMode(value)
+    except ValueError:
+        logger.warning("Unknown TASK_STORAGE_MODE '%s' - using %s", value, StorageMode.JSON.value)
+        return StorageMode.JSON
+
+# Number of journal records after which the journal is folded into TASKS_FILE
+JOURNAL_COMPACT_THRESHOLD = int(os.getenv('TASK_JOURNAL_COMPACT_THRESHOLD', '500'))
+# Seconds between checks for tasks other processes saved (shared storage mode); 0 checks only on requests
+STORAGE_POLL_INTERVAL = float(os.getenv('TASK_STORAGE_POLL_INTERVAL', '1'))
 
 def check_mcp_trello_availability() -> bool:
     """Check if MCP Trello server is available"""
@@ -208,910 +1023,3996 @@ def check_mcp_trello_availability() -> bool:
         logger.info("MCP Trello availability check: assuming not available for Cursor AI compatibility")
         return False
     except Exception as e:
-        logger.warning(f"Error checking MCP Trello availability: {e}")
+        logger.warning("Error checking MCP Trello availability: %s", e)
         return False
 
-def save_tasks_locally():
-    """Save tasks to local JSON file"""
-    try:
-        tasks_data = {
-            task_id: {
-                **task.model_dump(),
-                "created_at": task.created_at.isoformat(),
-                "updated_at": task.updated_at.isoformat()
-            }
-            for task_id, task in tasks.items()
-        }
-        
-        with open(TASKS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(tasks_data, f, ensure_ascii=False, indent=2)
-            
-        print(f"✅ Tasks saved locally to {TASKS_FILE}", file=sys.stderr)
-        
-    except Exception as e:
-        print(f"❌ Error saving tasks locally: {e}", file=sys.stderr)
+def serialize_task(task: Task) -> dict:
+    """Convert a task to a JSON-serializable dict"""
+    return {
+        **task.model_dump(),
+        "created_at": task.created_at.isoformat(),
+        "updated_at": task.updated_at.isoformat(),
+        "trello_synced_at": task.trello_synced_at.isoformat() if task.trello_synced_at else None
+    }
 
-def load_tasks_locally():
-    """Load tasks from local JSON file"""
-    global tasks, task_counter
+def deserialize_task(task_data: dict) -> Task:
+    """Build a task from a dict produced by serialize_task"""
+    # Convert datetime strings back to datetime objects
+    task_data["created_at"] = datetime.fromisoformat(task_data["created_at"])
+    task_data["updated_at"] = datetime.fromisoformat(task_data["updated_at"])
+    if task_data.get("trello_synced_at"):
+        task_data["trello_synced_at"] = datetime.fromisoformat(task_data["trello_synced_at"])
     
-    try:
-        if os.path.exists(TASKS_FILE):
-            with open(TASKS_FILE, 'r', encoding='utf-8') as f:
-                tasks_data = json.load(f)
-            
-            for task_id, task_data in tasks_data.items():
-                # Convert datetime strings back to datetime objects
-                task_data["created_at"] = datetime.fromisoformat(task_data["created_at"])
-                task_data["updated_at"] = datetime.fromisoformat(task_data["updated_at"])
-                
-                # Convert assigned_role string back to enum
-                if task_data.get("assigned_role"):
-                    task_data["assigned_role"] = RoleType(task_data["assigned_role"])
-                
-                # Convert created_by string back to enum
-                task_data["created_by"] = RoleType(task_data["created_by"])
-                
-                # Convert status string back to enum
-                task_data["status"] = TaskStatus(task_data["status"])
-                
-                tasks[task_id] = Task(**task_data)
-            
-            # Update task counter
-            if tasks:
-                max_task_num = max(int(task.id.split('-')[1]) for task in tasks.values())
-                task_counter = max_task_num
-            
-            print(f"✅ Loaded {len(tasks)} tasks from local storage", file=sys.stderr)
-            
-    except Exception as e:
-        print(f"❌ Error loading tasks from local storage: {e}", file=sys.stderr)
+    # Convert assigned_role string back to enum
+    if task_data.get("assigned_role"):
+        task_data["assigned_role"] = RoleType(task_data["assigned_role"])
+    
+    # Convert created_by string back to enum
+    task_data["created_by"] = RoleType(task_data["created_by"])
+    
+    # Convert status string back to enum
+    task_data["status"] = TaskStatus(task_data["status"])
+    
+    return Task(**task_data)
 
-def save_transitions_locally():
-    """Save transitions to local JSON file"""
-    try:
-        transitions_data = [
-            {
-                **transition.model_dump(),
-                "timestamp": transition.timestamp.isoformat()
-            }
-            for transition in transitions
-        ]
-        
-        with open(TRANSITIONS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(transitions_data, f, ensure_ascii=False, indent=2)
-            
-        print(f"✅ Transitions saved locally to {TRANSITIONS_FILE}", file=sys.stderr)
-        
-    except Exception as e:
-        print(f"❌ Error saving transitions locally: {e}", file=sys.stderr)
+def serialize_transition(transition: RoleTransition) -> dict:
+    """Convert a role transition to a JSON-serializable dict"""
+    return {
+        **transition.model_dump(),
+        "timestamp": transition.timestamp.isoformat()
+    }
 
-def load_transitions_locally():
-    """Load transitions from local JSON file"""
-    global transitions
+def deserialize_transition(transition_data: dict) -> RoleTransition:
+    """Build a role transition from a dict produced by serialize_transition"""
+    # Convert datetime string back to datetime object
+    transition_data["timestamp"] = datetime.fromisoformat(transition_data["timestamp"])
     
-    try:
-        if os.path.exists(TRANSITIONS_FILE):
-            with open(TRANSITIONS_FILE, 'r', encoding='utf-8') as f:
-                transitions_data = json.load(f)
-            
-            for transition_data in transitions_data:
-                # Convert datetime string back to datetime object
-                transition_data["timestamp"] = datetime.fromisoformat(transition_data["timestamp"])
-                
-                # Convert role strings back to enums
-                transition_data["from_role"] = RoleType(transition_data["from_role"])
-                transition_data["to_role"] = RoleType(transition_data["to_role"])
-                
-                transitions.append(RoleTransition(**transition_data))
-            
-            print(f"✅ Loaded {len(transitions)} transitions from local storage", file=sys.stderr)
-            
-    except Exception as e:
-        print(f"❌ Error loading transitions from local storage: {e}", file=sys.stderr)
+    # Convert role strings back to enums
+    transition_data["from_role"] = RoleType(transition_data["from_role"])
+    transition_data["to_role"] = RoleType(transition_data["to_role"])
+    
+    return RoleTransition(**transition_data)
 
-def init_trello_client():
-    """Initialize Trello client if credentials are available"""
-    global trello_client, trello_board, trello_mode
+def write_file_atomically(path: str, write, binary: bool = False):
+    """Write a file through a temp file and rename so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') if binary else open(tmp_path, 'w', encoding='utf-8') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class FileLock:
+    """
+    Exclusive advisory lock on a file, held by one process at a time.
     
-    logger.info("Initializing Trello client...")
+    Re-entrant within the process so a locked operation can call another one. Only code
+    running on the storage executor takes it.
+    """
     
-    # First, check if MCP Trello server is available
-    logger.info("Checking MCP Trello server availability...")
-    if check_mcp_trello_availability():
-        trello_mode = TrelloMode.MCP
-        logger.info("MCP Trello server detected - using MCP integration")
-        return True
+    def __init__(self, path: str):
+        self.path = path
+        self.depth = 0
+        self._file = None
     
-    # If MCP not available, try direct API integration
-    if not TRELLO_AVAILABLE:
-        trello_mode = TrelloMode.NONE
-        logger.warning("Trello integration not available - using local storage")
-        return False
+    def __enter__(self):
+        if self.depth == 0:
+            self._file = open(self.path, 'a+b')
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        self.depth += 1
+        return self
     
-    try:
-        api_key = os.getenv('TRELLO_API_KEY')
-        token = os.getenv('TRELLO_TOKEN')
-        board_id = os.getenv('TRELLO_WORKING_BOARD_ID')
-        
-        # Check if credentials are placeholder values
-        placeholder_values = [
-            "your_trello_api_key_here",
-            "your_trello_token_here", 
-            "your_trello_board_id_here",
-            "",
-            None
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+
+TRANSITIONS_DIR = "transitions"
+# Recent transitions kept in memory; the full history stays on disk
+TRANSITION_RING_SIZE = int(os.getenv('TASK_TRANSITION_RING_SIZE', '1000'))
+# A transition segment is closed once it reaches this size or age
+TRANSITION_SEGMENT_BYTES = int(os.getenv('TASK_TRANSITION_SEGMENT_BYTES', str(1024 * 1024)))
+TRANSITION_SEGMENT_SECONDS = int(os.getenv('TASK_TRANSITION_SEGMENT_SECONDS', '86400'))
+
+class TransitionLog:
+    """
+    Role transition history.
+    
+    The latest entries live in a fixed-size ring buffer; the full history is appended to
+    JSON Lines segments in TRANSITIONS_DIR. The active segment is closed when it grows past
+    TRANSITION_SEGMENT_BYTES or TRANSITION_SEGMENT_SECONDS, and the manifest records each
+    closed segment's time range, roles and task ids so queries skip segments that cannot match.
+    Segment files are only touched from the storage executor. With a shared lock (shared
+    storage mode) appends from several processes go to the same segments.
+    """
+    
+    MANIFEST_FILE = "manifest.json"
+    
+    def __init__(self, directory: str = TRANSITIONS_DIR, ring_size: int = TRANSITION_RING_SIZE,
+                 segment_bytes: int = TRANSITION_SEGMENT_BYTES, segment_seconds: int = TRANSITION_SEGMENT_SECONDS):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.recent: deque = deque(maxlen=ring_size)
+        self.total = 0
+        # Summaries of closed segments, oldest first, and of the segment being appended to
+        self.segments: List[dict] = []
+        self.active: Optional[dict] = None
+        # Held around appends when other processes write to the same directory
+        self.lock: Optional[FileLock] = None
+        self.manifest_stamp: Optional[tuple] = None
+    
+    def __len__(self) -> int:
+        return self.total
+    
+    def append(self, transition: RoleTransition):
+        self.recent.append(transition)
+        self.total += 1
+    
+    def extend(self, new_transitions: List[RoleTransition]):
+        for transition in new_transitions:
+            self.append(transition)
+    
+    def latest(self, count: int) -> List[RoleTransition]:
+        return list(self.recent)[-count:]
+    
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.directory, file_name)
+    
+    def _new_segment(self) -> dict:
+        number = int(self.segments[-1]["file"][8:14]) + 1 if self.segments else 1
+        return {
+            "file": f"segment-{number:06d}.jsonl",
+            "opened_at": time.time(),
+            "count": 0,
+            "bytes": 0,
+            "first_at": None,
+            "last_at": None,
+            "roles": set(),
+            "task_ids": set(),
+        }
+    
+    @staticmethod
+    def _summarize(summary: dict, record: dict):
+        summary["count"] += 1
+        summary["first_at"] = summary["first_at"] or record["timestamp"]
+        summary["last_at"] = record["timestamp"]
+        summary["roles"].update((record["from_role"], record["to_role"]))
+        if record.get("task_id"):
+            summary["task_ids"].add(record["task_id"])
+    
+    def _save_manifest(self):
+        manifest = [
+            {**summary, "roles": sorted(summary["roles"]), "task_ids": sorted(summary["task_ids"])}
+            for summary in self.segments
         ]
+        write_file_atomically(self._path(self.MANIFEST_FILE), lambda f: json.dump(manifest, f, ensure_ascii=False))
+        self.manifest_stamp = self._manifest_stamp()
+    
+    def _manifest_stamp(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self._path(self.MANIFEST_FILE))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    
+    def persist(self, new_transitions: List[RoleTransition]):
+        """Append transitions to the active segment, closing it if it is full or old; runs on the storage executor"""
+        if not new_transitions:
+            return
+        if self.lock is None:
+            self._append(new_transitions)
+            return
+        with self.lock:
+            self.refresh()
+            self._append(new_transitions)
+    
+    def refresh(self):
+        """Take in transitions other processes appended since this one last read or wrote; needs the lock"""
+        if self._manifest_stamp() != self.manifest_stamp:
+            # Another process closed a segment
+            self.load()
+            return
+        active = self.active or self._new_segment()
+        path = self._path(active["file"])
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            f.seek(active["bytes"])
+            content = f.read()
+        valid_length = content.rfind(b"\n") + 1
+        if valid_length < len(content):
+            # Nobody writes while the lock is held, so this is a torn write from a process that crashed
+            logger.warning("Discarding incomplete trailing record in %s", active['file'])
+            with open(path, 'r+b') as f:
+                f.truncate(active["bytes"] + valid_length)
+        records = [json.loads(line) for line in content[:valid_length].splitlines() if line.strip()]
+        if not records:
+            return
+        active["bytes"] += valid_length
+        for record in records:
+            self._summarize(active, record)
+        self.active = active
+        self.total += len(records)
+        self.recent.extend(deserialize_transition(record) for record in records)
+    
+    def _append(self, new_transitions: List[RoleTransition]):
+        os.makedirs(self.directory, exist_ok=True)
+        if self.active is None:
+            self.active = self._new_segment()
         
-        has_valid_credentials = (
-            api_key and api_key not in placeholder_values and
-            token and token not in placeholder_values and
-            board_id and board_id not in placeholder_values
-        )
+        records = [serialize_transition(transition) for transition in new_transitions]
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+        with open(self._path(self.active["file"]), 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.active["bytes"] += len(data)
+        for record in records:
+            self._summarize(self.active, record)
         
-        logger.info(f"Trello credentials check: API_KEY={'SET' if api_key and api_key not in placeholder_values else 'NOT SET'}, TOKEN={'SET' if token and token not in placeholder_values else 'NOT SET'}, BOARD_ID={'SET' if board_id and board_id not in placeholder_values else 'NOT SET'}")
+        if (self.active["bytes"] >= self.segment_bytes
+                or time.time() - self.active["opened_at"] >= self.segment_seconds):
+            self.segments.append(self.active)
+            self.active = None
+            self._save_manifest()
+            logger.info("Closed transition segment %s (%s entries)", self.segments[-1]['file'], self.segments[-1]['count'])
+    
+    def _read_segment(self, summary: dict) -> List[dict]:
+        return self._read_records(summary)[0]
+    
+    def _read_records(self, summary: dict) -> Tuple[List[dict], int]:
+        """A segment's complete records and their length in bytes"""
+        path = self._path(summary["file"])
+        if not os.path.exists(path):
+            return [], 0
+        with open(path, 'rb') as f:
+            content = f.read()
         
-        if has_valid_credentials:
-            logger.info("Creating Trello client...")
-            trello_client = TrelloClient(api_key=api_key, token=token)
-            
-            # Find the working board
-            logger.info("Fetching Trello boards...")
-            boards = trello_client.list_boards()
-            logger.info(f"Found {len(boards)} boards")
-            
-            for board in boards:
-                if board.id == board_id:
-                    trello_board = board
-                    trello_mode = TrelloMode.DIRECT_API
-                    logger.info(f"Direct Trello API integration initialized for board: {board.name}")
-                    return True
-            
-            trello_mode = TrelloMode.NONE
-            logger.warning(f"Trello board {board_id} not found - using local storage")
-            return False
-        else:
-            trello_mode = TrelloMode.NONE
-            logger.warning("Trello credentials not configured or using placeholder values - using local storage")
-            return False
-            
-    except Exception as e:
-        trello_mode = TrelloMode.NONE
-        logger.error(f"Trello initialization error: {e} - using local storage")
+        records = []
+        valid_length = 0
+        for line in content.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            valid_length += len(line)
+            if line.strip():
+                records.append(json.loads(line))
+        if valid_length < len(content) and self.lock is None:
+            # A torn write from a crash; drop it so the next append starts on a clean line.
+            # Shared segments may be mid-append by another process, so refresh repairs them under the lock
+            logger.warning("Discarding incomplete trailing record in %s", summary['file'])
+            with open(path, 'r+b') as f:
+                f.truncate(valid_length)
+        return records, valid_length
+    
+    def load(self, legacy_transitions=None):
+        """
+        Read the manifest, rebuild the active segment's summary and refill the ring buffer
+        from the newest segments. History kept by the storage backend before transition
+        segments existed is imported once through legacy_transitions().
+        """
+        manifest_path = self._path(self.MANIFEST_FILE)
+        self.manifest_stamp = self._manifest_stamp()
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                self.segments = [
+                    {**summary, "roles": set(summary["roles"]), "task_ids": set(summary["task_ids"])}
+                    for summary in json.load(f)
+                ]
+        
+        active = self._new_segment()
+        active_records, active["bytes"] = self._read_records(active)
+        self.active = None
+        if active_records:
+            for record in active_records:
+                self._summarize(active, record)
+            self.active = active
+        
+        if not self.segments and self.active is None and legacy_transitions is not None:
+            imported = legacy_transitions()
+            if imported:
+                logger.info("Moving %s transitions into %s/", len(imported), self.directory)
+                self.persist(imported)
+                return self.load()
+        
+        self.total = sum(summary["count"] for summary in self.segments) + (self.active["count"] if self.active else 0)
+        self.recent.clear()
+        newest_first = ([self.active] if self.active else []) + self.segments[::-1]
+        loaded: List[dict] = []
+        for summary in newest_first:
+            if len(loaded) >= self.recent.maxlen:
+                break
+            loaded = (active_records if summary is self.active else self._read_segment(summary)) + loaded
+        self.recent.extend(deserialize_transition(record) for record in loaded[-self.recent.maxlen:])
+    
+    def query(self, role: Optional[str] = None, task_id: Optional[str] = None,
+              since: Optional[datetime] = None, until: Optional[datetime] = None,
+              limit: int = 50) -> List[RoleTransition]:
+        """Newest matching transitions first, opening only segments whose summary allows a match"""
+        def may_match(summary: dict) -> bool:
+            if not summary["count"]:
+                return False
+            if role and role not in summary["roles"]:
+                return False
+            if task_id and task_id not in summary["task_ids"]:
+                return False
+            if since and datetime.fromisoformat(summary["last_at"]) < since:
+                return False
+            if until and datetime.fromisoformat(summary["first_at"]) > until:
+                return False
+            return True
+        
+        matches: List[RoleTransition] = []
+        newest_first = ([self.active] if self.active else []) + self.segments[::-1]
+        for summary in newest_first:
+            if not may_match(summary):
+                continue
+            for record in reversed(self._read_segment(summary)):
+                if role and role not in (record["from_role"], record["to_role"]):
+                    continue
+                if task_id and record.get("task_id") != task_id:
+                    continue
+                timestamp = datetime.fromisoformat(record["timestamp"])
+                if (since and timestamp < since) or (until and timestamp > until):
+                    continue
+                matches.append(deserialize_transition(record))
+                if len(matches) >= limit:
+                    return matches
+        return matches
+    
+    def read_all(self) -> List[RoleTransition]:
+        """The whole history, oldest first"""
+        summaries = self.segments + ([self.active] if self.active else [])
+        return [deserialize_transition(record) for summary in summaries for record in self._read_segment(summary)]
+
+transitions = TransitionLog()
+
+class TaskStorage:
+    """
+    Base class for task and transition persistence backends.
+    
+    Task writes are compare-and-swap: a backend remembers the revision (see task_revision) of
+    each task it last read or wrote, and refuses with TaskVersionConflict to save a changed
+    task unless the stored revision is still the one its change builds on. A save is refused
+    when another writer saved in between, and also when the copy was made from a task object
+    that was replaced after it was read.
+    """
+    
+    mode: StorageMode
+    
+    def __init__(self):
+        # Revision of each task as last read from or written to this backend
+        self.versions: Dict[str, Tuple[int, int]] = {}
+    
+    def remember_versions(self, versions: Dict[str, Tuple[int, int]]):
+        self.versions.update(versions)
+    
+    def stored_versions(self, task_ids: List[str]) -> Dict[str, Tuple[int, int]]:
+        """Revisions currently stored for the given tasks; absent tasks are left out"""
+        # The file backends have no other writer, so what they last wrote is what is stored
+        return {task_id: self.versions[task_id] for task_id in task_ids if task_id in self.versions}
+    
+    def check_versions(self, changed_tasks: List[Task]):
+        """
+        Raise TaskVersionConflict unless every task is stored at the revision its change builds
+        on, or for a task without one (a new task), at the revision this backend last saw
+        """
+        task_ids = [task.id for task in changed_tasks]
+        stored = self.stored_versions(task_ids)
+        for task in changed_tasks:
+            expected = task._base_revision if task._base_revision is not None else self.versions.get(task.id)
+            if stored.get(task.id) != expected:
+                raise TaskVersionConflict(task.id, expected, stored.get(task.id), task_ids)
+    
+    def load_tasks(self) -> Dict[str, Task]:
+        raise NotImplementedError
+    
+    def load_tasks_by_id(self, task_ids: List[str]) -> Dict[str, Task]:
+        """Current stored state of some tasks, e.g. to recover from a conflict"""
+        loaded = self.load_tasks()
+        return {task_id: loaded[task_id] for task_id in task_ids if task_id in loaded}
+    
+    def load_snapshot(self) -> Tuple[Optional["TaskSnapshot"], Dict[str, Task]]:
+        """
+        Load for startup: a columnar snapshot whose tasks are built on demand (if the backend
+        has one) and the tasks that must be applied on top of it
+        """
+        return None, self.load_tasks()
+    
+    def read_stored_records(self) -> Dict[str, dict]:
+        """Serialized form of every stored task"""
+        return {task_id: serialize_task(task) for task_id, task in self.load_tasks().items()}
+    
+    def save_task(self, task: Task):
+        """Persist one changed task"""
+        raise NotImplementedError
+    
+    def save_changed_tasks(self, changed_tasks: List[Task]):
+        """
+        Persist several changed tasks. Storage jobs run on the storage thread, so the tasks
+        must be copies the event loop no longer changes (see storage_copy).
+        """
+        for task in changed_tasks:
+            self.save_task(task)
+    
+    def load_transitions(self) -> List[RoleTransition]:
+        """Transitions this backend kept before they moved to the transition log, for the one-time import"""
+        raise NotImplementedError
+    
+    def exists(self) -> bool:
+        """Whether anything has been persisted yet"""
+        raise NotImplementedError
+    
+    def has_external_changes(self) -> bool:
+        """Cheap check, safe on the event loop, for tasks saved by other processes since the last read"""
         return False
+    
+    def take_external_changes(self) -> Dict[str, Task]:
+        """Tasks other processes saved since the last call, at their stored versions"""
+        return {}
 
-async def create_trello_card_mcp(task: Task) -> Optional[str]:
-    """Create a Trello card for the task via MCP server"""
-    try:
-        # This is a placeholder implementation
-        # In practice, you would call the MCP Trello server's create_card tool
-        # Example:
-        # result = await server.request_context.session.call_tool(
-        #     "create_card",
-        #     {
-        #         "name": f"{task.id}: {task.title}",
-        #         "description": f"**Description:** {task.description}\n\n**Status:** {task.status.value}\n**Assigned to:** {task.assigned_role.value if task.assigned_role else 'Unassigned'}\n**Created:** {task.created_at.strftime('%Y-%m-%d %H:%M:%S')}",
-        #         "list_name": "To Do"
-        #     }
-        # )
+class JsonTaskStorage(TaskStorage):
+    """Rewrites TASKS_FILE on every change"""
+    
+    mode = StorageMode.JSON
+    
+    def __init__(self):
+        super().__init__()
+        # Serialized stored tasks, kept by the storage thread once the first save has read them;
+        # nothing else writes TASKS_FILE in JSON mode, so later saves need not read it again
+        self.records: Optional[Dict[str, dict]] = None
+    
+    def load_tasks(self) -> Dict[str, Task]:
+        loaded: Dict[str, Task] = {}
+        if os.path.exists(TASKS_FILE):
+            with open(TASKS_FILE, 'r', encoding='utf-8') as f:
+                tasks_data = json.load(f)
+            
+            for task_id, task_data in tasks_data.items():
+                loaded[task_id] = deserialize_task(task_data)
         
-        # For now, return a mock card ID
-        # In real implementation, extract card ID from MCP response
-        mock_card_id = f"mcp_card_{task.id}_{int(datetime.now().timestamp())}"
-        print(f"✅ MCP Trello card created: {mock_card_id}", file=sys.stderr)
-        return mock_card_id
+        # Replay a journal left by journal mode so switching back never drops changes
+        self.replay_journal(loaded)
+        return loaded
+    
+    def read_journal_records(self) -> List[dict]:
+        """Serialized tasks the journal puts, oldest first"""
+        if not os.path.exists(TASKS_JOURNAL_FILE):
+            return []
         
-    except Exception as e:
-        print(f"❌ Error creating MCP Trello card: {e}", file=sys.stderr)
-        return None
-
-async def update_trello_card_mcp(task: Task):
-    """Update Trello card when task status changes via MCP server"""
-    if not task.trello_card_id:
-        return
+        with open(TASKS_JOURNAL_FILE, 'rb') as f:
+            content = f.read()
+        
+        records = []
+        valid_length = 0
+        for line in content.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                # A torn final write from a crash; everything before it is intact
+                logger.warning("Discarding incomplete trailing journal record")
+                break
+            valid_length += len(line)
+            if not line.strip():
+                continue
+            
+            record = json.loads(line)
+            if record.get("op") == "put":
+                records.append(record["task"])
+        
+        if valid_length < len(content):
+            # Drop the torn tail so the next append starts on a clean line
+            with open(TASKS_JOURNAL_FILE, 'r+b') as f:
+                f.truncate(valid_length)
+        return records
     
-    try:
-        # This is a placeholder implementation
-        # In practice, you would call the MCP Trello server's update_card tool
-        # Example:
-        # await server.request_context.session.call_tool(
-        #     "update_card",
-        #     {
-        #         "card_id": task.trello_card_id,
-        #         "description": f"**Description:** {task.description}\n\n**Status:** {task.status.value}\n**Assigned to:** {task.assigned_role.value if task.assigned_role else 'Unassigned'}\n**Updated:** {task.updated_at.strftime('%Y-%m-%d %H:%M:%S')}",
-        #         "list_name": {
-        #             TaskStatus.TODO: "To Do",
-        #             TaskStatus.IN_PROGRESS: "In Progress",
-        #             TaskStatus.REVIEW: "Review",
-        #             TaskStatus.DONE: "Done",
-        #             TaskStatus.BLOCKED: "Blocked"
-        #         }.get(task.status, "To Do")
-        #     }
-        # )
+    def replay_journal(self, loaded: Dict[str, Task]) -> int:
+        """Apply journal records on top of a loaded snapshot, returning how many were applied"""
+        records = self.read_journal_records()
+        for record in records:
+            task = deserialize_task(record)
+            loaded[task.id] = task
+        
+        if records:
+            logger.info("Replayed %s journal records", len(records))
+        return len(records)
+    
+    def read_stored_records(self) -> Dict[str, dict]:
+        records: Dict[str, dict] = {}
+        if os.path.exists(TASKS_FILE):
+            with open(TASKS_FILE, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        for record in self.read_journal_records():
+            records[record["id"]] = record
+        return records
+    
+    def write_tasks_file(self, tasks_data: dict):
+        with open(TASKS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(tasks_data, f, ensure_ascii=False, indent=2)
+    
+    def write_records(self, records: Dict[str, dict]):
+        """Replace the stored tasks with these serialized ones"""
+        self.write_tasks_file(records)
         
-        print(f"✅ MCP Trello card updated: {task.trello_card_id}", file=sys.stderr)
+        # The snapshot now holds everything the journal recorded
+        if os.path.exists(TASKS_JOURNAL_FILE):
+            with open(TASKS_JOURNAL_FILE, 'w', encoding='utf-8'):
+                pass
+    
+    def compact(self):
+        """Fold the journal into TASKS_FILE"""
+        self.records = None
+        self.write_records(self.read_stored_records())
+    
+    def save_task(self, task: Task):
+        self.save_changed_tasks([task])
+    
+    def save_changed_tasks(self, changed_tasks: List[Task]):
+        if changed_tasks:
+            self.check_versions(changed_tasks)
+            # Rewrite the stored records rather than the in-memory tasks, which the event loop keeps changing
+            if self.records is None:
+                self.records = self.read_stored_records()
+            self.records.update((task.id, serialize_task(task)) for task in changed_tasks)
+            try:
+                self.write_records(self.records)
+            except Exception:
+                # The records are ahead of the file now; read it again on the next save
+                self.records = None
+                raise
+            self.remember_versions({task.id: task_revision(task) for task in changed_tasks})
+    
+    def load_transitions(self) -> List[RoleTransition]:
+        if not os.path.exists(TRANSITIONS_FILE):
+            return []
         
-    except Exception as e:
-        print(f"❌ Error updating MCP Trello card: {e}", file=sys.stderr)
+        with open(TRANSITIONS_FILE, 'r', encoding='utf-8') as f:
+            transitions_data = json.load(f)
+        
+        return [deserialize_transition(transition_data) for transition_data in transitions_data]
+    
+    def exists(self) -> bool:
+        return os.path.exists(TASKS_FILE)
 
-def create_trello_card(task: Task) -> Optional[str]:
-    """Create a Trello card for the task"""
-    global trello_board
+class JournalTaskStorage(JsonTaskStorage):
+    """Appends each task change to TASKS_JOURNAL_FILE and periodically compacts it into TASKS_FILE"""
     
-    if trello_mode == TrelloMode.MCP:
-        # Simplified MCP integration for Cursor AI compatibility
-        logger.info("MCP Trello mode requested, but using simplified implementation for Cursor AI")
-        mock_card_id = f"mcp_card_{task.id}_{int(datetime.now().timestamp())}"
-        print(f"✅ MCP Trello card created (mock): {mock_card_id}", file=sys.stderr)
-        return mock_card_id
+    mode = StorageMode.JOURNAL
     
-    elif trello_mode == TrelloMode.DIRECT_API:
-        # Use direct API integration
-        if not trello_board:
-            logger.warning("Trello board not available for direct API integration")
-            return None
+    def __init__(self, compact_threshold: int = JOURNAL_COMPACT_THRESHOLD):
+        super().__init__()
+        self.compact_threshold = compact_threshold
+        self.record_count = 0
+    
+    def replay_journal(self, loaded: Dict[str, Task]) -> int:
+        self.record_count = super().replay_journal(loaded)
+        return self.record_count
+    
+    def write_tasks_file(self, tasks_data: dict):
+        write_file_atomically(TASKS_FILE, lambda f: json.dump(tasks_data, f, ensure_ascii=False))
+    
+    def write_records(self, records: Dict[str, dict]):
+        super().write_records(records)
+        self.record_count = 0
+    
+    def save_changed_tasks(self, changed_tasks: List[Task]):
+        if not changed_tasks:
+            return
+        self.check_versions(changed_tasks)
+        records = "".join(
+            json.dumps({"op": "put", "task": serialize_task(task)}, ensure_ascii=False) + "\n"
+            for task in changed_tasks
+        )
+        with open(TASKS_JOURNAL_FILE, 'a', encoding='utf-8') as f:
+            f.write(records)
+            f.flush()
+            os.fsync(f.fileno())
+        self.remember_versions({task.id: task_revision(task) for task in changed_tasks})
+        self.record_count += len(changed_tasks)
+        logger.debug("Journaled %s tasks (%s records since last compaction)", len(changed_tasks), self.record_count)
         
-        try:
-            # Find "To Do" list or create one
-            target_list = None
-            for lst in trello_board.list_lists():
-                if lst.name == "To Do":
-                    target_list = lst
-                    break
-            
-            if not target_list:
-                # Create "To Do" list if it doesn't exist
-                target_list = trello_board.add_list("To Do")
-            
-            # Create card
-            card = target_list.add_card(
-                name=f"{task.id}: {task.title}",
-                desc=f"**Description:** {task.description}\n\n**Status:** {task.status.value}\n**Assigned to:** {task.assigned_role.value if task.assigned_role else 'Unassigned'}\n**Created:** {task.created_at.strftime('%Y-%m-%d %H:%M:%S')}",
-                labels=None,
-                due=None
-            )
-            
-            logger.info(f"Trello card created successfully: {card.id}")
-            return card.id
-            
-        except Exception as e:
-            logger.error(f"Error creating Trello card: {e}")
-            print(f"Error creating Trello card: {e}", file=sys.stderr)
-            return None
+        if self.record_count >= self.compact_threshold:
+            logger.info("Compacting task journal after %s records", self.record_count)
+            self.compact()
     
-    else:
-        # No Trello integration available
-        logger.info("No Trello integration available")
-        return None
+    def exists(self) -> bool:
+        return os.path.exists(TASKS_FILE) or os.path.exists(TASKS_JOURNAL_FILE)
 
-def update_trello_card(task: Task):
-    """Update Trello card when task status changes"""
-    if trello_mode == TrelloMode.MCP:
-        # Simplified MCP integration for Cursor AI compatibility
-        logger.info(f"MCP Trello card update requested for task {task.id}")
-        print(f"✅ MCP Trello card updated (mock): {task.trello_card_id}", file=sys.stderr)
+class SharedTaskStorage(JournalTaskStorage):
+    """
+    Journal mode for several server processes sharing one working directory.
     
-    elif trello_mode == TrelloMode.DIRECT_API:
-        # Use direct API integration
-        if not task.trello_card_id or not trello_board:
-            logger.warning("Cannot update Trello card: missing card ID or board")
+    Appends and compactions hold an exclusive lock on TASKS_LOCK_FILE, and compaction
+    replaces both TASKS_FILE and the journal through temp files and renames. Each process
+    remembers how far it has read the journal: a changed size, mtime or inode tells it that
+    another process wrote, and it then reads only the new records (or, after a compaction
+    replaced the journal, keeps only the tasks whose version differs from what it last saw).
+    Writes first take in those records, so compare-and-swap checks see other processes' versions.
+    """
+    
+    mode = StorageMode.SHARED
+    
+    def __init__(self, compact_threshold: int = JOURNAL_COMPACT_THRESHOLD, lock_path: str = TASKS_LOCK_FILE):
+        super().__init__(compact_threshold)
+        self.lock = FileLock(lock_path)
+        # Revision of each task in the files, including revisions written by other processes
+        self.disk_versions: Dict[str, Tuple[int, int]] = {}
+        # The journal file read so far (device and inode), its length consumed, and its stat when last read
+        self.journal_id: Optional[tuple] = None
+        self.offset = 0
+        self.stamp: Optional[tuple] = None
+        # Tasks other processes saved that take_external_changes has not handed out yet
+        self.pending: Dict[str, Task] = {}
+    
+    @staticmethod
+    def _stamp(stat: os.stat_result) -> tuple:
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    
+    def stored_versions(self, task_ids: List[str]) -> Dict[str, Tuple[int, int]]:
+        return {task_id: self.disk_versions[task_id] for task_id in task_ids if task_id in self.disk_versions}
+    
+    def load_tasks(self) -> Dict[str, Task]:
+        with self.lock:
+            loaded = super().load_tasks()
+            self._mark_read()
+        self.disk_versions = {task_id: task_revision(task) for task_id, task in loaded.items()}
+        return loaded
+    
+    def _mark_read(self):
+        """Record the journal as read to its end; only valid with the lock held"""
+        try:
+            stat = os.stat(TASKS_JOURNAL_FILE)
+        except FileNotFoundError:
+            self.journal_id, self.offset, self.stamp = None, 0, None
+            return
+        self.journal_id = (stat.st_dev, stat.st_ino)
+        self.offset = stat.st_size
+        self.stamp = self._stamp(stat)
+    
+    def _read_changes(self):
+        """Take in the records other processes wrote since the last read"""
+        try:
+            f = open(TASKS_JOURNAL_FILE, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            stat = os.fstat(f.fileno())
+            if (stat.st_dev, stat.st_ino) != self.journal_id or stat.st_size < self.offset:
+                replaced = True
+            else:
+                replaced = False
+                f.seek(self.offset)
+                content = f.read()
+        if replaced:
+            self._reload_all()
             return
         
+        # A record still being appended has no newline yet; it is read on the next change
+        valid_length = content.rfind(b"\n") + 1
+        changed = {}
+        for line in content[:valid_length].splitlines():
+            if line.strip():
+                record = json.loads(line)
+                if record.get("op") == "put":
+                    task = deserialize_task(record["task"])
+                    changed[task.id] = task
+        self.offset += valid_length
+        self.stamp = self._stamp(stat)
+        self.record_count += len(changed)
+        self._absorb(changed)
+    
+    def _reload_all(self):
+        """Read the files again after another process compacted, keeping the tasks whose revision moved"""
+        with self.lock:
+            loaded = JsonTaskStorage.load_tasks(self)
+            self._mark_read()
+        logger.info("Task journal was compacted by another process; reloaded %s tasks", len(loaded))
+        self._absorb({
+            task_id: task for task_id, task in loaded.items()
+            if task_revision(task) != self.disk_versions.get(task_id)
+        })
+    
+    def _absorb(self, changed: Dict[str, Task]):
+        for task_id, task in changed.items():
+            if task_revision(task) >= self.disk_versions.get(task_id, (0, 0)):
+                self.disk_versions[task_id] = task_revision(task)
+                self.pending[task_id] = task
+    
+    def has_external_changes(self) -> bool:
         try:
-            # Find the card
-            for card in trello_board.get_cards():
-                if card.id == task.trello_card_id:
-                    # Update card description
-                    card.set_description(
-                        f"**Description:** {task.description}\n\n**Status:** {task.status.value}\n**Assigned to:** {task.assigned_role.value if task.assigned_role else 'Unassigned'}\n**Updated:** {task.updated_at.strftime('%Y-%m-%d %H:%M:%S')}"
-                    )
-                    
-                    # Move card to appropriate list based on status
-                    target_list_name = {
-                        TaskStatus.TODO: "To Do",
-                        TaskStatus.IN_PROGRESS: "In Progress",
-                        TaskStatus.REVIEW: "Review",
-                        TaskStatus.DONE: "Done",
-                        TaskStatus.BLOCKED: "Blocked"
-                    }.get(task.status, "To Do")
-                    
-                    # Find target list
-                    target_list = None
-                    for lst in trello_board.list_lists():
-                        if lst.name == target_list_name:
-                            target_list = lst
-                            break
-                    
-                    if target_list and card.list_id != target_list.id:
-                        card.change_list(target_list.id)
-                    
-                    logger.info(f"Trello card updated successfully: {task.trello_card_id}")
-                    break
-                    
-        except Exception as e:
-            logger.error(f"Error updating Trello card: {e}")
-            print(f"Error updating Trello card: {e}", file=sys.stderr)
+            return self._stamp(os.stat(TASKS_JOURNAL_FILE)) != self.stamp
+        except FileNotFoundError:
+            return False
     
-    else:
-        # No Trello integration available
-        logger.info("No Trello integration available for updates")
-        return
+    def take_external_changes(self) -> Dict[str, Task]:
+        self._read_changes()
+        taken, self.pending = self.pending, {}
+        return taken
+    
+    def _load_stored(self) -> Dict[str, Task]:
+        """Everything in TASKS_FILE and the journal, after taking in other processes' new records"""
+        with self.lock:
+            self._read_changes()
+            stored = JsonTaskStorage.load_tasks(self)
+            self._mark_read()
+        return stored
+    
+    def load_tasks_by_id(self, task_ids: List[str]) -> Dict[str, Task]:
+        stored = self._load_stored()
+        return {task_id: stored[task_id] for task_id in task_ids if task_id in stored}
+    
+    def write_records(self, records: Dict[str, dict]):
+        with self.lock:
+            self.write_tasks_file(records)
+            # A new journal file rather than a truncated one, so other processes notice the compaction
+            write_file_atomically(TASKS_JOURNAL_FILE, lambda f: None)
+            self._mark_read()
+            self.record_count = 0
+            self.disk_versions = {
+                task_id: (record.get("version", 0), record.get("sync_revision", 0)) for task_id, record in records.items()
+            }
+    
+    def compact(self):
+        with self.lock:
+            # Take in other processes' records first; once folded in, they are no longer read as changes
+            self._read_changes()
+            self.write_records(self.read_stored_records())
+    
+    def save_changed_tasks(self, changed_tasks: List[Task]):
+        if not changed_tasks:
+            return
+        with self.lock:
+            self._read_changes()
+            self.check_versions(changed_tasks)
+            records = "".join(
+                json.dumps({"op": "put", "task": serialize_task(task)}, ensure_ascii=False) + "\n"
+                for task in changed_tasks
+            ).encode("utf-8")
+            with open(TASKS_JOURNAL_FILE, 'ab') as f:
+                stat = os.fstat(f.fileno())
+                if self.journal_id is None:
+                    self.journal_id = (stat.st_dev, stat.st_ino)
+                if stat.st_size > self.offset:
+                    # Nobody writes while the lock is held, so this is a torn write from a process that crashed
+                    logger.warning("Discarding incomplete trailing journal record")
+                    f.truncate(self.offset)
+                f.write(records)
+                f.flush()
+                os.fsync(f.fileno())
+                self.offset = f.tell()
+                self.stamp = self._stamp(os.fstat(f.fileno()))
+            versions = {task.id: task_revision(task) for task in changed_tasks}
+            self.disk_versions.update(versions)
+            self.remember_versions(versions)
+            self.record_count += len(changed_tasks)
+            
+            if self.record_count >= self.compact_threshold:
+                logger.info("Compacting task journal after %s records", self.record_count)
+                self.compact()
 
-server = Server("task-orchectrator-mcp")
+SNAPSHOT_MAGIC = b"TOSN"
+SNAPSHOT_VERSION = 1
+# Magic, format version, task_counter, then the byte lengths of the index and column sections
+SNAPSHOT_HEADER = struct.Struct("<4sHxxIII")
+SNAPSHOT_INDEXED_FIELDS = ("status", "assigned_role", "created_by")
 
-@server.list_resources()
-async def handle_list_resources() -> list[types.Resource]:
+class TaskSnapshot:
     """
-    List available task resources.
-    Each task is exposed as a resource with a custom task:// URI scheme.
+    Tasks decoded from a snapshot file and kept as columns of serialized values.
+    
+    Indexes and the dependency graph can be built straight from the columns;
+    Task objects are only built (and validated) by build_task when a row is needed.
     """
-    return [
-        types.Resource(
-            uri=AnyUrl(f"task://internal/{task.id}"),
-            name=f"Task: {task.title}",
-            description=f"Task {task.id}: {task.description}",
-            mimeType="application/json",
+    
+    def __init__(self, task_counter: int, fields: List[str], columns: List[list], indexes: dict):
+        self.task_counter = task_counter
+        self.fields = fields
+        self.columns = dict(zip(fields, columns))
+        # Task ids by serialized status, assigned role ("" when unassigned) and creator
+        self.indexes = indexes
+    
+    @property
+    def ids(self) -> List[str]:
+        return self.columns["id"]
+    
+    def record(self, row: int) -> dict:
+        return {field: self.columns[field][row] for field in self.fields}
+    
+    def records(self, rows: List[int]) -> List[dict]:
+        return [self.record(row) for row in rows]
+    
+    def build_task(self, row: int) -> Task:
+        return deserialize_task(self.record(row))
+    
+    def build_tasks(self, rows: List[int]) -> List[Task]:
+        return [self.build_task(row) for row in rows]
+    
+    def version(self, row: int) -> int:
+        """Version of the task when the snapshot was taken; snapshots written before task versions have none"""
+        versions = self.columns.get("version")
+        return versions[row] if versions else 0
+    
+    def revisions(self) -> Dict[str, Tuple[int, int]]:
+        """Revision (see task_revision) of every task when the snapshot was taken"""
+        zeros = [0] * len(self.ids)
+        return dict(zip(self.ids, zip(self.columns.get("version") or zeros, self.columns.get("sync_revision") or zeros)))
+    
+    def index_fields(self, row: int) -> tuple:
+        assigned_role = self.columns["assigned_role"][row]
+        return (
+            TaskStatus(self.columns["status"][row]),
+            RoleType(assigned_role) if assigned_role else None,
+            RoleType(self.columns["created_by"][row]),
         )
-        for task in tasks.values()
-    ]
 
-@server.read_resource()
-async def handle_read_resource(uri: AnyUrl) -> str:
+def write_task_snapshot(path: str, records: List[dict], task_counter: int):
+    """Write serialized tasks as a columnar msgpack snapshot with a fixed-size header"""
+    fields = list(Task.model_fields)
+    defaults = {field: info.default for field, info in Task.model_fields.items()}
+    columns = [[record.get(field, defaults[field]) for record in records] for field in fields]
+    
+    indexes = {name: {} for name in SNAPSHOT_INDEXED_FIELDS}
+    for record in records:
+        for name in SNAPSHOT_INDEXED_FIELDS:
+            indexes[name].setdefault(record[name] or "", []).append(record["id"])
+    
+    meta = msgpack.packb({"task_count": len(records), "indexes": indexes})
+    body = msgpack.packb({"fields": fields, "columns": columns})
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, task_counter, len(meta), len(body))
+    
+    def write(f):
+        f.write(header)
+        f.write(meta)
+        f.write(body)
+    write_file_atomically(path, write, binary=True)
+
+def read_task_snapshot(path: str) -> TaskSnapshot:
+    """Decode a snapshot file, unpacking straight from a memory map of it"""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        magic, version, task_counter, meta_length, body_length = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} task snapshot")
+        
+        with memoryview(data) as view:
+            meta_start = SNAPSHOT_HEADER.size
+            body_start = meta_start + meta_length
+            meta = msgpack.unpackb(view[meta_start:body_start])
+            body = msgpack.unpackb(view[body_start:body_start + body_length])
+    
+    return TaskSnapshot(task_counter, body["fields"], body["columns"], meta["indexes"])
+
+class SnapshotTaskStorage(JournalTaskStorage):
     """
-    Read a specific task's content by its URI.
+    Journal mode that compacts into a columnar msgpack snapshot (TASKS_SNAPSHOT_FILE) instead of TASKS_FILE.
+    The snapshot header stores task_counter and the indexes are stored with the tasks, so startup skips
+    rebuilding them, and tasks are turned into Task objects only when first used.
     """
-    if uri.scheme != "task":
-        raise ValueError(f"Unsupported URI scheme: {uri.scheme}")
+    
+    mode = StorageMode.SNAPSHOT
+    
+    def __init__(self, path: str = TASKS_SNAPSHOT_FILE, compact_threshold: int = JOURNAL_COMPACT_THRESHOLD):
+        super().__init__(compact_threshold)
+        self.path = path
+    
+    def load_snapshot(self) -> Tuple[Optional[TaskSnapshot], Dict[str, Task]]:
+        if not os.path.exists(self.path):
+            # First start after switching from json or journal mode; the next compaction writes the snapshot
+            return None, super().load_tasks()
+        
+        snapshot = read_task_snapshot(self.path)
+        replayed: Dict[str, Task] = {}
+        self.replay_journal(replayed)
+        return snapshot, replayed
+    
+    def load_tasks(self) -> Dict[str, Task]:
+        snapshot, replayed = self.load_snapshot()
+        loaded: Dict[str, Task] = {}
+        if snapshot is not None:
+            loaded = {task_id: snapshot.build_task(row) for row, task_id in enumerate(snapshot.ids)}
+        loaded.update(replayed)
+        return loaded
+    
+    def read_stored_records(self) -> Dict[str, dict]:
+        if not os.path.exists(self.path):
+            return super().read_stored_records()
+        snapshot = read_task_snapshot(self.path)
+        records = {record["id"]: record for record in snapshot.records(range(len(snapshot.ids)))}
+        for record in self.read_journal_records():
+            records[record["id"]] = record
+        return records
+    
+    def write_records(self, records: Dict[str, dict]):
+        task_counter = max((task_number(task_id) for task_id in records), default=0)
+        write_task_snapshot(self.path, list(records.values()), task_counter)
+        
+        # The snapshot now holds everything the journal recorded
+        if os.path.exists(TASKS_JOURNAL_FILE):
+            with open(TASKS_JOURNAL_FILE, 'w', encoding='utf-8'):
+                pass
+        self.record_count = 0
+    
+    def exists(self) -> bool:
+        return os.path.exists(self.path) or super().exists()
 
-    task_id = uri.path.lstrip("/") if uri.path else None
-    if task_id and task_id in tasks:
-        return tasks[task_id].model_dump_json()
-    raise ValueError(f"Task not found: {task_id}")
+class SqliteTaskSnapshot(TaskSnapshot):
+    """
+    The indexed columns of every task in the SQLite database, read at startup instead of the tasks.
+    
+    Rows are built from the database when first used, so a task another process saved since
+    startup is built at its stored version.
+    """
+    
+    FIELDS = ["id", "status", "assigned_role", "created_by", "dependencies", "version", "sync_revision"]
+    
+    def __init__(self, storage: "SqliteTaskStorage"):
+        self.storage = storage
+        rows = storage.connection.execute(f"SELECT {', '.join(self.FIELDS)} FROM tasks ORDER BY rowid").fetchall()
+        columns = [list(column) for column in zip(*rows)] or [[] for _ in self.FIELDS]
+        columns[self.FIELDS.index("dependencies")] = [
+            json.loads(dependencies) for dependencies in columns[self.FIELDS.index("dependencies")]
+        ]
+        fields = dict(zip(self.FIELDS, columns))
+        indexes = {name: {} for name in SNAPSHOT_INDEXED_FIELDS}
+        for name in SNAPSHOT_INDEXED_FIELDS:
+            for task_id, value in zip(fields["id"], fields[name]):
+                indexes[name].setdefault(value or "", []).append(task_id)
+        task_counter = max((task_number(task_id) for task_id in fields["id"]), default=0)
+        super().__init__(task_counter, self.FIELDS, columns, indexes)
+    
+    def _load(self, rows: List[int]) -> List[Task]:
+        task_ids = [self.ids[row] for row in rows]
+        loaded = self.storage.load_tasks_by_id(task_ids)
+        return [loaded[task_id] for task_id in task_ids]
+    
+    def record(self, row: int) -> dict:
+        return self.records([row])[0]
+    
+    def records(self, rows: List[int]) -> List[dict]:
+        return [serialize_task(task) for task in self._load(rows)]
+    
+    def build_task(self, row: int) -> Task:
+        return self.build_tasks([row])[0]
+    
+    def build_tasks(self, rows: List[int]) -> List[Task]:
+        built = self._load(rows)
+        self.storage.remember_versions({task.id: task_revision(task) for task in built})
+        return built
 
-@server.list_tools()
-async def handle_list_tools() -> list[types.Tool]:
+class SqliteTaskStorage(TaskStorage):
     """
-    List available tools for task and role management.
+    Stores tasks and comments in an embedded SQLite database (WAL mode).
+    
+    Startup reads only the columns the indexes need (SqliteTaskSnapshot); each task is
+    read from the database when it is first used.
     """
-    tools = [
-        types.Tool(
-            name="create_task",
-            description="Create a new task (Orchestrator, Architect, Analyst)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "title": {"type": "string", "description": "Task title"},
-                    "description": {"type": "string", "description": "Task description"},
-                    "dependencies": {
-                        "type": "array", 
-                        "items": {"type": "string"},
-                        "description": "List of task dependencies"
-                    },
-                    "create_trello_card": {
-                        "type": "boolean",
-                        "description": "Create corresponding Trello card",
-                        "default": True
-                    }
-                },
-                "required": ["title", "description"],
-            },
-        ),
-        types.Tool(
-            name="assign_task",
-            description="Assign task to a specific role (Orchestrator, Architect)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "task_id": {"type": "string", "description": "Task ID to assign"},
-                    "role": {
-                        "type": "string", 
-                        "enum": ["architect", "coder", "analyst", "devops"],
-                        "description": "Role to assign the task to"
-                    }
-                },
-                "required": ["task_id", "role"],
-            },
-        ),
-        types.Tool(
-            name="complete_task",
-            description="Complete a task and return control to Orchestrator",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "task_id": {"type": "string", "description": "Task ID to complete"},
-                    "completion_notes": {"type": "string", "description": "Notes about completion"}
-                },
-                "required": ["task_id"],
-            },
-        ),
-        types.Tool(
-            name="switch_role",
-            description="Switch to a different role (Orchestrator only)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "role": {
-                        "type": "string", 
-                        "enum": ["architect", "coder", "analyst", "devops"],
-                        "description": "Role to switch to"
-                    },
-                    "reason": {"type": "string", "description": "Reason for switching"}
-                },
-                "required": ["role"],
-            },
-        ),
-        types.Tool(
-            name="return_to_orchestrator",
-            description="Return control to Orchestrator",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "reason": {"type": "string", "description": "Reason for returning"}
-                },
-            },
-        ),
-        types.Tool(
-            name="get_status",
-            description="Get current system status",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-            },
-        ),
-        types.Tool(
-            name="list_tasks",
-            description="List tasks with optional status filter",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "status": {
-                        "type": "string", 
-                        "enum": ["TODO", "IN_PROGRESS", "REVIEW", "DONE", "BLOCKED"],
-                        "description": "Filter by task status"
-                    }
-                },
-            },
-        ),
-        types.Tool(
-            name="export_tasks",
-            description="Export tasks to local JSON file",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-            },
-        ),
-        types.Tool(
-            name="check_mcp_trello",
-            description="Check if MCP Trello server is available",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-            },
-        ),
-        types.Tool(
-            name="show_role_permissions",
-            description="Show current role permissions and capabilities",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-            },
-        ),
-        types.Tool(
-            name="list_roles",
-            description="List all available roles with their permissions",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-            },
-        ),
-        types.Tool(
-            name="write_comment",
-            description="Add a comment to a task (available to all roles)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "task_id": {"type": "string", "description": "Task ID to comment on"},
-                    "comment": {"type": "string", "description": "Comment text to add"}
-                },
-                "required": ["task_id", "comment"],
-            },
-        ),
-    ]
     
-    # Add Trello-specific tools if available
-    if TRELLO_AVAILABLE:
-        tools.append(
-            types.Tool(
-                name="sync_to_trello",
-                description="Sync all tasks to Trello board",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                },
-            )
-        )
+    mode = StorageMode.SQLITE
     
-    return tools
-
-@server.call_tool()
-async def handle_call_tool(
-    name: str, arguments: dict | None
-) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
-    """
-    Handle tool execution requests for task and role management.
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            status TEXT NOT NULL,
+            assigned_role TEXT,
+            created_by TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            dependencies TEXT NOT NULL,
+            git_branch TEXT,
+            subtasks TEXT NOT NULL,
+            trello_card_id TEXT,
+            trello_synced_hash TEXT,
+            trello_synced_at TEXT,
+            priority INTEGER NOT NULL DEFAULT 0,
+            version INTEGER NOT NULL DEFAULT 0,
+            sync_revision INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+        CREATE INDEX IF NOT EXISTS idx_tasks_assigned_role ON tasks(assigned_role);
+        CREATE INDEX IF NOT EXISTS idx_tasks_created_by ON tasks(created_by);
+        
+        CREATE TABLE IF NOT EXISTS task_dependencies (
+            task_id TEXT NOT NULL,
+            depends_on TEXT NOT NULL,
+            PRIMARY KEY (task_id, depends_on)
+        );
+        CREATE INDEX IF NOT EXISTS idx_task_dependencies_depends_on ON task_dependencies(depends_on);
+        
+        CREATE TABLE IF NOT EXISTS comments (
+            task_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            role TEXT,
+            comment TEXT,
+            timestamp TEXT,
+            PRIMARY KEY (task_id, position)
+        );
+        
+        -- Only read to import transitions saved before they moved to the transition log
+        CREATE TABLE IF NOT EXISTS transitions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            from_role TEXT NOT NULL,
+            to_role TEXT NOT NULL,
+            task_id TEXT,
+            reason TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_transitions_task_id ON transitions(task_id);
     """
-    global current_role, tasks, transitions, task_counter
     
-    if not arguments:
-        arguments = {}
+    # Columns added after the first release of the schema, applied to older databases on open
+    ADDED_TASK_COLUMNS = [
+        ("trello_synced_hash", "TEXT"),
+        ("trello_synced_at", "TEXT"),
+        ("priority", "INTEGER NOT NULL DEFAULT 0"),
+        ("version", "INTEGER NOT NULL DEFAULT 0"),
+        ("sync_revision", "INTEGER NOT NULL DEFAULT 0"),
+    ]
     
-    try:
-        if name == "create_task":
-            if not has_permission(current_role, Permission.CREATE_TASK):
-                return [types.TextContent(
-                    type="text",
-                    text=f"❌ Error: Role {current_role.value} cannot create tasks. Required permission: {Permission.CREATE_TASK.value}"
-                )]
-            
-            title = arguments.get("title")
-            description = arguments.get("description")
-            dependencies = arguments.get("dependencies", [])
-            should_create_trello_card = arguments.get("create_trello_card", True)
-            
-            if not title or not description:
-                return [types.TextContent(
-                    type="text",
-                    text="❌ Error: Title and description are required"
-                )]
-            
-            task_counter += 1
-            task_id = f"TASK-{task_counter:03d}"
-            
-            task = Task(
+    # Ids per statement in IN (...) lookups, below SQLite's bound parameter limit
+    QUERY_CHUNK = 500
+    
+    def __init__(self, path: str = TASKS_DB_FILE):
+        super().__init__()
+        self.path = path
+        # One connection per thread: writes run on the storage executor while tasks
+        # are read on the event loop when first used, and WAL lets them proceed side by side
+        self._local = threading.local()
+    
+    @property
+    def connection(self):
+        # Opened on first use so importing the module never touches the working directory
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            import sqlite3
+            connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(self.SCHEMA)
+            existing_columns = {row[1] for row in connection.execute("PRAGMA table_info(tasks)")}
+            for column, column_type in self.ADDED_TASK_COLUMNS:
+                if column not in existing_columns:
+                    connection.execute(f"ALTER TABLE tasks ADD COLUMN {column} {column_type}")
+            self._local.connection = connection
+        return connection
+    
+    def load_tasks(self) -> Dict[str, Task]:
+        return self._load_tasks()
+    
+    def load_snapshot(self) -> Tuple[Optional[TaskSnapshot], Dict[str, Task]]:
+        return SqliteTaskSnapshot(self), {}
+    
+    def load_tasks_by_id(self, task_ids: List[str]) -> Dict[str, Task]:
+        loaded: Dict[str, Task] = {}
+        for start in range(0, len(task_ids), self.QUERY_CHUNK):
+            loaded.update(self._load_tasks(task_ids[start:start + self.QUERY_CHUNK]))
+        return loaded
+    
+    def _load_tasks(self, task_ids: Optional[List[str]] = None) -> Dict[str, Task]:
+        """Build the given tasks, or all tasks"""
+        db = self.connection
+        params = task_ids or []
+        id_filter = f" IN ({', '.join('?' * len(task_ids))})" if task_ids is not None else ""
+        comments_by_task: Dict[str, List[Dict[str, str]]] = {}
+        for task_id, role, comment, timestamp in db.execute(
+            "SELECT task_id, role, comment, timestamp FROM comments"
+            f"{' WHERE task_id' + id_filter if id_filter else ''} ORDER BY task_id, position", params
+        ):
+            comments_by_task.setdefault(task_id, []).append(
+                {"role": role, "comment": comment, "timestamp": timestamp}
+            )
+        
+        loaded: Dict[str, Task] = {}
+        for row in db.execute(
+            "SELECT id, title, description, status, assigned_role, created_by, created_at, "
+            "updated_at, dependencies, git_branch, subtasks, trello_card_id, trello_synced_hash, "
+            f"trello_synced_at, priority, version, sync_revision FROM tasks{' WHERE id' + id_filter if id_filter else ''}",
+            params
+        ):
+            (task_id, title, description, status, assigned_role, created_by, created_at,
+             updated_at, dependencies, git_branch, subtasks, trello_card_id, trello_synced_hash,
+             trello_synced_at, priority, version, sync_revision) = row
+            loaded[task_id] = Task(
                 id=task_id,
                 title=title,
                 description=description,
-                status=TaskStatus.TODO,
-                assigned_role=None,
-                created_by=RoleType.ORCHESTRATOR,
-                created_at=datetime.now(),
-                updated_at=datetime.now(),
-                dependencies=dependencies,
-                git_branch=None,
-                comments=[],
-                subtasks=[],
-                trello_card_id=None
+                status=TaskStatus(status),
+                assigned_role=RoleType(assigned_role) if assigned_role else None,
+                created_by=RoleType(created_by),
+                created_at=datetime.fromisoformat(created_at),
+                updated_at=datetime.fromisoformat(updated_at),
+                dependencies=json.loads(dependencies),
+                git_branch=git_branch,
+                comments=comments_by_task.get(task_id, []),
+                subtasks=json.loads(subtasks),
+                priority=priority,
+                trello_card_id=trello_card_id,
+                trello_synced_hash=trello_synced_hash,
+                trello_synced_at=datetime.fromisoformat(trello_synced_at) if trello_synced_at else None,
+                version=version,
+                sync_revision=sync_revision
             )
-            
-            # Create Trello card if requested and available
-            trello_card_id = None
-            if should_create_trello_card and trello_mode != TrelloMode.NONE:
-                trello_card_id = create_trello_card(task)
-                if trello_card_id:
-                    task.trello_card_id = trello_card_id
-                    if trello_mode == TrelloMode.MCP:
-                        print(f"✅ MCP Trello card created: {trello_card_id}", file=sys.stderr)
-                    else:
-                        print(f"✅ Trello card created: {trello_card_id}", file=sys.stderr)
-                else:
-                    print("⚠️ Failed to create Trello card, saving locally", file=sys.stderr)
-            else:
-                print("ℹ️ Trello not available, saving task locally", file=sys.stderr)
-            
-            tasks[task_id] = task
-            
-            # Save locally
-            save_tasks_locally()
-            
-            await server.request_context.session.send_resource_list_changed()
-            
-            trello_info = f" (Trello card created: {task.trello_card_id})" if task.trello_card_id else " (saved locally)"
-            return [types.TextContent(
-                type="text",
-                text=f"✅ Task {task_id} created successfully: {title}{trello_info}"
-            )]
-        
-        elif name == "assign_task":
-            if not has_permission(current_role, Permission.ASSIGN_TASK):
-                return [types.TextContent(
-                    type="text",
-                    text=f"❌ Error: Role {current_role.value} cannot assign tasks. Required permission: {Permission.ASSIGN_TASK.value}"
-                )]
-            
-            task_id = arguments.get("task_id")
-            role_name = arguments.get("role")
-            
-            if not task_id or not role_name:
-                return [types.TextContent(
-                    type="text",
-                    text="❌ Error: Task ID and role are required"
-                )]
-            
-            if task_id not in tasks:
-                return [types.TextContent(
-                    type="text",
-                    text=f"❌ Error: Task {task_id} not found"
-                )]
-            
-            try:
-                role = RoleType(role_name)
-            except ValueError:
-                return [types.TextContent(
-                    type="text",
-                    text=f"❌ Error: Invalid role: {role_name}"
-                )]
-            
-            task = tasks[task_id]
-            
-            # Check dependencies
-            for dep_id in task.dependencies:
-                if dep_id in tasks and tasks[dep_id].status != TaskStatus.DONE:
-                    return [types.TextContent(
-                        type="text",
-                        text=f"❌ Error: Task {task_id} is blocked by dependency {dep_id}"
-                    )]
-            
-            task.assigned_role = role
-            task.status = TaskStatus.IN_PROGRESS
-            task.updated_at = datetime.now()
-            
-            # Update Trello card if available
-            if trello_mode != TrelloMode.NONE:
-                update_trello_card(task)
-                if trello_mode == TrelloMode.MCP:
-                    print(f"✅ MCP Trello card updated for task {task_id}", file=sys.stderr)
-                else:
-                    print(f"✅ Trello card updated for task {task_id}", file=sys.stderr)
-            else:
-                print(f"ℹ️ Trello not available, updated task {task_id} locally", file=sys.stderr)
-            
-            # Create transition
-            transition = RoleTransition(
-                from_role=RoleType.ORCHESTRATOR,
-                to_role=role,
-                task_id=task_id,
-                reason=f"Task {task_id} assigned to {role.value}",
-                timestamp=datetime.now()
+        return loaded
+    
+    def _write_task(self, db, task: Task):
+        db.execute(
+            "INSERT OR REPLACE INTO tasks (id, title, description, status, assigned_role, created_by, "
+            "created_at, updated_at, dependencies, git_branch, subtasks, trello_card_id, "
+            "trello_synced_hash, trello_synced_at, priority, version, sync_revision) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                task.id,
+                task.title,
+                task.description,
+                task.status.value,
+                task.assigned_role.value if task.assigned_role else None,
+                task.created_by.value,
+                task.created_at.isoformat(),
+                task.updated_at.isoformat(),
+                json.dumps(task.dependencies),
+                task.git_branch,
+                json.dumps(task.subtasks),
+                task.trello_card_id,
+                task.trello_synced_hash,
+                task.trello_synced_at.isoformat() if task.trello_synced_at else None,
+                task.priority,
+                task.version,
+                task.sync_revision,
             )
-            transitions.append(transition)
-            
-            # Save locally
-            save_tasks_locally()
-            save_transitions_locally()
-            
-            await server.request_context.session.send_resource_list_changed()
-            
-            return [types.TextContent(
-                type="text",
-                text=f"✅ Task {task_id} assigned to {role.value}"
-            )]
+        )
+        db.execute("DELETE FROM task_dependencies WHERE task_id = ?", (task.id,))
+        db.executemany(
+            "INSERT OR IGNORE INTO task_dependencies (task_id, depends_on) VALUES (?, ?)",
+            [(task.id, dep_id) for dep_id in task.dependencies]
+        )
         
-        elif name == "complete_task":
-            task_id = arguments.get("task_id")
-            completion_notes = arguments.get("completion_notes", "")
-            
-            if not task_id:
-                return [types.TextContent(
-                    type="text",
-                    text="❌ Error: Task ID is required"
-                )]
-            
-            if task_id not in tasks:
-                return [types.TextContent(
-                    type="text",
-                    text=f"❌ Error: Task {task_id} not found"
-                )]
-            
-            task = tasks[task_id]
-            
-            if task.assigned_role != current_role:
-                assigned_role_name = task.assigned_role.value if task.assigned_role else "None"
-                return [types.TextContent(
-                    type="text",
-                    text=f"❌ Error: Only assigned role {assigned_role_name} can complete this task"
-                )]
-            
-            task.status = TaskStatus.DONE
-            task.updated_at = datetime.now()
-            task.comments.append({
-                "role": current_role.value,
-                "comment": f"Task completed: {completion_notes}",
-                "timestamp": datetime.now().isoformat()
-            })
-            
-            # Update Trello card if available
-            if trello_mode != TrelloMode.NONE:
-                update_trello_card(task)
-                if trello_mode == TrelloMode.MCP:
-                    print(f"✅ MCP Trello card updated for completed task {task_id}", file=sys.stderr)
-                else:
-                    print(f"✅ Trello card updated for completed task {task_id}", file=sys.stderr)
-            else:
-                print(f"ℹ️ Trello not available, updated completed task {task_id} locally", file=sys.stderr)
-            
-            # Create transition back to Orchestrator
-            transition = RoleTransition(
-                from_role=current_role,
-                to_role=RoleType.ORCHESTRATOR,
+        # Comments are append-only, so only rows past the stored count are new
+        (stored_count,) = db.execute(
+            "SELECT COUNT(*) FROM comments WHERE task_id = ?", (task.id,)
+        ).fetchone()
+        db.executemany(
+            "INSERT OR REPLACE INTO comments (task_id, position, role, comment, timestamp) VALUES (?, ?, ?, ?, ?)",
+            [
+                (task.id, position, comment.get("role"), comment.get("comment"), comment.get("timestamp"))
+                for position, comment in enumerate(task.comments[stored_count:], start=stored_count)
+            ]
+        )
+    
+    def stored_versions(self, task_ids: List[str]) -> Dict[str, Tuple[int, int]]:
+        stored: Dict[str, Tuple[int, int]] = {}
+        for start in range(0, len(task_ids), self.QUERY_CHUNK):
+            chunk = task_ids[start:start + self.QUERY_CHUNK]
+            stored.update(
+                (task_id, (version, sync_revision))
+                for task_id, version, sync_revision in self.connection.execute(
+                    f"SELECT id, version, sync_revision FROM tasks WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                )
+            )
+        return stored
+    
+    def save_task(self, task: Task):
+        self.save_changed_tasks([task])
+    
+    def save_changed_tasks(self, changed_tasks: List[Task]):
+        db = self.connection
+        with db:
+            # Take the write lock before reading versions, so no other process writes in between
+            db.execute("BEGIN IMMEDIATE")
+            self.check_versions(changed_tasks)
+            for task in changed_tasks:
+                self._write_task(db, task)
+        self.remember_versions({task.id: task_revision(task) for task in changed_tasks})
+    
+    def load_transitions(self) -> List[RoleTransition]:
+        return [
+            RoleTransition(
+                from_role=RoleType(from_role),
+                to_role=RoleType(to_role),
                 task_id=task_id,
-                reason=f"Task {task_id} completed by {current_role.value}",
-                timestamp=datetime.now()
+                reason=reason,
+                timestamp=datetime.fromisoformat(timestamp)
             )
-            transitions.append(transition)
-            
-            # Save locally
-            save_tasks_locally()
-            save_transitions_locally()
-            
-            await server.request_context.session.send_resource_list_changed()
-            
-            return [types.TextContent(
-                type="text",
-                text=f"✅ Task {task_id} completed, returning control to Orchestrator"
-            )]
+            for from_role, to_role, task_id, reason, timestamp in self.connection.execute(
+                "SELECT from_role, to_role, task_id, reason, timestamp FROM transitions ORDER BY id"
+            )
+        ]
+    
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+def create_storage(mode: StorageMode) -> TaskStorage:
+    """Build the storage backend for a storage mode"""
+    if mode == StorageMode.SNAPSHOT:
+        if MSGPACK_AVAILABLE:
+            return SnapshotTaskStorage()
+        logger.warning("TASK_STORAGE_MODE=snapshot needs the msgpack package - using journal mode")
+        return JournalTaskStorage()
+    if mode == StorageMode.SQLITE:
+        return SqliteTaskStorage()
+    if mode == StorageMode.JOURNAL:
+        return JournalTaskStorage()
+    if mode == StorageMode.SHARED:
+        return SharedTaskStorage()
+    return JsonTaskStorage()
+
+storage_mode: StorageMode = get_storage_mode()
+storage: TaskStorage = create_storage(storage_mode)
+if isinstance(storage, SharedTaskStorage):
+    transitions.lock = storage.lock
+
+def save_task_locally(task: Task):
+    """Persist a copy (see storage_copy) of a single changed task using the configured storage backend"""
+    try:
+        storage.save_task(task)
+    except TaskVersionConflict:
+        raise
+    except Exception as e:
+        logger.error("Error saving task %s locally: %s", task.id, e)
+        raise TaskSaveError(f"Task {task.id} could not be saved: {e}", [task.id]) from e
+
+def save_changed_tasks_locally(changed_tasks: List[Task]):
+    """Persist copies (see storage_copy) of a batch of changed tasks using the configured storage backend"""
+    try:
+        storage.save_changed_tasks(changed_tasks)
+    except TaskVersionConflict:
+        raise
+    except Exception as e:
+        logger.error("Error saving tasks locally: %s", e)
+        task_ids = [task.id for task in changed_tasks]
+        raise TaskSaveError(f"Tasks {', '.join(task_ids)} could not be saved: {e}", task_ids) from e
+
+def load_tasks_locally():
+    """Load tasks using the configured storage backend"""
+    global task_counter
+    
+    # Loading allocates many objects that all survive; collecting during it only costs time
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        snapshot, loaded = storage.load_snapshot()
+        if snapshot is not None:
+            tasks.load_snapshot(snapshot)
+            storage.remember_versions(snapshot.revisions())
+        tasks.update(loaded)
+        storage.remember_versions({task_id: task_revision(task) for task_id, task in loaded.items()})
         
-        elif name == "switch_role":
-            if not has_permission(current_role, Permission.SWITCH_ROLE):
-                return [types.TextContent(
-                    type="text",
-                    text=f"❌ Error: Role {current_role.value} cannot switch roles. Required permission: {Permission.SWITCH_ROLE.value}"
-                )]
+        # Update task counter; a snapshot records its own
+        task_counter = max(
+            snapshot.task_counter if snapshot is not None else 0,
+            max((task_number(task_id) for task_id in loaded), default=0)
+        )
+        
+        logger.info("Loaded %s tasks from local storage", len(tasks))
             
-            role_name = arguments.get("role")
-            reason = arguments.get("reason", "")
-            
-            if not role_name:
-                return [types.TextContent(
-                    type="text",
-                    text="❌ Error: Role is required"
-                )]
+    except Exception as e:
+        logger.error("Error loading tasks from local storage: %s", e)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+def reload_tasks_locally(task_ids: List[str]) -> Dict[str, Task]:
+    """Read the stored state of tasks another writer changed; run on the storage executor"""
+    loaded = storage.load_tasks_by_id(task_ids)
+    storage.remember_versions({task_id: task_revision(task) for task_id, task in loaded.items()})
+    return loaded
+
+def restore_tasks(previous: Dict[str, Optional[Task]], counter: Optional[Tuple[int, int]] = None):
+    """
+    Put back tasks as they were before a change that was not stored: None marks a task
+    the change created. counter is (before, after) the change handed out new ids; it is
+    only rolled back if nothing handed out an id since.
+    """
+    global task_counter
+    for task_id, task in previous.items():
+        if task is not None:
+            tasks[task_id] = task
+        elif task_id in tasks:
+            del tasks[task_id]
+    if counter is not None and task_counter == counter[1]:
+        task_counter = counter[0]
+
+async def reload_stored_tasks(task_ids: List[str]):
+    """Replace tasks in memory with their stored state, e.g. after a save was refused"""
+    reloaded = await storage_executor.run(reload_tasks_locally, task_ids)
+    for task_id, task in reloaded.items():
+        tasks[task_id] = task
+    notifications.resources_updated(reloaded)
+
+def apply_external_changes(changed: Dict[str, Task]) -> List[str]:
+    """
+    Adopt tasks other processes saved, unless this process holds a newer revision; returns
+    the ids taken over. A local change based on an older revision then fails its save with a conflict.
+    """
+    global task_counter
+    applied = []
+    for task_id, task in changed.items():
+        current = tasks.get(task_id)
+        if current is None or task_revision(current) < task_revision(task):
+            tasks[task_id] = task
+            applied.append(task_id)
+        # Keep new ids clear of the ones other processes handed out
+        task_counter = max(task_counter, task_number(task_id))
+    storage.remember_versions({task_id: task_revision(changed[task_id]) for task_id in applied})
+    return applied
+
+async def sync_external_changes():
+    """Take in tasks other processes saved, if the storage backend reports any, and notify clients"""
+    if not storage.has_external_changes():
+        return
+    known = set(tasks.keys())
+    changed = await storage_executor.run(storage.take_external_changes)
+    applied = apply_external_changes(changed)
+    if applied:
+        logger.debug("Took in %s tasks saved by other processes", len(applied))
+        if any(task_id not in known for task_id in applied):
+            notifications.list_changed()
+        notifications.resources_updated(applied)
+
+def save_transition_locally(transition: RoleTransition):
+    """Append a single new transition to the transition log"""
+    try:
+        transitions.persist([transition])
+    except Exception as e:
+        logger.error("Error saving transition locally: %s", e)
+        raise TaskSaveError(f"The role transition could not be saved: {e}") from e
+
+def save_batch_locally(changed_tasks: List[Task], new_transitions: List[RoleTransition]):
+    """Persist the tasks and transitions changed by one batch operation in a single storage job"""
+    save_changed_tasks_locally(changed_tasks)
+    try:
+        transitions.persist(new_transitions)
+    except Exception as e:
+        logger.error("Error saving transitions locally: %s", e)
+        raise TaskSaveError(f"The role transitions could not be saved: {e}") from e
+
+def load_transitions_locally():
+    """Load recent transitions from the transition log, importing any kept by the storage backend"""
+    try:
+        transitions.load(legacy_transitions=storage.load_transitions)
+        logger.info("Loaded %s transitions from local storage", len(transitions))
             
+    except Exception as e:
+        logger.error("Error loading transitions from local storage: %s", e)
+
+def export_tasks_to_json():
+    """Write the stored tasks and transitions to the JSON backup files regardless of storage mode"""
+    if isinstance(storage, JsonTaskStorage):
+        # Fold the journal in first (into the binary snapshot in snapshot mode), since the JSON export empties it
+        storage.compact()
+    if type(storage) not in (JsonTaskStorage, JournalTaskStorage, SharedTaskStorage):
+        JsonTaskStorage().write_records(storage.read_stored_records())
+    transitions_data = [serialize_transition(transition) for transition in transitions.read_all()]
+    write_file_atomically(TRANSITIONS_FILE, lambda f: json.dump(transitions_data, f, ensure_ascii=False, indent=2))
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is unbounded
+METRICS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Prometheus text file written every TASK_METRICS_INTERVAL seconds; unset to disable
+METRICS_FILE = os.getenv('TASK_METRICS_FILE')
+METRICS_INTERVAL = float(os.getenv('TASK_METRICS_INTERVAL', '15'))
+METRICS_KINDS = ("tool", "storage", "trello", "trello_api")
+
+class LatencyHistogram:
+    """Call count, error count and latency distribution of one operation"""
+    
+    def __init__(self):
+        self.bucket_counts = [0] * (len(METRICS_BUCKETS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def observe(self, seconds: float, error: bool = False):
+        self.bucket_counts[bisect.bisect_left(METRICS_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if error:
+            self.errors += 1
+    
+    def quantile(self, q: float) -> float:
+        """Estimate a latency quantile by interpolating inside the bucket that holds it"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = METRICS_BUCKETS[index - 1] if index else 0.0
+                upper = METRICS_BUCKETS[index] if index < len(METRICS_BUCKETS) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / bucket_count)
+            seen += bucket_count
+        return self.max
+    
+    def summary(self) -> dict:
+        return {
+            "calls": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+class MetricsRegistry:
+    """
+    Latency histograms keyed by kind and operation name.
+    
+    Kinds are "tool" (tool calls), "storage" and "trello" (jobs on the I/O pools, named
+    after the function run) and "trello_api" (HTTP requests, named by method and path).
+    Observations come from the event loop and from pool threads.
+    """
+    
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+    
+    def observe(self, kind: str, name: str, seconds: float, error: bool = False):
+        with self._lock:
+            histogram = self.histograms.get((kind, name))
+            if histogram is None:
+                histogram = self.histograms[(kind, name)] = LatencyHistogram()
+            histogram.observe(seconds, error)
+    
+    def snapshot(self, kind: Optional[str] = None) -> Dict[str, Dict[str, dict]]:
+        """Summaries by kind and name, busiest (most total time) first"""
+        with self._lock:
+            items = sorted(self.histograms.items(), key=lambda item: -item[1].total)
+            result: Dict[str, Dict[str, dict]] = {}
+            for (item_kind, name), histogram in items:
+                if kind is None or item_kind == kind:
+                    result.setdefault(item_kind, {})[name] = histogram.summary()
+        return result
+    
+    def prometheus_text(self) -> str:
+        """All histograms in the Prometheus text exposition format"""
+        def labels(kind: str, name: str, **extra) -> str:
+            pairs = {"kind": kind, "name": name, **extra}
+            return ",".join(f'{key}="{prometheus_escape(value)}"' for key, value in pairs.items())
+        
+        lines = [
+            "# HELP task_orchestrator_operation_duration_seconds Latency of tool calls, storage jobs and Trello calls",
+            "# TYPE task_orchestrator_operation_duration_seconds histogram",
+        ]
+        errors = [
+            "# HELP task_orchestrator_operation_errors_total Failed tool calls, storage jobs and Trello calls",
+            "# TYPE task_orchestrator_operation_errors_total counter",
+        ]
+        with self._lock:
+            for (kind, name), histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(METRICS_BUCKETS + (float("inf"),), histogram.bucket_counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"task_orchestrator_operation_duration_seconds_bucket{{{labels(kind, name, le=le)}}} {cumulative}")
+                lines.append(f"task_orchestrator_operation_duration_seconds_sum{{{labels(kind, name)}}} {histogram.total}")
+                lines.append(f"task_orchestrator_operation_duration_seconds_count{{{labels(kind, name)}}} {histogram.count}")
+                errors.append(f"task_orchestrator_operation_errors_total{{{labels(kind, name)}}} {histogram.errors}")
+        return "\n".join(lines + errors) + "\n"
+    
+    def write_prometheus(self, path: str):
+        write_file_atomically(path, lambda f: f.write(self.prometheus_text()))
+
+metrics = MetricsRegistry()
+
+def prometheus_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def operation_name(func) -> str:
+    """Metric name of a function run on an I/O pool"""
+    func = getattr(func, "func", func)  # functools.partial
+    return getattr(func, "__qualname__", type(func).__name__)
+
+class IOExecutor:
+    """Bounded thread pool that runs blocking I/O off the event loop and keeps latency counters"""
+    
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-io")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.total_queue_wait = 0.0
+    
+    @property
+    def queue_depth(self) -> int:
+        """Jobs submitted or waiting for a slot that have not finished yet"""
+        return self.waiting + self.in_flight
+    
+    @property
+    def idle(self) -> bool:
+        return self.queue_depth == 0
+    
+    async def run(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the pool, waiting for a slot when max_pending jobs are queued"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        
+        self.in_flight += 1
+        submitted_at = time.perf_counter()
+        started_at = submitted_at
+        
+        # Log records from the worker thread keep the calling tool's log_context
+        context = contextvars.copy_context()
+        
+        def timed_call():
+            nonlocal started_at
+            started_at = time.perf_counter()
+            failed = True
             try:
-                new_role = RoleType(role_name)
-            except ValueError:
-                return [types.TextContent(
-                    type="text",
-                    text=f"❌ Error: Invalid role: {role_name}"
-                )]
-            
-            if new_role == RoleType.ORCHESTRATOR:
-                return [types.TextContent(
-                    type="text",
-                    text="❌ Error: Already in Orchestrator role"
-                )]
-            
-            # Create transition
-            transition = RoleTransition(
-                from_role=RoleType.ORCHESTRATOR,
-                to_role=new_role,
-                task_id=None,
-                reason=reason or f"Switching to {new_role.value} role",
-                timestamp=datetime.now()
-            )
-            transitions.append(transition)
-            
-            current_role = new_role
-            
-            # Save transitions locally
-            save_transitions_locally()
-            
-            return [types.TextContent(
-                type="text",
-                text=f"✅ Switched to {new_role.value} role"
-            )]
+                result = context.run(func, *args, **kwargs)
+                failed = False
+                return result
+            finally:
+                metrics.observe(self.name, operation_name(func), time.perf_counter() - started_at, failed)
+        
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, timed_call)
+        except Exception:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+            return result
+        finally:
+            finished_at = time.perf_counter()
+            self.in_flight -= 1
+            self._slots.release()
+            latency = finished_at - submitted_at
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_queue_wait += started_at - submitted_at
+    
+    def stats(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_latency_ms": round(self.total_latency / finished * 1000, 2) if finished else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+            "avg_queue_wait_ms": round(self.total_queue_wait / finished * 1000, 2) if finished else 0.0,
+        }
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+# Storage writes run on a single worker so they reach disk in the order they were made
+IO_MAX_PENDING = int(os.getenv('TASK_IO_MAX_PENDING', '64'))
+storage_executor = IOExecutor("storage", max_workers=1, max_pending=IO_MAX_PENDING)
+trello_executor = IOExecutor(
+    "trello",
+    max_workers=int(os.getenv('TASK_TRELLO_IO_WORKERS', '4')),
+    max_pending=IO_MAX_PENDING
+)
+
+def is_trello_not_found(error: Exception) -> bool:
+    """Whether a py-trello error is a 404 for a deleted or moved resource"""
+    from trello.exceptions import ResourceUnavailable
+    
+    return isinstance(error, ResourceUnavailable) and getattr(error, "_status", None) == 404
+
+class TrelloBoardCache:
+    """Local index of the working board's lists by name and cards by id"""
+    
+    def __init__(self, ttl: float = TRELLO_CACHE_TTL):
+        self.ttl = ttl
+        self.lists_by_name: Dict[str, object] = {}
+        self.cards_by_id: Dict[str, object] = {}
+        self.card_list_ids: Dict[str, str] = {}
+        self.loaded_at: Optional[float] = None
+        # Trello calls run on several executor threads
+        self._lock = threading.Lock()
+    
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+    
+    def invalidate(self):
+        with self._lock:
+            self.lists_by_name.clear()
+            self.cards_by_id.clear()
+            self.card_list_ids.clear()
+            self.loaded_at = None
+    
+    def refresh(self, board, include_cards: bool = False):
+        """Fetch the board's open lists, and all open cards when include_cards is set.
+        
+        After expiry only lists are refetched; cards are dropped and fetched one by one by id.
+        """
+        lists = board.list_lists('open')
+        cards = board.get_cards(card_filter='open') if include_cards else []
+        with self._lock:
+            self.lists_by_name = {lst.name: lst for lst in lists}
+            self.cards_by_id = {card.id: card for card in cards}
+            self.card_list_ids = {card.id: card.idList for card in cards}
+            self.loaded_at = time.monotonic()
+        logger.info("Trello cache loaded: %s lists, %s cards", len(lists), len(cards))
+    
+    def get_list(self, board, name: str, create: bool = False):
+        """Return the list with this name, creating it on the board if requested"""
+        if self.is_stale():
+            self.refresh(board)
+        
+        with self._lock:
+            target_list = self.lists_by_name.get(name)
+        if target_list is None and create:
+            target_list = board.add_list(name)
+            with self._lock:
+                self.lists_by_name[name] = target_list
+        return target_list
+    
+    def get_card(self, board, card_id: str):
+        """Return a card handle, fetching only this card when it is not cached"""
+        if self.is_stale():
+            self.refresh(board)
         
-        elif name == "write_comment":
-            task_id = arguments.get("task_id")
-            comment = arguments.get("comment", "")
+        with self._lock:
+            card = self.cards_by_id.get(card_id)
+        if card is None:
+            card = board.get_card(card_id)
+            self.remember_card(card, card.idList)
+        return card
+    
+    def remember_card(self, card, list_id: str):
+        with self._lock:
+            self.cards_by_id[card.id] = card
+            self.card_list_ids[card.id] = list_id
+    
+    def list_id_of(self, card_id: str) -> Optional[str]:
+        with self._lock:
+            return self.card_list_ids.get(card_id)
+    
+trello_cache = TrelloBoardCache()
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `capacity` requests per `period` seconds"""
+    
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def acquire(self):
+        """Take one token, sleeping the calling thread until one is available"""
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+    
+    def drain(self):
+        """Empty the bucket after the server reports throttling"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = 0.0
+
+def trello_operation_name(method: str, url: str) -> str:
+    """Metric name of a Trello request, e.g. "PUT cards/{id}/idList"; ids are replaced so names stay few"""
+    path = url.split("?", 1)[0]
+    if path.startswith(TRELLO_DEFAULT_API_BASE_URL):
+        path = path[len(TRELLO_DEFAULT_API_BASE_URL):]
+    segments = [
+        "{id}" if any(char.isdigit() for char in segment) else segment
+        for segment in path.strip("/").split("/")
+    ]
+    return f"{method.upper()} {'/'.join(segments)}"
+
+class TrelloHTTPService:
+    """http_service for py-trello that rate-limits requests, retries 429 responses and honours TRELLO_API_BASE_URL"""
+    
+    def __init__(self, base_url: str = TRELLO_API_BASE_URL, max_retries: int = TRELLO_MAX_RETRIES):
+        import requests
+        
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.buckets = [
+            TokenBucket(TRELLO_RATE_LIMIT_PER_KEY, TRELLO_RATE_LIMIT_WINDOW),
+            TokenBucket(TRELLO_RATE_LIMIT_PER_TOKEN, TRELLO_RATE_LIMIT_WINDOW),
+        ]
+        # A shared session keeps connections to Trello alive between calls
+        self.session = requests.Session()
+        self.throttled = 0
+    
+    def request(self, method, url, **kwargs):
+        started_at = time.perf_counter()
+        failed = True
+        try:
+            response = self._send(method, url, **kwargs)
+            failed = response.status_code >= 400
+            return response
+        finally:
+            metrics.observe("trello_api", trello_operation_name(method, url), time.perf_counter() - started_at, failed)
+    
+    def _send(self, method, url, **kwargs):
+        if self.base_url != TRELLO_DEFAULT_API_BASE_URL and url.startswith(TRELLO_DEFAULT_API_BASE_URL):
+            url = self.base_url + url[len(TRELLO_DEFAULT_API_BASE_URL):]
+        
+        for attempt in range(self.max_retries + 1):
+            for bucket in self.buckets:
+                bucket.acquire()
             
-            if not task_id:
-                return [types.TextContent(
-                    type="text",
-                    text="❌ Error: Task ID is required"
-                )]
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
             
-            if not comment:
-                return [types.TextContent(
-                    type="text",
-                    text="❌ Error: Comment text is required"
-                )]
+            self.throttled += 1
+            for bucket in self.buckets:
+                bucket.drain()
             
-            if task_id not in tasks:
-                return [types.TextContent(
-                    type="text",
-                    text=f"❌ Error: Task {task_id} not found"
-                )]
+            retry_after = response.headers.get("Retry-After")
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else min(30.0, 0.5 * 2 ** attempt)
+            # Jitter keeps concurrent workers from retrying in lockstep
+            delay += random.uniform(0, delay)
+            logger.warning("Trello rate limit hit (%s %s), retrying in %.2fs", method, url, delay)
+            time.sleep(delay)
+
+TRELLO_PLACEHOLDER_VALUES = (
+    "your_trello_api_key_here",
+    "your_trello_token_here",
+    "your_trello_board_id_here",
+    "",
+    None
+)
+
+def trello_credentials() -> Optional[Tuple[str, str, str]]:
+    """API key, token and working board id, or None if any of them is missing or a placeholder"""
+    api_key = os.getenv('TRELLO_API_KEY')
+    token = os.getenv('TRELLO_TOKEN')
+    board_id = os.getenv('TRELLO_WORKING_BOARD_ID')
+    
+    logger.info(
+        "Trello credentials check: API_KEY=%s, TOKEN=%s, BOARD_ID=%s",
+        *("NOT SET" if value in TRELLO_PLACEHOLDER_VALUES else "SET" for value in (api_key, token, board_id))
+    )
+    if any(value in TRELLO_PLACEHOLDER_VALUES for value in (api_key, token, board_id)):
+        return None
+    return api_key, token, board_id
+
+def init_trello_client():
+    """Initialize Trello client if credentials are available"""
+    global trello_client, trello_board, trello_mode
+    
+    logger.info("Initializing Trello client...")
+    
+    # First, check if MCP Trello server is available
+    logger.info("Checking MCP Trello server availability...")
+    if check_mcp_trello_availability():
+        trello_mode = TrelloMode.MCP
+        logger.info("MCP Trello server detected - using MCP integration")
+        return True
+    
+    # If MCP not available, try direct API integration
+    if not TRELLO_AVAILABLE:
+        trello_mode = TrelloMode.NONE
+        logger.warning("Trello integration not available - using local storage")
+        return False
+    
+    try:
+        credentials = trello_credentials()
+        if credentials:
+            api_key, token, board_id = credentials
+            logger.info("Creating Trello client...")
+            from trello import TrelloClient
             
-            task = tasks[task_id]
+            trello_client = TrelloClient(api_key=api_key, token=token, http_service=TrelloHTTPService())
             
-            # Add comment to task
-            task.comments.append({
-                "role": current_role.value,
-                "comment": comment,
-                "timestamp": datetime.now().isoformat()
-            })
+            # Fetch the working board by id instead of listing every board
+            logger.info("Fetching Trello board %s...", board_id)
+            try:
+                board = trello_client.get_board(board_id)
+            except Exception as e:
+                if not is_trello_not_found(e):
+                    raise
+                trello_mode = TrelloMode.NONE
+                logger.warning("Trello board %s not found - using local storage", board_id)
+                return False
             
-            task.updated_at = datetime.now()
+            trello_board = board
+            trello_mode = TrelloMode.DIRECT_API
+            logger.info("Direct Trello API integration initialized for board: %s", board.name)
+            try:
+                trello_cache.refresh(board, include_cards=True)
+            except Exception as e:
+                # The cache fills itself on first use instead
+                logger.warning("Could not preload Trello cache: %s", e)
+            return True
+        else:
+            trello_mode = TrelloMode.NONE
+            logger.warning("Trello credentials not configured or using placeholder values - using local storage")
+            return False
             
-            # Update Trello card if available
-            if trello_mode != TrelloMode.NONE:
-                update_trello_card(task)
-                if trello_mode == TrelloMode.MCP:
-                    print(f"✅ MCP Trello card updated with comment for task {task_id}", file=sys.stderr)
-                else:
-                    print(f"✅ Trello card updated with comment for task {task_id}", file=sys.stderr)
-            else:
-                print(f"ℹ️ Trello not available, added comment to task {task_id} locally", file=sys.stderr)
+    except Exception as e:
+        trello_mode = TrelloMode.NONE
+        logger.error("Trello initialization error: %s - using local storage", e)
+        return False
+
+async def start_trello_integration():
+    """
+    Initialize Trello off the event loop, then send queued card writes.
+    
+    Runs as a background task once the transport is up, so a slow or unreachable
+    Trello never delays the MCP handshake. Card writes made while it connects
+    are kept in the outbox and sent once the client is ready.
+    """
+    global trello_mode
+    
+    try:
+        await trello_executor.run(init_trello_client)
+    except Exception as e:
+        logger.error("Error initializing Trello: %s", e)
+        trello_mode = TrelloMode.NONE
+    
+    if trello_mode == TrelloMode.NONE:
+        logger.warning("Trello integration not available - using local storage")
+        return
+    logger.info("Trello integration ready (%s)", trello_mode.value)
+    
+    # Send queued Trello writes, including any left from a previous run
+    await trello_outbox.run()
+
+async def create_trello_card_mcp(task: Task) -> Optional[str]:
+    """Create a Trello card for the task via MCP server"""
+    try:
+        # This is a placeholder implementation
+        # In practice, you would call the MCP Trello server's create_card tool
+        # Example:
+        # result = await server.request_context.session.call_tool(
+        #     "create_card",
+        #     {
+        #         "name": f"{task.id}: {task.title}",
+        #         "description": f"**Description:** {task.description}\n\n**Status:** {task.status.value}\n**Assigned to:** {task.assigned_role.value if task.assigned_role else 'Unassigned'}\n**Created:** {task.created_at.strftime('%Y-%m-%d %H:%M:%S')}",
+        #         "list_name": "To Do"
+        #     }
+        # )
+        
+        # For now, return a mock card ID
+        # In real implementation, extract card ID from MCP response
+        mock_card_id = f"mcp_card_{task.id}_{int(datetime.now().timestamp())}"
+        logger.info("MCP Trello card created: %s", mock_card_id)
+        return mock_card_id
+        
+    except Exception as e:
+        logger.error("Error creating MCP Trello card: %s", e)
+        return None
+
+async def update_trello_card_mcp(task: Task):
+    """Update Trello card when task status changes via MCP server"""
+    if not task.trello_card_id:
+        return
+    
+    try:
+        # This is a placeholder implementation
+        # In practice, you would call the MCP Trello server's update_card tool
+        # Example:
+        # await server.request_context.session.call_tool(
+        #     "update_card",
+        #     {
+        #         "card_id": task.trello_card_id,
+        #         "description": f"**Description:** {task.description}\n\n**Status:** {task.status.value}\n**Assigned to:** {task.assigned_role.value if task.assigned_role else 'Unassigned'}\n**Updated:** {task.updated_at.strftime('%Y-%m-%d %H:%M:%S')}",
+        #         "list_name": {
+        #             TaskStatus.TODO: "To Do",
+        #             TaskStatus.IN_PROGRESS: "In Progress",
+        #             TaskStatus.REVIEW: "Review",
+        #             TaskStatus.DONE: "Done",
+        #             TaskStatus.BLOCKED: "Blocked"
+        #         }.get(task.status, "To Do")
+        #     }
+        # )
+        
+        logger.info("MCP Trello card updated: %s", task.trello_card_id)
+        
+    except Exception as e:
+        logger.error("Error updating MCP Trello card: %s", e)
+
+def create_trello_card(task: Task) -> Optional[str]:
+    """Create a Trello card for the task"""
+    global trello_board
+    
+    if trello_mode == TrelloMode.MCP:
+        # Simplified MCP integration for Cursor AI compatibility
+        logger.info("MCP Trello mode requested, but using simplified implementation for Cursor AI")
+        mock_card_id = f"mcp_card_{task.id}_{int(datetime.now().timestamp())}"
+        logger.info("MCP Trello card created (mock): %s", mock_card_id)
+        return mock_card_id
+    
+    elif trello_mode == TrelloMode.DIRECT_API:
+        # Use direct API integration
+        if not trello_board:
+            logger.warning("Trello board not available for direct API integration")
+            return None
+        
+        try:
+            # Find "To Do" list or create one
+            target_list = trello_cache.get_list(trello_board, TRELLO_LIST_NAMES[TaskStatus.TODO], create=True)
             
-            # Save locally
-            save_tasks_locally()
+            # Create card
+            card = target_list.add_card(
+                name=f"{task.id}: {task.title}",
+                desc=f"**Description:** {task.description}\n\n**Status:** {task.status.value}\n**Assigned to:** {task.assigned_role.value if task.assigned_role else 'Unassigned'}\n**Created:** {task.created_at.strftime('%Y-%m-%d %H:%M:%S')}",
+                labels=None,
+                due=None
+            )
             
-            await server.request_context.session.send_resource_list_changed()
+            trello_cache.remember_card(card, target_list.id)
+            logger.info("Trello card created successfully: %s", card.id)
+            return card.id
             
-            return [types.TextContent(
-                type="text",
-                text=f"✅ Comment added to task {task_id} by {current_role.value}"
-            )]
-        
-        elif name == "return_to_orchestrator":
-            if current_role == RoleType.ORCHESTRATOR:
-                return [types.TextContent(
-                    type="text",
-                    text="❌ Error: Already in Orchestrator role"
-                )]
-            
-            reason = arguments.get("reason", "")
+        except Exception as e:
+            if is_trello_not_found(e):
+                # The cached list was deleted on the board
+                trello_cache.invalidate()
+            logger.error("Error creating Trello card: %s", e)
+            return None
+    
+    else:
+        # No Trello integration available
+        logger.info("No Trello integration available")
+        return None
+
+def update_trello_card(task: Task) -> bool:
+    """Update Trello card when task status changes, returning whether the card was updated"""
+    if trello_mode == TrelloMode.MCP:
+        # Simplified MCP integration for Cursor AI compatibility
+        logger.info("MCP Trello card update requested for task %s", task.id)
+        logger.info("MCP Trello card updated (mock): %s", task.trello_card_id)
+        return True
+    
+    elif trello_mode == TrelloMode.DIRECT_API:
+        # Use direct API integration
+        if not task.trello_card_id or not trello_board:
+            logger.warning("Cannot update Trello card: missing card ID or board")
+            return False
+        
+        try:
+            card = trello_cache.get_card(trello_board, task.trello_card_id)
             
-            # Create transition
-            transition = RoleTransition(
-                from_role=current_role,
-                to_role=RoleType.ORCHESTRATOR,
-                task_id=None,
-                reason=reason or f"Returning control to Orchestrator",
-                timestamp=datetime.now()
+            # Update card description
+            card.set_description(
+                f"**Description:** {task.description}\n\n**Status:** {task.status.value}\n**Assigned to:** {task.assigned_role.value if task.assigned_role else 'Unassigned'}\n**Updated:** {task.updated_at.strftime('%Y-%m-%d %H:%M:%S')}"
             )
-            transitions.append(transition)
             
-            current_role = RoleType.ORCHESTRATOR
+            # Move card to appropriate list based on status
+            target_list_name = TRELLO_LIST_NAMES.get(task.status, "To Do")
+            target_list = trello_cache.get_list(trello_board, target_list_name)
             
-            # Save transitions locally
-            save_transitions_locally()
-            
-            return [types.TextContent(
-                type="text",
-                text=f"✅ Returned control to Orchestrator"
-            )]
-        
-        elif name == "get_status":
-            tasks_by_status = {
-                status.value: len([t for t in tasks.values() if t.status == status])
-                for status in TaskStatus
-            }
+            if target_list and trello_cache.list_id_of(card.id) != target_list.id:
+                card.change_list(target_list.id)
+                trello_cache.remember_card(card, target_list.id)
             
-            recent_transitions = [
-                {
-                    "from": t.from_role.value,
-                    "to": t.to_role.value,
-                    "task_id": t.task_id,
-                    "reason": t.reason,
-                    "timestamp": t.timestamp.isoformat()
-                }
-                for t in transitions[-5:]  # Last 5 transitions
-            ]
+            logger.info("Trello card updated successfully: %s", task.trello_card_id)
+            return True
             
-            trello_status_map = {
-                TrelloMode.NONE: "❌ Not connected",
-                TrelloMode.DIRECT_API: "✅ Direct API",
-                TrelloMode.MCP: "✅ MCP Server"
+        except Exception as e:
+            if is_trello_not_found(e):
+                # Card or list is gone from the board; drop what we cached about it
+                trello_cache.invalidate()
+            logger.error("Error updating Trello card: %s", e)
+            return False
+    
+    else:
+        # No Trello integration available
+        logger.info("No Trello integration available for updates")
+        return False
+
+def trello_card_hash(task: Task) -> str:
+    """Hash of the task fields that decide the card's description and list"""
+    content = json.dumps([
+        task.description,
+        task.status.value,
+        task.assigned_role.value if task.assigned_role else None,
+    ])
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def mark_trello_synced(task: Task, pushed: Task):
+    """
+    Record in the task's Trello fields that its card now shows pushed, the copy of the task
+    that was written to it. They are saved as a new sync_revision rather than a new version:
+    other processes sharing the storage take them in, rather than keeping their copy without
+    the card and writing it back later, while clients holding the task's version for
+    expected_version do not get a conflict from a background card write.
+    """
+    start_change(task)
+    task.trello_synced_hash = trello_card_hash(pushed)
+    task.trello_synced_at = pushed.updated_at
+    task.sync_revision += 1
+
+def trello_card_is_current(task: Task) -> bool:
+    """Whether the task's card already shows what an update would push"""
+    if not task.trello_card_id or not task.trello_synced_hash:
+        return False
+    if task.trello_synced_at == task.updated_at:
+        return True
+    return task.trello_synced_hash == trello_card_hash(task)
+
+async def push_trello_update(task: Task) -> str:
+    """Update the task's card unless nothing it shows has changed, returning updated, skipped or failed"""
+    if trello_card_is_current(task):
+        # Remember that this updated_at has been checked so the hash isn't recomputed next time.
+        # Only kept in memory, so no new sync_revision: it is saved with the task's next change
+        task.trello_synced_at = task.updated_at
+        return "skipped"
+    
+    pushed = task.model_copy(deep=True)
+    updated = await trello_executor.run(update_trello_card, pushed)
+    if not updated:
+        return "failed"
+    # A change or reload while the card was written replaced the task object
+    current = tasks.get(task.id)
+    if current is not None:
+        mark_trello_synced(current, pushed)
+    return "updated"
+
+class TaskLocks:
+    """asyncio locks keyed by task id, created on first use and dropped once nobody holds or waits for them"""
+    
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Counter = Counter()
+    
+    async def run(self, task_id: str, func, *args):
+        """Await func(*args) while holding the task's lock"""
+        lock = self._locks.setdefault(task_id, asyncio.Lock())
+        self._users[task_id] += 1
+        try:
+            async with lock:
+                return await func(*args)
+        finally:
+            self._users[task_id] -= 1
+            if not self._users[task_id]:
+                del self._users[task_id]
+                del self._locks[task_id]
+
+# Held while a task's card is written, so the outbox worker and sync_to_trello, which both
+# check for a card and create one if it is missing, never create two cards for one task
+trello_card_locks = TaskLocks()
+
+async def sync_task_to_trello(task: Task) -> str:
+    """Create or update the card for one task, returning created, updated, skipped or failed"""
+    return await trello_card_locks.run(task.id, write_trello_card, task)
+
+async def write_trello_card(task: Task) -> str:
+    """
+    Create or update the task's card; run under its trello_card_locks entry.
+    
+    The card shows a copy of the task as it is when its turn comes. The card fields are
+    recorded on whichever object holds the task once Trello has answered, so a change or
+    reload in the meantime is neither lost nor saved without the card.
+    """
+    task = tasks.get(task.id, task)
+    if not task.trello_card_id:
+        pushed = task.model_copy(deep=True)
+        trello_card_id = await trello_executor.run(create_trello_card, pushed)
+        if not trello_card_id:
+            return "failed"
+        current = tasks.get(task.id)
+        if current is not None:
+            current.trello_card_id = trello_card_id
+            mark_trello_synced(current, pushed)
+        return "created"
+    
+    return await push_trello_update(task)
+
+async def bulk_sync_to_trello(task_list: List[Task], concurrency: int = TRELLO_SYNC_CONCURRENCY, on_progress=None) -> Dict[str, List[Task]]:
+    """Sync many tasks with at most `concurrency` Trello operations in flight.
+    
+    Request rates are bounded by the TrelloHTTPService token buckets, which also retry 429s.
+    on_progress, if given, is awaited with (done, total) as tasks finish.
+    Returns the tasks grouped by outcome: created, updated, skipped or failed.
+    """
+    results: Dict[str, List[Task]] = {"created": [], "updated": [], "skipped": [], "failed": []}
+    total = len(task_list)
+    done = 0
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def sync_one(task: Task):
+        nonlocal done
+        async with semaphore:
+            try:
+                outcome = await sync_task_to_trello(task)
+            except Exception as e:
+                logger.error("Error syncing task %s to Trello: %s", task.id, e)
+                outcome = "failed"
+        results[outcome].append(task)
+        done += 1
+        if on_progress:
+            await on_progress(done, total)
+    
+    await asyncio.gather(*(sync_one(task) for task in task_list))
+    return results
+
+async def save_pushed_cards(pushed: List[Task]) -> Optional[str]:
+    """
+    Save the card fields of tasks whose cards were just created or updated, returning
+    the error if that failed.
+    
+    The fields were recorded on the tasks as they are now (see write_trello_card), so those
+    are saved. Until they are saved the cards count as unsent: tasks another writer changed
+    are reloaded keeping their card id, and every task's sync hash is cleared so the next
+    push writes the card again and saves it.
+    """
+    pushed = [tasks[task.id] for task in pushed if task.id in tasks]
+    if not pushed:
+        return None
+    try:
+        await storage_executor.run(save_changed_tasks_locally, [storage_copy(task) for task in pushed])
+        return None
+    except Exception as e:
+        error = e
+    if isinstance(error, TaskVersionConflict):
+        card_ids = {task.id: task.trello_card_id for task in pushed}
+        reloaded = await storage_executor.run(reload_tasks_locally, error.task_ids)
+        for task_id, task in reloaded.items():
+            task.trello_card_id = task.trello_card_id or card_ids.get(task_id)
+            tasks[task_id] = task
+    for task in pushed:
+        current = tasks.get(task.id)
+        if current is not None:
+            current.trello_synced_hash = None
+    logger.warning("Card fields of %s tasks could not be saved: %s", len(pushed), error)
+    return str(error)
+
+class TrelloOutbox:
+    """Persistent queue of pending Trello card writes, sent by a background worker.
+    
+    Holds at most one entry per task: repeated changes to the same task coalesce into
+    a single push of its latest state.
+    """
+    
+    # Seconds between retries of a failing entry, doubling up to the cap
+    RETRY_BASE_DELAY = 2.0
+    RETRY_MAX_DELAY = 300.0
+    
+    def __init__(self, path: str = TRELLO_OUTBOX_FILE):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self.sent = 0
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+    
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = {entry["task_id"]: entry for entry in json.load(f)}
+            if self.entries:
+                logger.info("Loaded %s pending Trello outbox entries", len(self.entries))
+    
+    def snapshot(self) -> List[dict]:
+        return [dict(entry) for entry in self.entries.values()]
+    
+    def save(self, entries: List[dict]):
+        """Write a snapshot taken on the event loop; runs on the storage executor"""
+        write_file_atomically(self.path, lambda f: json.dump(entries, f, ensure_ascii=False))
+    
+    def enqueue(self, task: Task):
+        """Queue the task's card for creation or update, merging with any pending entry"""
+        entry = self.entries.get(task.id)
+        if entry is None:
+            entry = {
+                "task_id": task.id,
+                "op": "update" if task.trello_card_id else "create",
+                "enqueued_at": time.time(),
+                "attempts": 0,
+                "next_attempt_at": 0.0,
+                "generation": 0,
             }
-            trello_status = trello_status_map.get(trello_mode, "❌ Unknown")
-            local_storage_status = "✅ Available" if os.path.exists(TASKS_FILE) else "❌ Not available"
-            
-            # Get current role permissions
-            permissions = get_role_permissions(current_role)
-            permissions_list = ", ".join([perm.value for perm in sorted(permissions)])
+            self.entries[task.id] = entry
+        else:
+            # A new change is worth trying right away even if the last attempt failed
+            entry["next_attempt_at"] = 0.0
+        entry["generation"] += 1
+        self._wakeup.set()
+    
+    def discard(self, task_ids):
+        for task_id in task_ids:
+            self.entries.pop(task_id, None)
+    
+    def due_task_ids(self, now: float) -> List[str]:
+        return [task_id for task_id, entry in self.entries.items() if entry["next_attempt_at"] <= now]
+    
+    def seconds_until_next_attempt(self, now: float) -> Optional[float]:
+        if not self.entries:
+            return None
+        return max(0.0, min(entry["next_attempt_at"] for entry in self.entries.values()) - now)
+    
+    async def flush(self, task_ids: List[str]):
+        """Push the given entries to Trello and record successes and failures"""
+        generations = {task_id: self.entries[task_id]["generation"] for task_id in task_ids}
+        batch = [tasks[task_id] for task_id in task_ids if task_id in tasks]
+        # Entries for tasks that no longer exist have nothing to send
+        self.discard([task_id for task_id in task_ids if task_id not in tasks])
+        
+        results = await bulk_sync_to_trello(batch)
+        
+        self.retry_later(results["failed"], "failed")
+        
+        # An entry is only done once the card fields it produced are stored
+        pushed = results["created"] + results["updated"]
+        save_error = await save_pushed_cards(pushed)
+        if save_error:
+            self.retry_later(pushed, f"could not be saved ({save_error})")
+            pushed = []
+        
+        for task in pushed + results["skipped"]:
+            entry = self.entries.get(task.id)
+            # Keep entries that were re-queued while this push was in flight, or whose task
+            # changed in a way the pushed card does not show yet
+            current = tasks.get(task.id)
+            if (entry is not None and entry["generation"] == generations[task.id]
+                    and (current is None or trello_card_is_current(current))):
+                del self.entries[task.id]
+            self.sent += 1
+        
+        await storage_executor.run(self.save, self.snapshot())
+    
+    def retry_later(self, failed_tasks: List[Task], problem: str):
+        """Back off the entries of tasks whose push failed"""
+        now = time.time()
+        for task in failed_tasks:
+            entry = self.entries.get(task.id)
+            if entry is None:
+                continue
+            entry["attempts"] += 1
+            delay = min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** (entry["attempts"] - 1))
+            entry["next_attempt_at"] = now + delay * random.uniform(1.0, 1.5)
+            self.last_error = f"Trello {entry['op']} for {task.id} {problem} (attempt {entry['attempts']})"
+            self.last_error_at = datetime.now()
+            logger.warning("%s, retrying in %.0fs", self.last_error, delay)
+    
+    async def run(self):
+        """Worker loop: send due entries, then sleep until the next retry or a new entry"""
+        logger.info("Trello outbox worker started")
+        while True:
+            due = self.due_task_ids(time.time())
+            if not due:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.seconds_until_next_attempt(time.time()))
+                except asyncio.TimeoutError:
+                    pass
+                continue
             
-            status_text = f"""
+            try:
+                await self.flush(due)
+            except Exception as e:
+                self.last_error = str(e)
+                self.last_error_at = datetime.now()
+                logger.error("Trello outbox worker error: %s", e)
+                await asyncio.sleep(self.RETRY_BASE_DELAY)
+
+trello_outbox = TrelloOutbox()
+
+async def queue_trello_sync(task: Task) -> bool:
+    """Record a pending card write for the task in the outbox, returning whether one was queued"""
+    if trello_mode == TrelloMode.NONE:
+        return False
+    trello_outbox.enqueue(task)
+    await storage_executor.run(trello_outbox.save, trello_outbox.snapshot())
+    return True
+
+async def queue_trello_update(task: Task) -> bool:
+    """Queue a card update for a changed task that has, or is about to get, a card"""
+    if not task.trello_card_id and task.id not in trello_outbox.entries:
+        return False
+    if trello_card_is_current(task):
+        return False
+    return await queue_trello_sync(task)
+
+async def queue_trello_updates(changed_tasks: List[Task], new_tasks: List[Task] = ()) -> int:
+    """Queue cards for new tasks and updates for changed ones with a single outbox write"""
+    if trello_mode == TrelloMode.NONE:
+        return 0
+    queued = list(new_tasks) + [
+        task for task in changed_tasks
+        if (task.trello_card_id or task.id in trello_outbox.entries) and not trello_card_is_current(task)
+    ]
+    for task in queued:
+        trello_outbox.enqueue(task)
+    if queued:
+        await storage_executor.run(trello_outbox.save, trello_outbox.snapshot())
+    return len(queued)
+
+# Page size for list_tasks and resources/list when the client does not ask for one
+LIST_PAGE_SIZE = int(os.getenv('TASK_LIST_PAGE_SIZE', '50'))
+LIST_MAX_PAGE_SIZE = 500
+TASK_SORT_FIELDS = ("id", "created_at", "updated_at")
+# Tasks search_tasks returns when the client does not set a limit
+SEARCH_DEFAULT_LIMIT = 20
+# Tasks indexed for search at startup between yields to the event loop
+SEARCH_INDEX_CHUNK = 500
+
+def task_sort_key(task: Task, sort_by: str) -> tuple:
+    """Total order for paging; ties on timestamps are broken by task number"""
+    if sort_by == "id":
+        return (task_number(task.id),)
+    return (getattr(task, sort_by).isoformat(), task_number(task.id))
+
+def encode_cursor(state: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode()
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(state, dict) or not isinstance(state.get("after"), list):
+            raise ValueError(cursor)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return state
+
+def paginate_tasks(candidates, sort_by: str = "id", descending: bool = False,
+                   limit: int = LIST_PAGE_SIZE, cursor: Optional[str] = None,
+                   filters: Optional[dict] = None) -> Tuple[List[Task], Optional[str]]:
+    """
+    Return one page of tasks ordered by sort_by, and the cursor for the next page.
+    
+    The cursor records the sort key of the last task returned, so later pages stay
+    consistent while tasks are added or changed, and only limit + 1 tasks are ever sorted.
+    """
+    filters = filters or {}
+    if cursor:
+        state = decode_cursor(cursor)
+        if (state.get("sort"), state.get("desc"), state.get("filters", {})) != (sort_by, descending, filters):
+            raise ValueError("Cursor was issued for a different sort order or filter")
+        after = tuple(state["after"])
+        if descending:
+            candidates = (task for task in candidates if task_sort_key(task, sort_by) < after)
+        else:
+            candidates = (task for task in candidates if task_sort_key(task, sort_by) > after)
+    
+    select = heapq.nlargest if descending else heapq.nsmallest
+    page = select(limit + 1, candidates, key=lambda task: task_sort_key(task, sort_by))
+    
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor({
+            "sort": sort_by,
+            "desc": descending,
+            "filters": filters,
+            "after": list(task_sort_key(page[-1], sort_by)),
+        })
+    return page, next_cursor
+
+class OrchestratorServer(Server):
+    """
+    MCP server whose initialization options announce resource notifications.
+
+    The HTTP session manager builds the options of each new session itself with
+    create_initialization_options(), so the defaults live here rather than in main.
+    """
+
+    def create_initialization_options(self, notification_options: Optional[NotificationOptions] = None,
+                                      experimental_capabilities: Optional[dict] = None) -> InitializationOptions:
+        return super().create_initialization_options(
+            notification_options or NotificationOptions(resources_changed=True),
+            experimental_capabilities,
+        )
+
+    def get_capabilities(self, notification_options: NotificationOptions,
+                         experimental_capabilities: dict) -> types.ServerCapabilities:
+        capabilities = super().get_capabilities(notification_options, experimental_capabilities)
+        # get_capabilities always reports subscribe=False; handle_subscribe_resource is registered
+        if capabilities.resources is not None:
+            capabilities.resources.subscribe = True
+        return capabilities
+
+server = OrchestratorServer("task-orchectrator-mcp", version="0.3.3")
+
+# Window in which resource notifications for a session are collected and sent together
+NOTIFICATION_DEBOUNCE = int(os.getenv('TASK_NOTIFICATION_DEBOUNCE_MS', '250')) / 1000
+
+def task_uri(task_id: str) -> AnyUrl:
+    return AnyUrl(f"task://internal/{task_id}")
+
+class NotificationScheduler:
+    """
+    Coalesce resource notifications per client session.
+    
+    Changes made within the debounce window produce at most one resources/list_changed
+    notification, plus one resources/updated per changed task the client subscribed to.
+    Task state is shared by every session the process serves, so a change is announced
+    to all sessions seen so far, not only to the one whose request made it.
+    """
+    
+    def __init__(self, delay: float = NOTIFICATION_DEBOUNCE):
+        self.delay = delay
+        self.subscriptions: "weakref.WeakKeyDictionary[object, Set[str]]" = weakref.WeakKeyDictionary()
+        self.pending: "weakref.WeakKeyDictionary[object, dict]" = weakref.WeakKeyDictionary()
+        self.sessions: "weakref.WeakSet[object]" = weakref.WeakSet()
+        self.sent = 0
+        self.coalesced = 0
+        self._flushes: Set[asyncio.Task] = set()
+    
+    def track(self, session):
+        self.sessions.add(session)
+    
+    def _target_sessions(self, session) -> list:
+        if session is not None:
+            return [session]
+        try:
+            self.sessions.add(server.request_context.session)
+        except LookupError:
+            pass
+        return list(self.sessions)
+    
+    def subscribe(self, session, uri: str):
+        self.sessions.add(session)
+        self.subscriptions.setdefault(session, set()).add(uri)
+    
+    def unsubscribe(self, session, uri: str):
+        self.subscriptions.get(session, set()).discard(uri)
+    
+    def _pending_for(self, session) -> dict:
+        state = self.pending.get(session)
+        if state is None:
+            self.sessions.add(session)
+            state = {"list_changed": False, "updated": set()}
+            self.pending[session] = state
+            flush = asyncio.create_task(self._flush_later(session))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+        else:
+            self.coalesced += 1
+        return state
+    
+    def list_changed(self, session=None):
+        """Schedule a resources/list_changed notification, e.g. after tasks were added"""
+        for target in self._target_sessions(session):
+            self._pending_for(target)["list_changed"] = True
+    
+    def resources_updated(self, task_ids, session=None):
+        """Schedule notifications for tasks whose content changed"""
+        task_ids = list(task_ids)
+        for target in self._target_sessions(session):
+            self._pending_for(target)["updated"].update(task_ids)
+    
+    async def _flush_later(self, session):
+        await asyncio.sleep(self.delay)
+        await self.flush(session)
+    
+    async def flush(self, session):
+        state = self.pending.pop(session, None)
+        if state is None:
+            return
+        subscribed = self.subscriptions.get(session, set())
+        updated_uris = [str(task_uri(task_id)) for task_id in sorted(state["updated"])]
+        # Clients that did not subscribe to a changed task only learn about it via list_changed
+        list_changed = state["list_changed"] or any(uri not in subscribed for uri in updated_uris)
+        try:
+            if list_changed:
+                await session.send_resource_list_changed()
+                self.sent += 1
+            for uri in updated_uris:
+                if uri in subscribed:
+                    await session.send_resource_updated(AnyUrl(uri))
+                    self.sent += 1
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            # The client disconnected; stop notifying it
+            self.sessions.discard(session)
+            self.subscriptions.pop(session, None)
+            logger.debug("Dropped a closed session from resource notifications")
+        except Exception as e:
+            logger.warning("Failed to send resource notifications: %s", e)
+
+notifications = NotificationScheduler()
+
+class RoleContexts:
+    """
+    The current role of each actor, so agents in different roles work side by side.
+    
+    An actor is the agent named by agent_id in a request's _meta, which keeps its role across
+    sessions and reconnects; without one, it is the MCP session that sent the request. Calls
+    made outside a request share one default actor. Every actor starts as orchestrator.
+    """
+    
+    def __init__(self):
+        self.by_agent: Dict[str, RoleType] = {}
+        self.by_session: "weakref.WeakKeyDictionary[object, RoleType]" = weakref.WeakKeyDictionary()
+        self.default = RoleType.ORCHESTRATOR
+    
+    def _actor(self) -> Tuple[Optional[str], Optional[object]]:
+        """The agent id and session of the current request, each None when absent"""
+        try:
+            context = server.request_context
+        except LookupError:
+            return None, None
+        meta = context.meta
+        agent_id = (meta.model_extra or {}).get("agent_id") if meta is not None else None
+        return (str(agent_id) if agent_id else None), context.session
+    
+    def current(self) -> RoleType:
+        agent_id, session = self._actor()
+        if agent_id:
+            return self.by_agent.get(agent_id, RoleType.ORCHESTRATOR)
+        if session is not None:
+            return self.by_session.get(session, RoleType.ORCHESTRATOR)
+        return self.default
+    
+    def switch(self, role: RoleType):
+        agent_id, session = self._actor()
+        if agent_id:
+            self.by_agent[agent_id] = role
+        elif session is not None:
+            self.by_session[session] = role
+        else:
+            self.default = role
+    
+    def active_roles(self) -> Dict[RoleType, int]:
+        """Number of known actors currently in each role other than orchestrator"""
+        counts: Dict[RoleType, int] = {}
+        for role in [*self.by_agent.values(), *self.by_session.values(), self.default]:
+            if role != RoleType.ORCHESTRATOR:
+                counts[role] = counts.get(role, 0) + 1
+        return counts
+
+roles = RoleContexts()
+
+@server.subscribe_resource()
+async def handle_subscribe_resource(uri: AnyUrl) -> None:
+    notifications.subscribe(server.request_context.session, str(uri))
+
+@server.unsubscribe_resource()
+async def handle_unsubscribe_resource(uri: AnyUrl) -> None:
+    notifications.unsubscribe(server.request_context.session, str(uri))
+
+async def commit_task_batch(changed_tasks: List[Task], new_transitions: List[RoleTransition],
+                            created_tasks: List[Task] = (), card_tasks: List[Task] = (),
+                            previous: Optional[Dict[str, Optional[Task]]] = None,
+                            counter: Optional[Tuple[int, int]] = None):
+    """
+    Persist, queue and announce the result of a batch operation: one storage job,
+    one outbox write and one notification for the whole batch.
+    card_tasks are the created tasks that should get a Trello card.
+    The new transitions are recorded once the batch is stored. If the tasks cannot be
+    stored, none of them is, so every task in previous is put back (see restore_tasks).
+    """
+    saved_tasks = [storage_copy(task) for task in list(created_tasks) + list(changed_tasks)]
+    try:
+        await storage_executor.run(save_batch_locally, saved_tasks, new_transitions)
+    except (TaskVersionConflict, TaskSaveError) as e:
+        # A failure saving only the transitions leaves the stored tasks, and so these, in place
+        if previous is not None and e.task_ids:
+            restore_tasks(previous, counter)
+        raise
+    transitions.extend(new_transitions)
+    await queue_trello_updates(changed_tasks, card_tasks)
+    if created_tasks:
+        notifications.list_changed()
+    if changed_tasks:
+        notifications.resources_updated(task.id for task in changed_tasks)
+
+# Roles the scheduler hands work to, and how many IN_PROGRESS tasks each may hold
+SCHEDULER_ROLES = [role for role in RoleType if role != RoleType.ORCHESTRATOR]
+SCHEDULER_DEFAULT_CAPACITY = int(os.getenv('TASK_SCHEDULER_CAPACITY', '1'))
+SCHEDULER_POLICY = os.getenv('TASK_SCHEDULER_POLICY', 'fifo')
+# Seconds between background scheduling rounds; 0 leaves scheduling to the schedule_tasks tool
+SCHEDULER_INTERVAL = float(os.getenv('TASK_SCHEDULER_INTERVAL', '0'))
+
+def parse_role_capacity(spec: str) -> Dict[RoleType, int]:
+    """Parse per-role capacity overrides such as coder=3,devops=1"""
+    capacity = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        role_name, _, count = item.partition('=')
+        capacity[RoleType(role_name.strip())] = int(count)
+    return capacity
+
+SCHEDULER_ROLE_CAPACITY = {
+    role: SCHEDULER_DEFAULT_CAPACITY for role in SCHEDULER_ROLES
+} | parse_role_capacity(os.getenv('TASK_SCHEDULER_ROLE_CAPACITY', ''))
+
+def fifo_order(ready_tasks: List[Task]) -> List[Task]:
+    return sorted(ready_tasks, key=lambda task: (task.created_at, task_number(task.id)))
+
+def priority_order(ready_tasks: List[Task]) -> List[Task]:
+    return sorted(ready_tasks, key=lambda task: (-task.priority, task.created_at, task_number(task.id)))
+
+def critical_path_order(ready_tasks: List[Task]) -> List[Task]:
+    """Start the tasks heading the longest chains of remaining work first"""
+    depths = tasks.graph.downstream_depths()
+    return sorted(ready_tasks, key=lambda task: (-depths.get(task.id, 1), task.created_at, task_number(task.id)))
+
+# Scheduling policies by name; each orders the ready tasks from first to last to assign
+SCHEDULING_POLICIES = {
+    "fifo": fifo_order,
+    "priority": priority_order,
+    "critical_path": critical_path_order,
+}
+
+def plan_assignments(policy: str, capacity: Dict[RoleType, int]) -> List[Tuple[Task, RoleType]]:
+    """Match ready tasks, in policy order, to the roles with the most free capacity"""
+    in_progress = tasks.by_status[TaskStatus.IN_PROGRESS]
+    free = {
+        role: slots - len(tasks.by_role.get(role, set()) & in_progress)
+        for role, slots in capacity.items()
+    }
+    plan = []
+    for task in SCHEDULING_POLICIES[policy](tasks.ready_tasks()):
+        role = max(free, key=free.get, default=None)
+        if role is None or free[role] <= 0:
+            break
+        plan.append((task, role))
+        free[role] -= 1
+    return plan
+
+async def run_scheduling_round(policy: str = SCHEDULER_POLICY,
+                               capacity: Optional[Dict[RoleType, int]] = None,
+                               dry_run: bool = False) -> List[Tuple[Task, RoleType]]:
+    """Assign ready tasks to roles and persist the whole round with one storage job"""
+    plan = plan_assignments(policy, capacity or SCHEDULER_ROLE_CAPACITY)
+    if dry_run or not plan:
+        return plan
+    
+    previous = {task.id: storage_copy(task) for task, _ in plan}
+    new_transitions = []
+    for task, role in plan:
+        task.assigned_role = role
+        task.status = TaskStatus.IN_PROGRESS
+        touch_task(task)
+        tasks.reindex(task)
+        new_transitions.append(RoleTransition(
+            from_role=RoleType.ORCHESTRATOR,
+            to_role=role,
+            task_id=task.id,
+            reason=f"Task {task.id} assigned to {role.value} by the scheduler ({policy})",
+            timestamp=datetime.now()
+        ))
+    
+    await commit_task_batch([task for task, _ in plan], new_transitions, previous=previous)
+    return plan
+
+async def run_scheduler_periodically(interval: float = SCHEDULER_INTERVAL):
+    """Background loop that runs a scheduling round every interval seconds"""
+    logger.info("Scheduler started: %s policy every %ss", SCHEDULER_POLICY, interval)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sync_external_changes()
+            plan = await run_scheduling_round()
+            if plan:
+                logger.info("Scheduler assigned %s tasks", len(plan))
+        except Exception as e:
+            logger.error("Scheduler error: %s", e)
+
+# Batch tools validate every item before changing anything: a batch is applied in full or not at all
+BATCH_MAX_ITEMS = int(os.getenv('TASK_BATCH_MAX_ITEMS', '500'))
+
+class BatchResult:
+    """Per-item outcome of a batch tool"""
+    
+    def __init__(self, items: List[dict]):
+        self.items = items
+        self.messages: List[Optional[str]] = [None] * len(items)
+        self.errors: Dict[int, str] = {}
+        self.notes: List[str] = []
+    
+    def fail(self, index: int, error: str):
+        self.errors[index] = error
+    
+    def ok(self, index: int, message: str):
+        self.messages[index] = message
+    
+    def render(self, title: str) -> str:
+        if self.errors:
+            text = f"❌ **{title}**: no changes made, {len(self.errors)} of {len(self.items)} items are invalid\n\n"
+            for index, error in sorted(self.errors.items()):
+                text += f"{index + 1}. ❌ {error}\n"
+            return text
+        text = f"✅ **{title}**: all {len(self.items)} done\n\n"
+        for index, message in enumerate(self.messages):
+            text += f"{index + 1}. ✅ {message}\n"
+        for note in self.notes:
+            text += f"\n{note}\n"
+        return text
+
+def find_duplicate_task_ids(items: List[dict], result: BatchResult):
+    seen: Dict[str, int] = {}
+    for index, item in enumerate(items):
+        task_id = item.get("task_id")
+        if task_id in seen:
+            result.fail(index, f"Task {task_id} already appears in item {seen[task_id] + 1}")
+        elif task_id:
+            seen[task_id] = index
+
+async def create_tasks_batch(items: List[dict]) -> BatchResult:
+    """
+    Create several tasks at once. A dependency written as "#N" refers to the
+    task created by item N (1-based) of the same batch, which must come earlier.
+    """
+    global task_counter
+    result = BatchResult(items)
+    new_tasks: List[Task] = []
+    
+    # New tasks are inserted as they are validated so later items and cycle checks see them;
+    # they are removed again if any item turns out to be invalid
+    for index, item in enumerate(items):
+        title = item.get("title")
+        description = item.get("description")
+        if not title or not description:
+            result.fail(index, "Title and description are required")
+            continue
+        
+        dependencies = []
+        for dep_id in item.get("dependencies", []):
+            if dep_id.startswith("#"):
+                position = int(dep_id[1:]) if dep_id[1:].isdigit() else 0
+                if not 1 <= position <= index or position - 1 in result.errors:
+                    result.fail(index, f"Dependency {dep_id} does not refer to an earlier valid item")
+                    break
+                dep_id = f"TASK-{task_counter + position:03d}"
+            dependencies.append(dep_id)
+        if index in result.errors:
+            continue
+        
+        task_id = f"TASK-{task_counter + index + 1:03d}"
+        cycle = tasks.graph.find_cycle(task_id, dependencies)
+        if cycle:
+            result.fail(index, f"Dependencies would create a cycle: {' -> '.join(cycle)}")
+            continue
+        
+        now = datetime.now()
+        task = Task(
+            id=task_id,
+            title=title,
+            description=description,
+            status=TaskStatus.TODO,
+            assigned_role=None,
+            created_by=RoleType.ORCHESTRATOR,
+            created_at=now,
+            updated_at=now,
+            dependencies=dependencies,
+            priority=int(item.get("priority", 0)),
+            git_branch=None,
+            comments=[],
+            subtasks=[],
+            trello_card_id=None,
+            version=1
+        )
+        tasks[task_id] = task
+        new_tasks.append(task)
+        result.ok(index, f"{task_id} created: {title}")
+    
+    if result.errors:
+        for task in new_tasks:
+            del tasks[task.id]
+        return result
+    
+    counter = (task_counter, task_counter + len(new_tasks))
+    task_counter = counter[1]
+    card_tasks = [task for task, item in zip(new_tasks, items) if item.get("create_trello_card", True)]
+    await commit_task_batch([], [], created_tasks=new_tasks, card_tasks=card_tasks,
+                            previous={task.id: None for task in new_tasks}, counter=counter)
+    return result
+
+async def assign_tasks_batch(items: List[dict]) -> BatchResult:
+    result = BatchResult(items)
+    find_duplicate_task_ids(items, result)
+    planned: List[Tuple[Task, RoleType]] = []
+    for index, item in enumerate(items):
+        if index in result.errors:
+            continue
+        task_id, role_name = item.get("task_id"), item.get("role")
+        if not task_id or not role_name:
+            result.fail(index, "Task ID and role are required")
+        elif task_id not in tasks:
+            result.fail(index, f"Task {task_id} not found")
+        elif role_name not in {role.value for role in RoleType}:
+            result.fail(index, f"Invalid role: {role_name}")
+        elif conflict := version_mismatch(tasks[task_id], item.get("expected_version")):
+            result.fail(index, conflict)
+        elif blocking_dep_id := tasks.find_unfinished_dependency(tasks[task_id]):
+            result.fail(index, f"Task {task_id} is blocked by dependency {blocking_dep_id}")
+        else:
+            planned.append((tasks[task_id], RoleType(role_name)))
+            result.ok(index, f"{task_id} assigned to {role_name}")
+    if result.errors:
+        return result
+    
+    previous = {task.id: storage_copy(task) for task, _ in planned}
+    new_transitions = []
+    for task, role in planned:
+        task.assigned_role = role
+        task.status = TaskStatus.IN_PROGRESS
+        touch_task(task)
+        tasks.reindex(task)
+        new_transitions.append(RoleTransition(
+            from_role=RoleType.ORCHESTRATOR,
+            to_role=role,
+            task_id=task.id,
+            reason=f"Task {task.id} assigned to {role.value}",
+            timestamp=datetime.now()
+        ))
+    await commit_task_batch([task for task, _ in planned], new_transitions, previous=previous)
+    return result
+
+async def complete_tasks_batch(items: List[dict]) -> BatchResult:
+    current_role = roles.current()
+    result = BatchResult(items)
+    find_duplicate_task_ids(items, result)
+    for index, item in enumerate(items):
+        if index in result.errors:
+            continue
+        task_id = item.get("task_id")
+        if not task_id:
+            result.fail(index, "Task ID is required")
+        elif task_id not in tasks:
+            result.fail(index, f"Task {task_id} not found")
+        elif tasks[task_id].assigned_role != current_role:
+            assigned_role = tasks[task_id].assigned_role
+            result.fail(index, f"Only assigned role {assigned_role.value if assigned_role else 'None'} can complete {task_id}")
+        elif conflict := version_mismatch(tasks[task_id], item.get("expected_version")):
+            result.fail(index, conflict)
+    if result.errors:
+        return result
+    
+    previous = {item["task_id"]: storage_copy(tasks[item["task_id"]]) for item in items}
+    completed, new_transitions, unblocked_ids = [], [], []
+    for index, item in enumerate(items):
+        task = tasks[item["task_id"]]
+        task.status = TaskStatus.DONE
+        touch_task(task)
+        task.comments.append({
+            "role": current_role.value,
+            "comment": f"Task completed: {item.get('completion_notes', '')}",
+            "timestamp": datetime.now().isoformat()
+        })
+        unblocked_ids.extend(tasks.reindex(task))
+        completed.append(task)
+        new_transitions.append(RoleTransition(
+            from_role=current_role,
+            to_role=RoleType.ORCHESTRATOR,
+            task_id=task.id,
+            reason=f"Task {task.id} completed by {current_role.value}",
+            timestamp=datetime.now()
+        ))
+        result.ok(index, f"{task.id} completed")
+    
+    # A task completed later in the batch may have unblocked one completed earlier
+    still_ready = sorted((task_id for task_id in set(unblocked_ids) if task_id in tasks.graph.ready), key=task_number)
+    if still_ready:
+        result.notes.append(f"🔓 Now ready: {', '.join(still_ready)}")
+    await commit_task_batch(completed, new_transitions, previous=previous)
+    return result
+
+async def write_comments_batch(items: List[dict]) -> BatchResult:
+    current_role = roles.current()
+    result = BatchResult(items)
+    for index, item in enumerate(items):
+        task_id, comment = item.get("task_id"), item.get("comment")
+        if not task_id or not comment:
+            result.fail(index, "Task ID and comment text are required")
+        elif task_id not in tasks:
+            result.fail(index, f"Task {task_id} not found")
+        elif conflict := version_mismatch(tasks[task_id], item.get("expected_version")):
+            result.fail(index, conflict)
+    if result.errors:
+        return result
+    
+    previous = {item["task_id"]: storage_copy(tasks[item["task_id"]]) for item in items}
+    commented: Dict[str, Task] = {}
+    for index, item in enumerate(items):
+        task = tasks[item["task_id"]]
+        task.comments.append({
+            "role": current_role.value,
+            "comment": item["comment"],
+            "timestamp": datetime.now().isoformat()
+        })
+        touch_task(task)
+        tasks.reindex(task)
+        commented[task.id] = task
+        result.ok(index, f"Comment added to {task.id}")
+    await commit_task_batch(list(commented.values()), [], previous=previous)
+    return result
+
+@server.list_resources()
+async def handle_list_resources(request: types.ListResourcesRequest) -> types.ListResourcesResult:
+    """
+    List available task resources, one page at a time in task id order.
+    Each task is exposed as a resource with a custom task:// URI scheme.
+    """
+    notifications.track(server.request_context.session)
+    await sync_external_changes()
+    cursor = request.params.cursor if request.params else None
+    page, next_cursor = paginate_tasks(tasks.values(), cursor=cursor)
+    resources = [
+        types.Resource(
+            uri=task_uri(task.id),
+            name=f"Task: {task.title}",
+            description=f"Task {task.id}: {task.description}",
+            mimeType="application/json",
+        )
+        for task in page
+    ]
+    return types.ListResourcesResult(resources=resources, nextCursor=next_cursor)
+
+@server.read_resource()
+async def handle_read_resource(uri: AnyUrl) -> str:
+    """
+    Read a specific task's content by its URI.
+    """
+    if uri.scheme != "task":
+        raise ValueError(f"Unsupported URI scheme: {uri.scheme}")
+
+    task_id = uri.path.lstrip("/") if uri.path else None
+    await sync_external_changes()
+    if task_id and task_id in tasks:
+        return tasks[task_id].model_dump_json()
+    raise ValueError(f"Task not found: {task_id}")
+
+# Python checks for the JSON schema types used in tool input schemas; bool is not a JSON number
+JSON_TYPE_CHECKS = {
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool)
+        or isinstance(value, float) and value.is_integer(),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "array": lambda value: isinstance(value, list),
+    "object": lambda value: isinstance(value, dict),
+    "null": lambda value: value is None,
+}
+
+def compile_schema(schema: dict) -> Callable[[object], Optional[Tuple[str, str]]]:
+    """
+    Turn a JSON schema into a validator function, once per tool.
+    
+    The validator returns None for a valid value, or the location (".field", "[index]") and
+    description of the first violation. Supports the keywords the tool schemas use: type, enum,
+    minimum, maximum, minItems, maxItems, properties, required, additionalProperties and items.
+    """
+    checks: List[Callable[[object], Optional[Tuple[str, str]]]] = []
+    
+    expected_type = schema.get("type")
+    if expected_type:
+        type_check = JSON_TYPE_CHECKS[expected_type]
+        checks.append(lambda value: None if type_check(value) else ("", f"must be of type {expected_type}"))
+    
+    if "enum" in schema:
+        allowed = schema["enum"]
+        checks.append(lambda value: None if value in allowed else ("", f"must be one of {', '.join(map(str, allowed))}"))
+    if "minimum" in schema:
+        minimum = schema["minimum"]
+        checks.append(lambda value: None if value >= minimum else ("", f"must be at least {minimum}"))
+    if "maximum" in schema:
+        maximum = schema["maximum"]
+        checks.append(lambda value: None if value <= maximum else ("", f"must be at most {maximum}"))
+    if "minItems" in schema:
+        min_items = schema["minItems"]
+        checks.append(lambda value: None if len(value) >= min_items else ("", f"must have at least {min_items} items"))
+    if "maxItems" in schema:
+        max_items = schema["maxItems"]
+        checks.append(lambda value: None if len(value) <= max_items else ("", f"must have at most {max_items} items"))
+    
+    required = tuple(schema.get("required", ()))
+    if required:
+        def check_required(value):
+            for key in required:
+                if key not in value:
+                    return f".{key}", "is required"
+            return None
+        checks.append(check_required)
+    
+    properties = {key: compile_schema(subschema) for key, subschema in schema.get("properties", {}).items()}
+    extra_schema = schema.get("additionalProperties")
+    extra_validator = compile_schema(extra_schema) if isinstance(extra_schema, dict) else None
+    if properties or extra_validator:
+        def check_properties(value):
+            for key, item in value.items():
+                validator = properties.get(key, extra_validator)
+                violation = validator(item) if validator else None
+                if violation:
+                    return f".{key}{violation[0]}", violation[1]
+            return None
+        checks.append(check_properties)
+    
+    if "items" in schema:
+        item_validator = compile_schema(schema["items"])
+        
+        def check_items(value):
+            for index, item in enumerate(value):
+                violation = item_validator(item)
+                if violation:
+                    return f"[{index}]{violation[0]}", violation[1]
+            return None
+        checks.append(check_items)
+    
+    def validate(value) -> Optional[Tuple[str, str]]:
+        # Checks after the type check assume the type is right, so stop at the first violation
+        for check in checks:
+            violation = check(value)
+            if violation:
+                return violation
+        return None
+    
+    return validate
+
+# Optional on tools that change an existing task: the version the caller last read (see list_tasks)
+EXPECTED_VERSION_SCHEMA = {
+    "type": "integer",
+    "minimum": 0,
+    "description": "Fail with a conflict unless the task is still at this version"
+}
+
+def build_tool_definitions() -> list[types.Tool]:
+    """
+    Tools for task and role management. Built once at import; see TOOL_DEFINITIONS.
+    """
+    tools = [
+        types.Tool(
+            name="create_task",
+            description="Create a new task (Orchestrator, Architect, Analyst)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string", "description": "Task title"},
+                    "description": {"type": "string", "description": "Task description"},
+                    "dependencies": {
+                        "type": "array", 
+                        "items": {"type": "string"},
+                        "description": "List of task dependencies"
+                    },
+                    "priority": {
+                        "type": "integer",
+                        "description": "Scheduling priority, higher first (default 0)"
+                    },
+                    "create_trello_card": {
+                        "type": "boolean",
+                        "description": "Create corresponding Trello card",
+                        "default": True
+                    }
+                },
+                "required": ["title", "description"],
+            },
+        ),
+        types.Tool(
+            name="assign_task",
+            description="Assign task to a specific role (Orchestrator, Architect)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "task_id": {"type": "string", "description": "Task ID to assign"},
+                    "role": {
+                        "type": "string", 
+                        "enum": ["architect", "coder", "analyst", "devops"],
+                        "description": "Role to assign the task to"
+                    },
+                    "expected_version": EXPECTED_VERSION_SCHEMA
+                },
+                "required": ["task_id", "role"],
+            },
+        ),
+        types.Tool(
+            name="complete_task",
+            description="Complete a task and return control to Orchestrator",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "task_id": {"type": "string", "description": "Task ID to complete"},
+                    "completion_notes": {"type": "string", "description": "Notes about completion"},
+                    "expected_version": EXPECTED_VERSION_SCHEMA
+                },
+                "required": ["task_id"],
+            },
+        ),
+        types.Tool(
+            name="switch_role",
+            description="Switch the calling session (or the agent named by _meta.agent_id) to a different role (Orchestrator only)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "role": {
+                        "type": "string", 
+                        "enum": ["architect", "coder", "analyst", "devops"],
+                        "description": "Role to switch to"
+                    },
+                    "reason": {"type": "string", "description": "Reason for switching"}
+                },
+                "required": ["role"],
+            },
+        ),
+        types.Tool(
+            name="return_to_orchestrator",
+            description="Return control to Orchestrator",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "reason": {"type": "string", "description": "Reason for returning"}
+                },
+            },
+        ),
+        types.Tool(
+            name="get_status",
+            description="Get current system status",
+            inputSchema={
+                "type": "object",
+                "properties": {},
+            },
+        ),
+        types.Tool(
+            name="list_tasks",
+            description="List tasks with optional status filter, one page at a time",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "status": {
+                        "type": "string", 
+                        "enum": ["TODO", "IN_PROGRESS", "REVIEW", "DONE", "BLOCKED"],
+                        "description": "Filter by task status"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": LIST_MAX_PAGE_SIZE,
+                        "description": f"Tasks per page (default {LIST_PAGE_SIZE})"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Cursor returned by the previous page"
+                    },
+                    "sort_by": {
+                        "type": "string",
+                        "enum": list(TASK_SORT_FIELDS),
+                        "description": "Field to order tasks by (default id)"
+                    },
+                    "order": {
+                        "type": "string",
+                        "enum": ["asc", "desc"],
+                        "description": "Sort direction (default asc)"
+                    }
+                },
+            },
+        ),
+        types.Tool(
+            name="search_tasks",
+            description="Find tasks by words in their title, description or comments, best matches first",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "Words to search for"},
+                    "status": {
+                        "type": "string",
+                        "enum": ["TODO", "IN_PROGRESS", "REVIEW", "DONE", "BLOCKED"],
+                        "description": "Only tasks with this status"
+                    },
+                    "role": {
+                        "type": "string",
+                        "enum": [role.value for role in RoleType] + ["unassigned"],
+                        "description": "Only tasks assigned to this role, or unassigned ones"
+                    },
+                    "match": {
+                        "type": "string",
+                        "enum": ["all", "any"],
+                        "description": "Find tasks that use all of the words (default) or any of them"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": LIST_MAX_PAGE_SIZE,
+                        "description": f"Maximum tasks to return (default {SEARCH_DEFAULT_LIMIT})"
+                    }
+                },
+                "required": ["query"],
+            },
+        ),
+        types.Tool(
+            name="export_tasks",
+            description="Export tasks to local JSON file",
+            inputSchema={
+                "type": "object",
+                "properties": {},
+            },
+        ),
+        types.Tool(
+            name="check_mcp_trello",
+            description="Check if MCP Trello server is available",
+            inputSchema={
+                "type": "object",
+                "properties": {},
+            },
+        ),
+        types.Tool(
+            name="show_role_permissions",
+            description="Show current role permissions and capabilities",
+            inputSchema={
+                "type": "object",
+                "properties": {},
+            },
+        ),
+        types.Tool(
+            name="list_roles",
+            description="List all available roles with their permissions",
+            inputSchema={
+                "type": "object",
+                "properties": {},
+            },
+        ),
+        types.Tool(
+            name="write_comment",
+            description="Add a comment to a task (available to all roles)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "task_id": {"type": "string", "description": "Task ID to comment on"},
+                    "comment": {"type": "string", "description": "Comment text to add"},
+                    "expected_version": EXPECTED_VERSION_SCHEMA
+                },
+                "required": ["task_id", "comment"],
+            },
+        ),
+        types.Tool(
+            name="create_tasks",
+            description="Create several tasks in one call; all are created or none (Orchestrator, Architect, Analyst)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "tasks": {
+                        "type": "array",
+                        "maxItems": BATCH_MAX_ITEMS,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "title": {"type": "string", "description": "Task title"},
+                                "description": {"type": "string", "description": "Task description"},
+                                "dependencies": {
+                                    "type": "array",
+                                    "items": {"type": "string"},
+                                    "description": "Task IDs, or \"#N\" for the task created by item N of this batch"
+                                },
+                                "priority": {"type": "integer", "description": "Scheduling priority, higher first"},
+                                "create_trello_card": {"type": "boolean", "description": "Whether to create a Trello card"}
+                            },
+                            "required": ["title", "description"],
+                        },
+                    }
+                },
+                "required": ["tasks"],
+            },
+        ),
+        types.Tool(
+            name="assign_tasks",
+            description="Assign several tasks in one call; all are assigned or none (Orchestrator, Architect)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "assignments": {
+                        "type": "array",
+                        "maxItems": BATCH_MAX_ITEMS,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "task_id": {"type": "string", "description": "Task ID to assign"},
+                                "role": {
+                                    "type": "string",
+                                    "enum": ["architect", "coder", "analyst", "devops"],
+                                    "description": "Role to assign to"
+                                },
+                                "expected_version": EXPECTED_VERSION_SCHEMA
+                            },
+                            "required": ["task_id", "role"],
+                        },
+                    }
+                },
+                "required": ["assignments"],
+            },
+        ),
+        types.Tool(
+            name="complete_tasks",
+            description="Complete several tasks assigned to the current role; all are completed or none",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "completions": {
+                        "type": "array",
+                        "maxItems": BATCH_MAX_ITEMS,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "task_id": {"type": "string", "description": "Task ID to complete"},
+                                "completion_notes": {"type": "string", "description": "Notes about completion"},
+                                "expected_version": EXPECTED_VERSION_SCHEMA
+                            },
+                            "required": ["task_id"],
+                        },
+                    }
+                },
+                "required": ["completions"],
+            },
+        ),
+        types.Tool(
+            name="write_comments",
+            description="Add several comments in one call; all are added or none (available to all roles)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "comments": {
+                        "type": "array",
+                        "maxItems": BATCH_MAX_ITEMS,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "task_id": {"type": "string", "description": "Task ID to comment on"},
+                                "comment": {"type": "string", "description": "Comment text to add"},
+                                "expected_version": EXPECTED_VERSION_SCHEMA
+                            },
+                            "required": ["task_id", "comment"],
+                        },
+                    }
+                },
+                "required": ["comments"],
+            },
+        ),
+        types.Tool(
+            name="get_ready_tasks",
+            description="List TODO tasks whose dependencies are all done, one page at a time",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": LIST_MAX_PAGE_SIZE,
+                        "description": f"Tasks per page (default {LIST_PAGE_SIZE})"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Cursor returned by the previous page"
+                    }
+                },
+            },
+        ),
+        types.Tool(
+            name="schedule_tasks",
+            description="Assign ready tasks to roles in one batch, up to each role's capacity (Orchestrator only)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "policy": {
+                        "type": "string",
+                        "enum": list(SCHEDULING_POLICIES),
+                        "description": f"Order in which ready tasks are assigned (default {SCHEDULER_POLICY})"
+                    },
+                    "capacity": {
+                        "type": "object",
+                        "additionalProperties": {"type": "integer", "minimum": 0},
+                        "description": "IN_PROGRESS task limit per role, e.g. {\"coder\": 3}; roles left out keep their configured limit"
+                    },
+                    "dry_run": {
+                        "type": "boolean",
+                        "description": "Show the assignments without making them"
+                    }
+                },
+            },
+        ),
+        types.Tool(
+            name="get_metrics",
+            description="Show call counts, error counts and latency percentiles per tool, storage job and Trello call",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "kind": {
+                        "type": "string",
+                        "enum": list(METRICS_KINDS),
+                        "description": "Only show one kind of operation"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["text", "json", "prometheus"],
+                        "description": "Output format (default text)"
+                    }
+                },
+            },
+        ),
+        types.Tool(
+            name="query_transitions",
+            description="Search the role transition history, newest first",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "role": {
+                        "type": "string",
+                        "enum": [role.value for role in RoleType],
+                        "description": "Only transitions from or to this role"
+                    },
+                    "task_id": {"type": "string", "description": "Only transitions for this task"},
+                    "since": {"type": "string", "description": "ISO 8601 time; only transitions at or after it"},
+                    "until": {"type": "string", "description": "ISO 8601 time; only transitions at or before it"},
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": LIST_MAX_PAGE_SIZE,
+                        "description": f"Maximum transitions to return (default {LIST_PAGE_SIZE})"
+                    }
+                },
+            },
+        ),
+        types.Tool(
+            name="get_critical_path",
+            description="Show the longest chain of unfinished tasks that depend on each other",
+            inputSchema={
+                "type": "object",
+                "properties": {},
+            },
+        ),
+        types.Tool(
+            name="get_topological_order",
+            description="List tasks in dependency order, every task after the tasks it depends on",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": LIST_MAX_PAGE_SIZE,
+                        "description": f"Tasks to show (default {LIST_PAGE_SIZE})"
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "Position in the order to start from"
+                    }
+                },
+            },
+        ),
+    ]
+    
+    # Add Trello-specific tools if available
+    if TRELLO_AVAILABLE:
+        tools.append(
+            types.Tool(
+                name="sync_to_trello",
+                description="Sync all tasks to Trello board",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "concurrency": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "description": "Maximum Trello operations in flight at once"
+                        }
+                    },
+                },
+            )
+        )
+    
+    return tools
+
+TOOL_DEFINITIONS = build_tool_definitions()
+TOOL_LIST_RESULT = types.ListToolsResult(tools=TOOL_DEFINITIONS)
+TOOL_VALIDATORS = {tool.name: compile_schema(tool.inputSchema) for tool in TOOL_DEFINITIONS}
+
+# Tool handlers by name, filled by @tool_handler; each takes the tool name and its validated arguments.
+# Calls run concurrently and await between changing tasks in memory and saving them. The saves are
+# versioned: one based on a version another writer replaced raises TaskVersionConflict and run_tool
+# reloads the stored tasks. Role transitions are only recorded once their save succeeded, and card
+# writes, which check for a card and then create one, hold the task's trello_card_locks entry.
+TOOL_HANDLERS: Dict[str, Callable[[str, dict], Awaitable[list]]] = {}
+
+def tool_handler(*names: str):
+    """Register the decorated coroutine as the handler of the given tools"""
+    def register(handler):
+        for tool_name in names:
+            TOOL_HANDLERS[tool_name] = handler
+        return handler
+    return register
+
+@server.list_tools()
+async def handle_list_tools(request: types.ListToolsRequest) -> types.ListToolsResult:
+    """
+    List available tools for task and role management.
+    """
+    return TOOL_LIST_RESULT
+
+# Arguments are checked by run_tool with validators compiled from the schemas
+@server.call_tool(validate_input=False)
+async def handle_call_tool(
+    name: str, arguments: dict | None
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    """
+    Run a tool call and log its outcome and duration.
+    
+    Records logged while the call runs carry the tool name and the task id it targets.
+    """
+    context = {"tool": name}
+    if arguments and arguments.get("task_id"):
+        context["task_id"] = arguments["task_id"]
+    context_token = log_context.set(context)
+    notifications.track(server.request_context.session)
+    started_at = time.perf_counter()
+    try:
+        result = await run_tool(name, arguments)
+        duration = time.perf_counter() - started_at
+        failed = bool(result) and result[0].text.startswith("❌")
+        metrics.observe("tool", name, duration, failed)
+        if failed:
+            logger.warning("Tool call failed: %s", result[0].text, extra={"duration_ms": round(duration * 1000, 3)})
+        else:
+            logger.info("Tool call finished", extra={"duration_ms": round(duration * 1000, 3)})
+        return result
+    finally:
+        log_context.reset(context_token)
+
+async def run_tool(
+    name: str, arguments: dict | None
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    """
+    Validate the arguments against the tool's compiled schema and run its handler.
+    """
+    handler = TOOL_HANDLERS.get(name)
+    if handler is None:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Unknown tool: {name}"
+        )]
+    
+    if not arguments:
+        arguments = {}
+    
+    validate = TOOL_VALIDATORS.get(name)
+    violation = validate(arguments) if validate else None
+    if violation:
+        location, problem = violation
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Invalid argument {location.lstrip('.') or 'arguments'}: {problem}"
+        )]
+    
+    try:
+        await sync_external_changes()
+        return await handler(name, arguments)
+    except TaskVersionConflict as e:
+        # Another writer saved these tasks first; take its state so a retry starts from it
+        await reload_stored_tasks(e.task_ids)
+        return [types.TextContent(
+            type="text",
+            text=f"❌ {e}"
+        )]
+    except TaskSaveError as e:
+        # The change only exists in memory; go back to what is stored so memory does not claim it
+        try:
+            await reload_stored_tasks(e.task_ids)
+        except Exception as reload_error:
+            logger.error("Error reloading tasks %s after a failed save: %s", e.task_ids, reload_error)
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: {str(e)}"
+        )]
+    except Exception as e:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: {str(e)}"
+        )]
+
+@tool_handler("create_task")
+async def tool_create_task(name: str, arguments: dict) -> list[types.TextContent]:
+    global task_counter
+    current_role = roles.current()
+    
+    if not has_permission(current_role, Permission.CREATE_TASK):
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Role {current_role.value} cannot create tasks. Required permission: {Permission.CREATE_TASK.value}"
+        )]
+    
+    title = arguments.get("title")
+    description = arguments.get("description")
+    dependencies = arguments.get("dependencies", [])
+    should_create_trello_card = arguments.get("create_trello_card", True)
+    
+    if not title or not description:
+        return [types.TextContent(
+            type="text",
+            text="❌ Error: Title and description are required"
+        )]
+    
+    # Dependencies may name tasks that do not exist yet, so the new one could close a cycle
+    task_id = f"TASK-{task_counter + 1:03d}"
+    cycle = tasks.graph.find_cycle(task_id, dependencies)
+    if cycle:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Dependencies would create a cycle: {' -> '.join(cycle)}"
+        )]
+    task_counter += 1
+    
+    task = Task(
+        id=task_id,
+        title=title,
+        description=description,
+        status=TaskStatus.TODO,
+        assigned_role=None,
+        created_by=RoleType.ORCHESTRATOR,
+        created_at=datetime.now(),
+        updated_at=datetime.now(),
+        dependencies=dependencies,
+        priority=int(arguments.get("priority", 0)),
+        git_branch=None,
+        comments=[],
+        subtasks=[],
+        trello_card_id=None,
+        version=1
+    )
+    
+    tasks[task_id] = task
+    
+    # Save locally; a task that could not be stored is taken back out, id included
+    try:
+        await storage_executor.run(save_task_locally, storage_copy(task))
+    except (TaskVersionConflict, TaskSaveError):
+        restore_tasks({task_id: None}, counter=(task_number(task_id) - 1, task_number(task_id)))
+        raise
+    
+    # Queue the Trello card if requested and available; the outbox worker creates it
+    trello_card_queued = False
+    if should_create_trello_card and trello_mode != TrelloMode.NONE:
+        trello_card_queued = await queue_trello_sync(task)
+        logger.debug("Trello card for task %s queued", task_id)
+    else:
+        logger.debug("Trello not available, saving task locally")
+    
+    notifications.list_changed()
+    
+    trello_info = " (Trello card queued)" if trello_card_queued else " (saved locally)"
+    return [types.TextContent(
+        type="text",
+        text=f"✅ Task {task_id} created successfully: {title}{trello_info}"
+    )]
+
+@tool_handler("assign_task")
+async def tool_assign_task(name: str, arguments: dict) -> list[types.TextContent]:
+    current_role = roles.current()
+    if not has_permission(current_role, Permission.ASSIGN_TASK):
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Role {current_role.value} cannot assign tasks. Required permission: {Permission.ASSIGN_TASK.value}"
+        )]
+    
+    task_id = arguments.get("task_id")
+    role_name = arguments.get("role")
+    
+    if not task_id or not role_name:
+        return [types.TextContent(
+            type="text",
+            text="❌ Error: Task ID and role are required"
+        )]
+    
+    if task_id not in tasks:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Task {task_id} not found"
+        )]
+    
+    try:
+        role = RoleType(role_name)
+    except ValueError:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Invalid role: {role_name}"
+        )]
+    
+    task = tasks[task_id]
+    
+    conflict = version_mismatch(task, arguments.get("expected_version"))
+    if conflict:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ {conflict}"
+        )]
+    
+    # Check dependencies
+    blocking_dep_id = tasks.find_unfinished_dependency(task)
+    if blocking_dep_id:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Task {task_id} is blocked by dependency {blocking_dep_id}"
+        )]
+    
+    task.assigned_role = role
+    task.status = TaskStatus.IN_PROGRESS
+    touch_task(task)
+    tasks.reindex(task)
+    
+    # Create transition
+    transition = RoleTransition(
+        from_role=RoleType.ORCHESTRATOR,
+        to_role=role,
+        task_id=task_id,
+        reason=f"Task {task_id} assigned to {role.value}",
+        timestamp=datetime.now()
+    )
+    
+    # Save locally; the transition is only recorded once the task change is stored
+    await storage_executor.run(save_task_locally, storage_copy(task))
+    await storage_executor.run(save_transition_locally, transition)
+    transitions.append(transition)
+    
+    # Queue the Trello card update if available; the outbox worker sends it
+    if trello_mode != TrelloMode.NONE:
+        if await queue_trello_update(task):
+            logger.debug("Trello card update queued for task %s", task_id)
+    else:
+        logger.debug("Trello not available, updated task %s locally", task_id)
+    
+    notifications.resources_updated([task_id])
+    
+    return [types.TextContent(
+        type="text",
+        text=f"✅ Task {task_id} assigned to {role.value}"
+    )]
+
+@tool_handler("complete_task")
+async def tool_complete_task(name: str, arguments: dict) -> list[types.TextContent]:
+    current_role = roles.current()
+    task_id = arguments.get("task_id")
+    completion_notes = arguments.get("completion_notes", "")
+    
+    if not task_id:
+        return [types.TextContent(
+            type="text",
+            text="❌ Error: Task ID is required"
+        )]
+    
+    if task_id not in tasks:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Task {task_id} not found"
+        )]
+    
+    task = tasks[task_id]
+    
+    if task.assigned_role != current_role:
+        assigned_role_name = task.assigned_role.value if task.assigned_role else "None"
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Only assigned role {assigned_role_name} can complete this task"
+        )]
+    
+    conflict = version_mismatch(task, arguments.get("expected_version"))
+    if conflict:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ {conflict}"
+        )]
+    
+    task.status = TaskStatus.DONE
+    touch_task(task)
+    task.comments.append({
+        "role": current_role.value,
+        "comment": f"Task completed: {completion_notes}",
+        "timestamp": datetime.now().isoformat()
+    })
+    unblocked_ids = tasks.reindex(task)
+    
+    # Create transition back to Orchestrator
+    transition = RoleTransition(
+        from_role=current_role,
+        to_role=RoleType.ORCHESTRATOR,
+        task_id=task_id,
+        reason=f"Task {task_id} completed by {current_role.value}",
+        timestamp=datetime.now()
+    )
+    
+    # Save locally; the transition is only recorded once the task change is stored
+    await storage_executor.run(save_task_locally, storage_copy(task))
+    await storage_executor.run(save_transition_locally, transition)
+    transitions.append(transition)
+    
+    # Queue the Trello card update if available; the outbox worker sends it
+    if trello_mode != TrelloMode.NONE:
+        if await queue_trello_update(task):
+            logger.debug("Trello card update queued for completed task %s", task_id)
+    else:
+        logger.debug("Trello not available, updated completed task %s locally", task_id)
+    
+    notifications.resources_updated([task_id])
+    
+    unblocked_info = f"\n🔓 Now ready: {', '.join(sorted(unblocked_ids, key=task_number))}" if unblocked_ids else ""
+    return [types.TextContent(
+        type="text",
+        text=f"✅ Task {task_id} completed, returning control to Orchestrator{unblocked_info}"
+    )]
+
+@tool_handler("switch_role")
+async def tool_switch_role(name: str, arguments: dict) -> list[types.TextContent]:
+    current_role = roles.current()
+    if not has_permission(current_role, Permission.SWITCH_ROLE):
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Role {current_role.value} cannot switch roles. Required permission: {Permission.SWITCH_ROLE.value}"
+        )]
+    
+    role_name = arguments.get("role")
+    reason = arguments.get("reason", "")
+    
+    if not role_name:
+        return [types.TextContent(
+            type="text",
+            text="❌ Error: Role is required"
+        )]
+    
+    try:
+        new_role = RoleType(role_name)
+    except ValueError:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Invalid role: {role_name}"
+        )]
+    
+    if new_role == RoleType.ORCHESTRATOR:
+        return [types.TextContent(
+            type="text",
+            text="❌ Error: Already in Orchestrator role"
+        )]
+    
+    # Create transition
+    transition = RoleTransition(
+        from_role=RoleType.ORCHESTRATOR,
+        to_role=new_role,
+        task_id=None,
+        reason=reason or f"Switching to {new_role.value} role",
+        timestamp=datetime.now()
+    )
+    
+    # Save transitions locally, then switch
+    await storage_executor.run(save_transition_locally, transition)
+    transitions.append(transition)
+    roles.switch(new_role)
+    
+    return [types.TextContent(
+        type="text",
+        text=f"✅ Switched to {new_role.value} role"
+    )]
+
+@tool_handler("write_comment")
+async def tool_write_comment(name: str, arguments: dict) -> list[types.TextContent]:
+    current_role = roles.current()
+    task_id = arguments.get("task_id")
+    comment = arguments.get("comment", "")
+    
+    if not task_id:
+        return [types.TextContent(
+            type="text",
+            text="❌ Error: Task ID is required"
+        )]
+    
+    if not comment:
+        return [types.TextContent(
+            type="text",
+            text="❌ Error: Comment text is required"
+        )]
+    
+    if task_id not in tasks:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Task {task_id} not found"
+        )]
+    
+    task = tasks[task_id]
+    
+    conflict = version_mismatch(task, arguments.get("expected_version"))
+    if conflict:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ {conflict}"
+        )]
+    
+    # Add comment to task
+    task.comments.append({
+        "role": current_role.value,
+        "comment": comment,
+        "timestamp": datetime.now().isoformat()
+    })
+    
+    touch_task(task)
+    tasks.reindex(task)
+    
+    # Save locally
+    await storage_executor.run(save_task_locally, storage_copy(task))
+    
+    # Queue the Trello card update if available; the outbox worker sends it
+    if trello_mode != TrelloMode.NONE:
+        if await queue_trello_update(task):
+            logger.debug("Trello card update queued for commented task %s", task_id)
+    else:
+        logger.debug("Trello not available, added comment to task %s locally", task_id)
+    
+    notifications.resources_updated([task_id])
+    
+    return [types.TextContent(
+        type="text",
+        text=f"✅ Comment added to task {task_id} by {current_role.value}"
+    )]
+
+@tool_handler("return_to_orchestrator")
+async def tool_return_to_orchestrator(name: str, arguments: dict) -> list[types.TextContent]:
+    current_role = roles.current()
+    if current_role == RoleType.ORCHESTRATOR:
+        return [types.TextContent(
+            type="text",
+            text="❌ Error: Already in Orchestrator role"
+        )]
+    
+    reason = arguments.get("reason", "")
+    
+    # Create transition
+    transition = RoleTransition(
+        from_role=current_role,
+        to_role=RoleType.ORCHESTRATOR,
+        task_id=None,
+        reason=reason or f"Returning control to Orchestrator",
+        timestamp=datetime.now()
+    )
+    
+    # Save transitions locally, then switch
+    await storage_executor.run(save_transition_locally, transition)
+    transitions.append(transition)
+    roles.switch(RoleType.ORCHESTRATOR)
+    
+    return [types.TextContent(
+        type="text",
+        text=f"✅ Returned control to Orchestrator"
+    )]
+
+@tool_handler("get_status")
+async def tool_get_status(name: str, arguments: dict) -> list[types.TextContent]:
+    current_role = roles.current()
+    tasks_by_status = tasks.count_by_status()
+    
+    recent_transitions = [
+        {
+            "from": t.from_role.value,
+            "to": t.to_role.value,
+            "task_id": t.task_id,
+            "reason": t.reason,
+            "timestamp": t.timestamp.isoformat()
+        }
+        for t in transitions.latest(5)
+    ]
+    
+    trello_status_map = {
+        TrelloMode.NONE: "❌ Not connected",
+        TrelloMode.CONNECTING: "⏳ Connecting",
+        TrelloMode.DIRECT_API: "✅ Direct API",
+        TrelloMode.MCP: "✅ MCP Server"
+    }
+    trello_status = trello_status_map.get(trello_mode, "❌ Unknown")
+    local_storage_status = f"✅ Available ({storage.mode.value})" if storage.exists() else "❌ Not available"
+    
+    # Get current role permissions
+    permissions = get_role_permissions(current_role)
+    permissions_list = ", ".join([perm.value for perm in sorted(permissions)])
+    
+    status_text = f"""
 🎭 **Current Role**: {current_role.value}
 🔑 **Permissions**: {permissions_list}
 📊 **Total Tasks**: {len(tasks)}
@@ -1119,185 +5020,612 @@ async def handle_call_tool(
 💾 **Local Storage**: {local_storage_status}
 📈 **Tasks by Status**:
 """
-            for status, count in tasks_by_status.items():
-                status_text += f"  - {status}: {count}\n"
-            
-            if recent_transitions:
-                status_text += "\n🔄 **Recent Transitions**:\n"
-                for t in recent_transitions:
-                    status_text += f"  - {t['from']} → {t['to']}: {t['reason']}\n"
-            
-            return [types.TextContent(
-                type="text",
-                text=status_text
-            )]
-        
-        elif name == "list_tasks":
-            status_filter = arguments.get("status")
-            
-            filtered_tasks = list(tasks.values())
-            if status_filter:
-                try:
-                    status = TaskStatus(status_filter)
-                    filtered_tasks = [t for t in filtered_tasks if t.status == status]
-                except ValueError:
-                    return [types.TextContent(
-                        type="text",
-                        text=f"❌ Error: Invalid status: {status_filter}"
-                    )]
-            
-            if not filtered_tasks:
-                return [types.TextContent(
-                    type="text",
-                    text="📝 No tasks found" + (f" with status {status_filter}" if status_filter else "")
-                )]
-            
-            tasks_text = f"📋 **Tasks** ({len(filtered_tasks)} found):\n\n"
-            for task in filtered_tasks:
-                if task.trello_card_id:
-                    if trello_mode == TrelloMode.MCP:
-                        trello_info = f" [🔗 MCP Trello: {task.trello_card_id}]"
-                    else:
-                        trello_info = f" [🔗 Trello: {task.trello_card_id}]"
-                else:
-                    trello_info = " [💾 Local]"
-                
-                tasks_text += f"**{task.id}**: {task.title}{trello_info}\n"
-                tasks_text += f"  Status: {task.status.value}\n"
-                tasks_text += f"  Assigned to: {task.assigned_role.value if task.assigned_role else 'Unassigned'}\n"
-                tasks_text += f"  Description: {task.description}\n"
-                if task.dependencies:
-                    tasks_text += f"  Dependencies: {', '.join(task.dependencies)}\n"
-                tasks_text += "\n"
-            
-            return [types.TextContent(
-                type="text",
-                text=tasks_text
-            )]
-        
-        elif name == "export_tasks":
-            save_tasks_locally()
-            save_transitions_locally()
-            
+    for status, count in tasks_by_status.items():
+        status_text += f"  - {status}: {count}\n"
+    
+    active_roles = roles.active_roles()
+    if active_roles:
+        status_text += "\n👥 **Active Roles**: " + ", ".join(
+            f"{role.value} ×{count}" for role, count in sorted(active_roles.items())
+        ) + "\n"
+    
+    status_text += f"\n📮 **Trello Outbox**: {len(trello_outbox.entries)} pending, {trello_outbox.sent} sent\n"
+    if trello_outbox.last_error:
+        status_text += f"  - Last error ({trello_outbox.last_error_at.strftime('%Y-%m-%d %H:%M:%S')}): {trello_outbox.last_error}\n"
+    
+    status_text += "\n⚙️ **I/O Queues**:\n"
+    for executor in (storage_executor, trello_executor):
+        io_stats = executor.stats()
+        status_text += (
+            f"  - {executor.name}: depth {io_stats['queue_depth']}, "
+            f"completed {io_stats['completed']}, failed {io_stats['failed']}, "
+            f"avg {io_stats['avg_latency_ms']}ms, max {io_stats['max_latency_ms']}ms\n"
+        )
+    status_text += (
+        f"  - notifications: sent {notifications.sent}, coalesced {notifications.coalesced}\n"
+    )
+    
+    if recent_transitions:
+        status_text += "\n🔄 **Recent Transitions**:\n"
+        for t in recent_transitions:
+            status_text += f"  - {t['from']} → {t['to']}: {t['reason']}\n"
+    
+    return [types.TextContent(
+        type="text",
+        text=status_text
+    )]
+
+@tool_handler("list_tasks")
+async def tool_list_tasks(name: str, arguments: dict) -> list[types.TextContent]:
+    status_filter = arguments.get("status")
+    
+    if status_filter:
+        try:
+            status = TaskStatus(status_filter)
+            filtered_tasks = tasks.with_status(status)
+        except ValueError:
             return [types.TextContent(
                 type="text",
-                text=f"✅ Exported {len(tasks)} tasks and {len(transitions)} transitions to local files"
+                text=f"❌ Error: Invalid status: {status_filter}"
             )]
-        
-        elif name == "check_mcp_trello":
-            if check_mcp_trello_availability():
-                return [types.TextContent(
-                    type="text",
-                    text="✅ MCP Trello server is available and accessible."
-                )]
+    else:
+        filtered_tasks = tasks.values()
+    
+    if not filtered_tasks:
+        return [types.TextContent(
+            type="text",
+            text="📝 No tasks found" + (f" with status {status_filter}" if status_filter else "")
+        )]
+    
+    sort_by = arguments.get("sort_by", "id")
+    if sort_by not in TASK_SORT_FIELDS:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Invalid sort field: {sort_by}"
+        )]
+    limit = max(1, min(int(arguments.get("limit", LIST_PAGE_SIZE)), LIST_MAX_PAGE_SIZE))
+    page, next_cursor = paginate_tasks(
+        filtered_tasks,
+        sort_by=sort_by,
+        descending=arguments.get("order") == "desc",
+        limit=limit,
+        cursor=arguments.get("cursor"),
+        filters={"status": status_filter} if status_filter else {},
+    )
+    
+    tasks_text = f"📋 **Tasks** ({len(page)} of {len(filtered_tasks)} found):\n\n"
+    for task in page:
+        if task.trello_card_id:
+            if trello_mode == TrelloMode.MCP:
+                trello_info = f" [🔗 MCP Trello: {task.trello_card_id}]"
             else:
-                return [types.TextContent(
-                    type="text",
-                    text="❌ MCP Trello server is not available or inaccessible."
-                )]
-        
-        elif name == "show_role_permissions":
-            permissions = get_role_permissions(current_role)
-            description = get_role_description(current_role)
-            
-            permissions_text = "\n".join([f"  - {perm.value}" for perm in sorted(permissions)])
-            
-            return [types.TextContent(
-                type="text",
-                text=f"🎭 **Current Role**: {current_role.value}\n"
-                     f"📝 **Description**: {description}\n"
-                     f"🔑 **Permissions**:\n{permissions_text}"
-            )]
+                trello_info = f" [🔗 Trello: {task.trello_card_id}]"
+        else:
+            trello_info = " [💾 Local]"
         
-        elif name == "list_roles":
-            roles_text = "👥 **Available Roles and Permissions**:\n\n"
-            
-            for role in RoleType:
-                permissions = get_role_permissions(role)
-                description = get_role_description(role)
-                permissions_list = ", ".join([perm.value for perm in sorted(permissions)])
-                
-                roles_text += f"**{role.value.title()}**:\n"
-                roles_text += f"  Description: {description}\n"
-                roles_text += f"  Permissions: {permissions_list}\n\n"
-            
-            return [types.TextContent(
-                type="text",
-                text=roles_text
-            )]
+        tasks_text += f"**{task.id}**: {task.title}{trello_info}\n"
+        tasks_text += f"  Status: {task.status.value} (version {task.version})\n"
+        tasks_text += f"  Assigned to: {task.assigned_role.value if task.assigned_role else 'Unassigned'}\n"
+        tasks_text += f"  Description: {task.description}\n"
+        if task.dependencies:
+            tasks_text += f"  Dependencies: {', '.join(task.dependencies)}\n"
+        if task.priority:
+            tasks_text += f"  Priority: {task.priority}\n"
+        tasks_text += "\n"
+    
+    if next_cursor:
+        tasks_text += f"➡️ More tasks available, pass cursor: {next_cursor}\n"
+    
+    return [types.TextContent(
+        type="text",
+        text=tasks_text
+    )]
+
+@tool_handler("search_tasks")
+async def tool_search_tasks(name: str, arguments: dict) -> list[types.TextContent]:
+    query = arguments.get("query", "")
+    words = set(search_words(query))
+    if not words:
+        return [types.TextContent(
+            type="text",
+            text="❌ Error: The query has no words to search for"
+        )]
+    
+    status = TaskStatus(arguments["status"]) if arguments.get("status") else None
+    role_name = arguments.get("role")
+    roles_filter = None
+    if role_name:
+        roles_filter = [None] if role_name == "unassigned" else [RoleType(role_name)]
+    limit = max(1, min(int(arguments.get("limit", SEARCH_DEFAULT_LIMIT)), LIST_MAX_PAGE_SIZE))
+    
+    results, match_count = tasks.search(query, status=status, roles=roles_filter, limit=limit,
+                                        match_all=arguments.get("match", "all") == "all")
+    if not results:
+        return [types.TextContent(
+            type="text",
+            text=f"📝 No tasks match \"{query}\""
+        )]
+    
+    search_text = f"🔎 **Search results** for \"{query}\" ({len(results)} of {match_count} matching tasks):\n\n"
+    for task, score in results:
+        search_text += f"**{task.id}**: {task.title}\n"
+        search_text += f"  Status: {task.status.value} (version {task.version}), score {score:.2f}\n"
+        search_text += f"  Assigned to: {task.assigned_role.value if task.assigned_role else 'Unassigned'}\n"
+        search_text += f"  Match: {search_snippet(task, words)}\n\n"
+    
+    return [types.TextContent(
+        type="text",
+        text=search_text
+    )]
+
+@tool_handler("export_tasks")
+async def tool_export_tasks(name: str, arguments: dict) -> list[types.TextContent]:
+    await storage_executor.run(export_tasks_to_json)
+    
+    return [types.TextContent(
+        type="text",
+        text=f"✅ Exported {len(tasks)} tasks and {len(transitions)} transitions to local files"
+    )]
+
+@tool_handler("check_mcp_trello")
+async def tool_check_mcp_trello(name: str, arguments: dict) -> list[types.TextContent]:
+    if check_mcp_trello_availability():
+        return [types.TextContent(
+            type="text",
+            text="✅ MCP Trello server is available and accessible."
+        )]
+    else:
+        return [types.TextContent(
+            type="text",
+            text="❌ MCP Trello server is not available or inaccessible."
+        )]
+
+@tool_handler("show_role_permissions")
+async def tool_show_role_permissions(name: str, arguments: dict) -> list[types.TextContent]:
+    current_role = roles.current()
+    permissions = get_role_permissions(current_role)
+    description = get_role_description(current_role)
+    
+    permissions_text = "\n".join([f"  - {perm.value}" for perm in sorted(permissions)])
+    
+    return [types.TextContent(
+        type="text",
+        text=f"🎭 **Current Role**: {current_role.value}\n"
+             f"📝 **Description**: {description}\n"
+             f"🔑 **Permissions**:\n{permissions_text}"
+    )]
+
+@tool_handler("list_roles")
+async def tool_list_roles(name: str, arguments: dict) -> list[types.TextContent]:
+    roles_text = "👥 **Available Roles and Permissions**:\n\n"
+    
+    for role in RoleType:
+        permissions = get_role_permissions(role)
+        description = get_role_description(role)
+        permissions_list = ", ".join([perm.value for perm in sorted(permissions)])
         
-        elif name == "sync_to_trello":
-            if trello_mode == TrelloMode.NONE:
-                return [types.TextContent(
-                    type="text",
-                    text="❌ Error: Trello integration not available"
-                )]
-            
-            if trello_mode == TrelloMode.MCP:
-                # Sync via MCP
-                synced_count = 0
-                for task in tasks.values():
-                    if not task.trello_card_id:
-                        trello_card_id = create_trello_card(task)
-                        if trello_card_id:
-                            task.trello_card_id = trello_card_id
-                            synced_count += 1
-                    else:
-                        update_trello_card(task)
-                
-                # Save locally after sync
-                save_tasks_locally()
-                
-                await server.request_context.session.send_resource_list_changed()
-                
-                return [types.TextContent(
-                    type="text",
-                    text=f"✅ Synced {synced_count} tasks to MCP Trello board"
-                )]
-            
-            elif trello_mode == TrelloMode.DIRECT_API:
-                # Sync via direct API
-                if not trello_board:
-                    return [types.TextContent(
-                        type="text",
-                        text="❌ Error: Trello board not connected"
-                    )]
-                
-                synced_count = 0
-                for task in tasks.values():
-                    if not task.trello_card_id:
-                        trello_card_id = create_trello_card(task)
-                        if trello_card_id:
-                            task.trello_card_id = trello_card_id
-                            synced_count += 1
-                    else:
-                        update_trello_card(task)
-                
-                # Save locally after sync
-                save_tasks_locally()
-                
-                await server.request_context.session.send_resource_list_changed()
-                
+        roles_text += f"**{role.value.title()}**:\n"
+        roles_text += f"  Description: {description}\n"
+        roles_text += f"  Permissions: {permissions_list}\n\n"
+    
+    return [types.TextContent(
+        type="text",
+        text=roles_text
+    )]
+
+# Items argument, required permission, batch function and result title of each batch tool
+BATCH_TOOLS = {
+    "create_tasks": ("tasks", Permission.CREATE_TASK, create_tasks_batch, "Tasks Created"),
+    "assign_tasks": ("assignments", Permission.ASSIGN_TASK, assign_tasks_batch, "Tasks Assigned"),
+    "complete_tasks": ("completions", None, complete_tasks_batch, "Tasks Completed"),
+    "write_comments": ("comments", None, write_comments_batch, "Comments Added"),
+}
+
+@tool_handler(*BATCH_TOOLS)
+async def tool_batch(name: str, arguments: dict) -> list[types.TextContent]:
+    current_role = roles.current()
+    items_key, permission, run_batch, title = BATCH_TOOLS[name]
+    if permission and not has_permission(current_role, permission):
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Role {current_role.value} cannot run {name}. Required permission: {permission.value}"
+        )]
+    
+    items = arguments.get(items_key) or []
+    if not items or len(items) > BATCH_MAX_ITEMS:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: {items_key} must list between 1 and {BATCH_MAX_ITEMS} items"
+        )]
+    
+    result = await run_batch(items)
+    return [types.TextContent(
+        type="text",
+        text=result.render(title)
+    )]
+
+@tool_handler("get_ready_tasks")
+async def tool_get_ready_tasks(name: str, arguments: dict) -> list[types.TextContent]:
+    ready_tasks = tasks.ready_tasks()
+    if not ready_tasks:
+        return [types.TextContent(
+            type="text",
+            text="📝 No tasks are ready to start"
+        )]
+    
+    limit = max(1, min(int(arguments.get("limit", LIST_PAGE_SIZE)), LIST_MAX_PAGE_SIZE))
+    page, next_cursor = paginate_tasks(
+        ready_tasks, limit=limit, cursor=arguments.get("cursor"), filters={"ready": True}
+    )
+    
+    ready_text = f"🚦 **Ready Tasks** ({len(page)} of {len(ready_tasks)}):\n\n"
+    for task in page:
+        ready_text += f"**{task.id}**: {task.title}\n"
+        dependents = len(tasks.graph.dependents.get(task.id, ()))
+        if dependents:
+            ready_text += f"  Unblocks: {dependents} task(s)\n"
+    if next_cursor:
+        ready_text += f"\n➡️ More tasks available, pass cursor: {next_cursor}\n"
+    
+    return [types.TextContent(
+        type="text",
+        text=ready_text
+    )]
+
+@tool_handler("schedule_tasks")
+async def tool_schedule_tasks(name: str, arguments: dict) -> list[types.TextContent]:
+    current_role = roles.current()
+    if not has_permission(current_role, Permission.ASSIGN_TASK):
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Role {current_role.value} cannot assign tasks. Required permission: {Permission.ASSIGN_TASK.value}"
+        )]
+    
+    policy = arguments.get("policy", SCHEDULER_POLICY)
+    if policy not in SCHEDULING_POLICIES:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Invalid scheduling policy: {policy}"
+        )]
+    
+    try:
+        capacity = SCHEDULER_ROLE_CAPACITY | {
+            RoleType(role_name): int(slots) for role_name, slots in arguments.get("capacity", {}).items()
+        }
+    except ValueError as e:
+        return [types.TextContent(
+            type="text",
+            text=f"❌ Error: Invalid capacity: {e}"
+        )]
+    
+    dry_run = arguments.get("dry_run", False)
+    plan = await run_scheduling_round(policy, capacity, dry_run=dry_run)
+    if not plan:
+        return [types.TextContent(
+            type="text",
+            text="📝 Nothing to schedule: no ready tasks or no free role capacity"
+        )]
+    
+    schedule_text = f"🗓️ **{'Planned' if dry_run else 'Scheduled'} Assignments** ({policy}, {len(plan)} tasks):\n\n"
+    for task, role in plan:
+        schedule_text += f"**{task.id}**: {task.title} → {role.value}\n"
+    
+    return [types.TextContent(
+        type="text",
+        text=schedule_text
+    )]
+
+@tool_handler("get_metrics")
+async def tool_get_metrics(name: str, arguments: dict) -> list[types.TextContent]:
+    output_format = arguments.get("format", "text")
+    if output_format == "prometheus":
+        return [types.TextContent(
+            type="text",
+            text=metrics.prometheus_text()
+        )]
+    
+    summaries = metrics.snapshot(arguments.get("kind"))
+    if output_format == "json":
+        return [types.TextContent(
+            type="text",
+            text=json.dumps({"uptime_s": round(time.time() - metrics.started_at, 1), "operations": summaries})
+        )]
+    
+    if not summaries:
+        return [types.TextContent(
+            type="text",
+            text="📊 No operations recorded yet"
+        )]
+    
+    metrics_text = f"📊 **Metrics** (since {datetime.fromtimestamp(metrics.started_at).strftime('%Y-%m-%d %H:%M:%S')}, busiest first):\n"
+    for kind, operations in summaries.items():
+        metrics_text += f"\n**{kind}**:\n"
+        for operation, summary in operations.items():
+            metrics_text += (
+                f"  - {operation}: {summary['calls']} calls, {summary['errors']} errors, "
+                f"avg {summary['avg_ms']}ms, p50 {summary['p50_ms']}ms, p95 {summary['p95_ms']}ms, "
+                f"p99 {summary['p99_ms']}ms, max {summary['max_ms']}ms\n"
+            )
+    
+    return [types.TextContent(
+        type="text",
+        text=metrics_text
+    )]
+
+@tool_handler("query_transitions")
+async def tool_query_transitions(name: str, arguments: dict) -> list[types.TextContent]:
+    time_range = {}
+    for bound in ("since", "until"):
+        if arguments.get(bound):
+            try:
+                moment = datetime.fromisoformat(arguments[bound])
+            except ValueError:
                 return [types.TextContent(
                     type="text",
-                    text=f"✅ Synced {synced_count} tasks to Trello board"
+                    text=f"❌ Error: Invalid {bound} time: {arguments[bound]}"
                 )]
-        
-        else:
-            return [types.TextContent(
-                type="text",
-                text=f"❌ Error: Unknown tool: {name}"
-            )]
+            # Transitions are stored in naive local time
+            time_range[bound] = moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
     
-    except Exception as e:
+    limit = max(1, min(int(arguments.get("limit", LIST_PAGE_SIZE)), LIST_MAX_PAGE_SIZE))
+    matches = await storage_executor.run(
+        transitions.query,
+        role=arguments.get("role"),
+        task_id=arguments.get("task_id"),
+        limit=limit,
+        **time_range
+    )
+    if not matches:
         return [types.TextContent(
             type="text",
-            text=f"❌ Error: {str(e)}"
+            text="📝 No matching transitions"
+        )]
+    
+    history_text = f"🔄 **Transitions** ({len(matches)} shown, newest first):\n\n"
+    for transition in matches:
+        task_note = f" [{transition.task_id}]" if transition.task_id else ""
+        history_text += (
+            f"- {transition.timestamp.strftime('%Y-%m-%d %H:%M:%S')}{task_note} "
+            f"{transition.from_role.value} → {transition.to_role.value}: {transition.reason}\n"
+        )
+    
+    return [types.TextContent(
+        type="text",
+        text=history_text
+    )]
+
+@tool_handler("get_critical_path")
+async def tool_get_critical_path(name: str, arguments: dict) -> list[types.TextContent]:
+    path = tasks.graph.critical_path()
+    if not path:
+        return [types.TextContent(
+            type="text",
+            text="📝 No unfinished tasks"
         )]
+    
+    path_text = f"🧭 **Critical Path** ({len(path)} tasks):\n\n"
+    for position, task_id in enumerate(path, 1):
+        task = tasks[task_id]
+        path_text += f"{position}. **{task.id}**: {task.title} ({task.status.value})\n"
+    
+    return [types.TextContent(
+        type="text",
+        text=path_text
+    )]
+
+@tool_handler("get_topological_order")
+async def tool_get_topological_order(name: str, arguments: dict) -> list[types.TextContent]:
+    order = tasks.graph.topological_order()
+    limit = max(1, min(int(arguments.get("limit", LIST_PAGE_SIZE)), LIST_MAX_PAGE_SIZE))
+    offset = max(0, int(arguments.get("offset", 0)))
+    window = order[offset:offset + limit]
+    if not window:
+        return [types.TextContent(
+            type="text",
+            text="📝 No tasks found" + (f" at offset {offset}" if offset else "")
+        )]
+    
+    order_text = f"🔢 **Dependency Order** ({offset + 1}-{offset + len(window)} of {len(order)}):\n\n"
+    for position, task_id in enumerate(window, offset + 1):
+        task = tasks[task_id]
+        order_text += f"{position}. **{task.id}**: {task.title} ({task.status.value})\n"
+    
+    return [types.TextContent(
+        type="text",
+        text=order_text
+    )]
+
+@tool_handler("sync_to_trello")
+async def tool_sync_to_trello(name: str, arguments: dict) -> list[types.TextContent]:
+    if trello_mode == TrelloMode.NONE:
+        return [types.TextContent(
+            type="text",
+            text="❌ Error: Trello integration not available"
+        )]
+    
+    if trello_mode == TrelloMode.CONNECTING:
+        return [types.TextContent(
+            type="text",
+            text="⏳ Trello is still connecting, try again shortly"
+        )]
+    
+    if trello_mode == TrelloMode.DIRECT_API and not trello_board:
+        return [types.TextContent(
+            type="text",
+            text="❌ Error: Trello board not connected"
+        )]
+    
+    concurrency = int(arguments.get("concurrency") or TRELLO_SYNC_CONCURRENCY)
+    task_list = list(tasks.values())
+    
+    # Report progress to clients that asked for it, about every 5%
+    request_meta = server.request_context.meta
+    progress_token = request_meta.progressToken if request_meta else None
+    progress_step = max(1, len(task_list) // 20)
+    
+    async def report_progress(done: int, total: int):
+        if done % progress_step == 0 or done == total:
+            logger.info("Trello sync progress: %s/%s", done, total)
+            if progress_token is not None:
+                await server.request_context.session.send_progress_notification(
+                    progress_token, done, total
+                )
+    
+    results = await bulk_sync_to_trello(task_list, concurrency, report_progress)
+    counts = {outcome: len(synced) for outcome, synced in results.items()}
+    
+    # Save locally after sync; only pushed cards changed local state
+    changed_tasks = results["created"] + results["updated"]
+    save_error = await save_pushed_cards(changed_tasks)
+    
+    if save_error:
+        # The outbox worker pushes and saves these cards again
+        for task in changed_tasks:
+            trello_outbox.enqueue(tasks.get(task.id, task))
+        await storage_executor.run(trello_outbox.save, trello_outbox.snapshot())
+    elif trello_outbox.entries:
+        # Whatever the outbox still held for these tasks has just been sent, unless they changed meanwhile
+        trello_outbox.discard(
+            task.id for task in changed_tasks + results["skipped"] if trello_card_is_current(tasks.get(task.id, task))
+        )
+        await storage_executor.run(trello_outbox.save, trello_outbox.snapshot())
+    
+    if changed_tasks:
+        notifications.resources_updated(task.id for task in changed_tasks)
+    
+    board_name = "MCP Trello board" if trello_mode == TrelloMode.MCP else "Trello board"
+    saved_info = f"\n⚠️ The card changes could not be saved and were queued again: {save_error}" if save_error else ""
+    return [types.TextContent(
+        type="text",
+        text=f"✅ Synced {len(task_list)} tasks to {board_name}: "
+             f"{counts['created']} created, {counts['updated']} updated, "
+             f"{counts['skipped']} skipped, {counts['failed']} failed{saved_info}"
+    )]
+
+async def write_metrics_periodically(path: str, interval: float = METRICS_INTERVAL):
+    """Rewrite the Prometheus text file every interval seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await storage_executor.run(metrics.write_prometheus, path)
+        except Exception as e:
+            logger.error("Error writing metrics to %s: %s", path, e)
+
+async def build_search_index(chunk_size: int = SEARCH_INDEX_CHUNK):
+    """Index every task for search_tasks a chunk at a time, so tool calls are served in between"""
+    started = time.perf_counter()
+    task_ids = list(tasks)
+    tasks.index_text(task_ids[:chunk_size])
+    for first in range(chunk_size, len(task_ids), chunk_size):
+        await asyncio.sleep(0)
+        if tasks.text.complete:
+            # A search finished the build first
+            return
+        tasks.index_text(task_ids[first:first + chunk_size])
+    tasks.text.complete = True
+    logger.info("Search index built for %s tasks in %.2fs", len(task_ids), time.perf_counter() - started)
+
+async def watch_storage_periodically(interval: float = STORAGE_POLL_INTERVAL):
+    """Take in other processes' changes every interval seconds, so idle clients are notified too"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sync_external_changes()
+        except Exception as e:
+            logger.error("Error reading changes from other processes: %s", e)
+
+# "stdio" serves one client over stdin/stdout; "http" serves many concurrent sessions
+# from one process, over streamable HTTP at /mcp and the older SSE transport at /sse
+TRANSPORT = os.getenv('TASK_TRANSPORT', 'stdio').lower()
+HTTP_HOST = os.getenv('TASK_HTTP_HOST', '127.0.0.1')
+HTTP_PORT = int(os.getenv('TASK_HTTP_PORT', '8000'))
+# Open HTTP connections (including idle SSE streams) beyond which new requests get a 503
+HTTP_MAX_CONNECTIONS = int(os.getenv('TASK_HTTP_MAX_CONNECTIONS', '1000'))
+# Answer streamable HTTP requests with a JSON body instead of an SSE stream
+HTTP_JSON_RESPONSE = os.getenv('TASK_HTTP_JSON_RESPONSE', 'false').lower() in ('1', 'true', 'yes')
+
+class StreamableHTTPEndpoint:
+    """ASGI app handing /mcp requests to the session manager"""
+    
+    def __init__(self, session_manager):
+        self.session_manager = session_manager
+    
+    async def __call__(self, scope, receive, send):
+        await self.session_manager.handle_request(scope, receive, send)
+
+def build_http_app():
+    """Starlette app serving every HTTP session from this process's shared task state"""
+    from contextlib import asynccontextmanager
+    from mcp.server.sse import SseServerTransport
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Mount, Route
+    
+    session_manager = StreamableHTTPSessionManager(app=server, json_response=HTTP_JSON_RESPONSE)
+    sse = SseServerTransport("/messages/")
+    
+    async def handle_sse(request):
+        async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+            await server.run(read_stream, write_stream, server.create_initialization_options())
+        return Response()
+    
+    @asynccontextmanager
+    async def lifespan(app):
+        async with session_manager.run():
+            logger.info("HTTP transport listening on http://%s:%s/mcp", HTTP_HOST, HTTP_PORT)
+            yield
+    
+    return Starlette(
+        routes=[
+            Route("/mcp", endpoint=StreamableHTTPEndpoint(session_manager)),
+            Route("/sse", endpoint=handle_sse, methods=["GET"]),
+            Mount("/messages/", app=sse.handle_post_message),
+        ],
+        lifespan=lifespan,
+    )
+
+async def serve_stdio():
+    logger.info("Starting MCP server with stdio transport...")
+    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+        logger.info("stdio transport established")
+        await server.run(read_stream, write_stream, server.create_initialization_options())
+
+async def serve_http():
+    import uvicorn
+    
+    logger.info("Starting MCP server with HTTP transport (at most %s connections)...", HTTP_MAX_CONNECTIONS)
+    config = uvicorn.Config(
+        build_http_app(),
+        host=HTTP_HOST,
+        port=HTTP_PORT,
+        limit_concurrency=HTTP_MAX_CONNECTIONS,
+        # Keep the server's own logging setup
+        log_config=None,
+    )
+    await uvicorn.Server(config).serve()
+
+def start_background_workers() -> List[asyncio.Task]:
+    """Start Trello initialization, the search index build and, as configured, the scheduler,
+    the metrics writer and the shared storage watcher"""
+    workers = [asyncio.create_task(build_search_index())]
+    if trello_mode == TrelloMode.CONNECTING:
+        workers.append(asyncio.create_task(start_trello_integration()))
+    if SCHEDULER_INTERVAL > 0:
+        workers.append(asyncio.create_task(run_scheduler_periodically()))
+    if METRICS_FILE:
+        workers.append(asyncio.create_task(write_metrics_periodically(METRICS_FILE)))
+    if isinstance(storage, SharedTaskStorage) and STORAGE_POLL_INTERVAL > 0:
+        workers.append(asyncio.create_task(watch_storage_periodically()))
+    return workers
 
 async def main():
     global trello_mode
-    logger.info("Starting main function...")
+    configure_logging()
+    logger.info("Task Orchestrator MCP Server starting...")
+    logger.debug("Python version: %s", sys.version)
+    logger.debug("Working directory: %s", os.getcwd())
+    workers: List[asyncio.Task] = []
     
     try:
         # Load existing data from local storage
@@ -1305,70 +5633,58 @@ async def main():
         try:
             load_tasks_locally()
             load_transitions_locally()
-            logger.info(f"Loaded {len(tasks)} tasks and {len(transitions)} transitions")
+            trello_outbox.load()
+            logger.info("Loaded %s tasks and %s transitions", len(tasks), len(transitions))
         except Exception as e:
-            logger.error(f"Error loading local data: {e}")
+            logger.error("Error loading local data: %s", e)
             # Continue with empty data
         
-        # Initialize Trello client
-        logger.info("Initializing Trello integration...")
-        try:
-            if init_trello_client():
-                if trello_mode == TrelloMode.MCP:
-                    logger.info("MCP Trello integration initialized")
-                elif trello_mode == TrelloMode.DIRECT_API:
-                    logger.info("Direct Trello API integration initialized")
-                else:
-                    logger.warning("Trello integration not available - using local storage")
-            else:
-                logger.warning("Trello integration not available - using local storage")
-        except Exception as e:
-            logger.error(f"Error initializing Trello: {e}")
-            trello_mode = TrelloMode.NONE
+        # Trello is initialized in the background once the transport is up;
+        # until then card writes are only recorded in the outbox
+        if TRELLO_AVAILABLE and trello_credentials():
+            trello_mode = TrelloMode.CONNECTING
+        else:
+            logger.warning("Trello integration not available - using local storage")
         
-        # Run the server using stdin/stdout streams
-        logger.info("Starting MCP server with stdio transport...")
+        # Workers only start running once the transport awaits, so they never delay startup
+        workers = start_background_workers()
+        logger.info("Server capabilities: %s", server.create_initialization_options().capabilities)
         try:
-            async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-                logger.info("stdio transport established")
-                
-                capabilities = server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
-                )
-                logger.info(f"Server capabilities: {capabilities}")
-                
-                await server.run(
-                    read_stream,
-                    write_stream,
-                    InitializationOptions(
-                        server_name="task-orchectrator-mcp",
-                        server_version="0.3.3",
-                        capabilities=capabilities,
-                    ),
-                )
-                logger.info("Server run completed")
+            if TRANSPORT == "http":
+                await serve_http()
+            else:
+                await serve_stdio()
+            logger.info("Server run completed")
         except Exception as e:
-            logger.error(f"Error in server communication: {e}")
+            logger.error("Error in server communication: %s", e)
             raise
             
     except Exception as e:
-        logger.error(f"Fatal error in main function: {e}")
-        logger.error(f"Error type: {type(e).__name__}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Fatal error in main function: %s (%s)", e, type(e).__name__)
         raise
+    finally:
+        # Pending outbox entries are on disk and will be sent on the next start
+        for worker in workers:
+            worker.cancel()
+        
+        # Let queued writes reach disk before the process exits
+        storage_executor.shutdown()
+        trello_executor.shutdown()
+        
+        if METRICS_FILE:
+            try:
+                metrics.write_prometheus(METRICS_FILE)
+            except Exception as e:
+                logger.error("Error writing metrics to %s: %s", METRICS_FILE, e)
 
 # Add entry point for direct execution
 if __name__ == "__main__":
+    configure_logging()
     logger.info("Starting MCP server as main module...")
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Server stopped by user (Ctrl+C)")
     except Exception as e:
-        logger.error(f"Server failed to start: {e}")
-        logger.error(f"Error type: {type(e).__name__}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Server failed to start: %s (%s)", e, type(e).__name__)
         sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""
+Fixtures shared by the tests.
+
+The server keeps its task store, storage backend and settings in module globals read at
+import time, so each test imports a fresh copy of the module inside its own working directory.
+"""
+
+import importlib
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+SERVER_MODULE = "task_orchectrator_mcp.server"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def load_server(tmp_path, monkeypatch):
+    """
+    Return a function that imports a fresh server module in tmp_path with the given
+    environment settings and loads whatever is already stored there. Calling it twice
+    gives two independent servers sharing one working directory.
+    """
+    loaded = []
+    monkeypatch.chdir(tmp_path)
+    for name in ("TRELLO_API_KEY", "TRELLO_TOKEN", "TRELLO_WORKING_BOARD_ID"):
+        monkeypatch.delenv(name, raising=False)
+
+    def load(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        sys.modules.pop(SERVER_MODULE, None)
+        server = importlib.import_module(SERVER_MODULE)
+        server.load_tasks_locally()
+        server.load_transitions_locally()
+        server.trello_outbox.load()
+        loaded.append(server)
+        return server
+
+    yield load
+    for server in loaded:
+        server.storage_executor.shutdown()
+        server.trello_executor.shutdown()
+    sys.modules.pop(SERVER_MODULE, None)
+
+
+async def call_tool(client, name: str, **arguments) -> str:
+    """Call a tool through an MCP client session and return the text of its answer"""
+    result = await client.call_tool(name, arguments)
+    return result.content[0].text
+
+
+def next_cursor(text: str):
+    """Cursor for the next page named in a list_tasks answer, or None on the last page"""
+    match = re.search(r"pass cursor: (\S+)", text)
+    return match.group(1) if match else None
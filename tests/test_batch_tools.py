@@ -0,0 +1,33 @@
+"""Who may run the batch tools, and what they accept"""
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from conftest import call_tool
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_batch_tools_follow_the_single_task_permissions(load_server):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await call_tool(client, "switch_role", role="analyst")
+
+        created = await call_tool(client, "create_tasks", tasks=[{"title": "Analysis", "description": "By an analyst"}])
+        assert created.startswith("✅ **Tasks Created**"), created
+
+        refused = await call_tool(client, "assign_tasks", assignments=[{"task_id": "TASK-001", "role": "coder"}])
+        assert refused.startswith("❌ Error: Role analyst cannot run assign_tasks"), refused
+
+
+async def test_assign_tasks_cannot_assign_to_the_orchestrator(load_server):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await call_tool(client, "create_task", title="Task", description="Ready")
+
+        single = await call_tool(client, "assign_task", task_id="TASK-001", role="orchestrator")
+        batch = await call_tool(client, "assign_tasks", assignments=[{"task_id": "TASK-001", "role": "orchestrator"}])
+
+        assert single.startswith("❌ Error: Invalid argument role"), single
+        assert batch.startswith("❌ Error: Invalid argument assignments"), batch
+        assert server.tasks["TASK-001"].assigned_role is None
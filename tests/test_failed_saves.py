@@ -0,0 +1,95 @@
+"""A change that could not be stored is not kept in memory either"""
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from conftest import call_tool
+
+pytestmark = pytest.mark.anyio
+
+
+def break_storage(server, monkeypatch):
+    def refuse(changed_tasks):
+        raise OSError("disk full")
+    monkeypatch.setattr(server.storage, "save_changed_tasks", refuse)
+
+
+async def test_failed_create_leaves_no_task_and_reuses_the_id(load_server, monkeypatch):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        with monkeypatch.context() as patch:
+            break_storage(server, patch)
+            for _ in range(2):
+                text = await call_tool(client, "create_task", title="Unsaved", description="Never stored")
+                assert text == "❌ Error: Task TASK-001 could not be saved: disk full"
+            assert await call_tool(client, "list_tasks") == "📝 No tasks found"
+
+        created = await call_tool(client, "create_task", title="Saved", description="Stored")
+        assert created.startswith("✅ Task TASK-001 created"), created
+        assert list(server.tasks) == ["TASK-001"]
+
+
+async def test_failed_assignment_goes_back_to_the_stored_task(load_server, monkeypatch):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await call_tool(client, "create_task", title="Task", description="Stored")
+        break_storage(server, monkeypatch)
+
+        text = await call_tool(client, "assign_task", task_id="TASK-001", role="coder")
+        assert text.startswith("❌ Error: Task TASK-001 could not be saved"), text
+        task = server.tasks["TASK-001"]
+        assert (task.assigned_role, task.status, task.version) == (None, server.TaskStatus.TODO, 1)
+        assert len(server.transitions) == 0
+
+
+async def test_failed_scheduling_round_changes_nothing(load_server, monkeypatch):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        for number in (1, 2):
+            await call_tool(client, "create_task", title=f"Task {number}", description="Ready")
+        break_storage(server, monkeypatch)
+
+        text = await call_tool(client, "schedule_tasks")
+        assert text.startswith("❌ Error: Tasks TASK-001, TASK-002 could not be saved"), text
+        for task_id in ("TASK-001", "TASK-002"):
+            task = server.tasks[task_id]
+            assert (task.assigned_role, task.status, task.version) == (None, server.TaskStatus.TODO, 1)
+        assert sorted(server.tasks.graph.ready) == ["TASK-001", "TASK-002"]
+        assert len(server.transitions) == 0
+
+
+async def test_failed_batch_create_leaves_no_tasks(load_server, monkeypatch):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        with monkeypatch.context() as patch:
+            break_storage(server, patch)
+            text = await call_tool(client, "create_tasks", tasks=[
+                {"title": "First", "description": "Never stored"},
+                {"title": "Second", "description": "Never stored", "dependencies": ["#1"]},
+            ])
+            assert text.startswith("❌ Error: Tasks TASK-001, TASK-002 could not be saved"), text
+            assert len(server.tasks) == 0
+            assert server.task_counter == 0
+
+        text = await call_tool(client, "create_tasks", tasks=[{"title": "Saved", "description": "Stored"}])
+        assert "TASK-001 created" in text, text
+        assert list(server.tasks) == ["TASK-001"]
+
+
+async def test_failed_batch_assignment_changes_no_task(load_server, monkeypatch):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        for number in (1, 2):
+            await call_tool(client, "create_task", title=f"Task {number}", description="Ready")
+        break_storage(server, monkeypatch)
+
+        text = await call_tool(client, "assign_tasks", assignments=[
+            {"task_id": "TASK-001", "role": "coder"},
+            {"task_id": "TASK-002", "role": "devops"},
+        ])
+        assert text.startswith("❌ Error: Tasks TASK-001, TASK-002 could not be saved"), text
+        for task_id in ("TASK-001", "TASK-002"):
+            task = server.tasks[task_id]
+            assert (task.assigned_role, task.status, task.version) == (None, server.TaskStatus.TODO, 1)
+        assert server.tasks.by_status[server.TaskStatus.IN_PROGRESS] == set()
+        assert len(server.transitions) == 0
@@ -0,0 +1,94 @@
+"""Several client sessions served by one process over the HTTP transport"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+import uvicorn
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from conftest import call_tool
+
+pytestmark = [
+    pytest.mark.anyio,
+    # The older client name is the one every supported mcp release has
+    pytest.mark.filterwarnings("ignore:Use `streamable_http_client` instead:DeprecationWarning"),
+]
+
+
+@asynccontextmanager
+async def running_http_app(server):
+    """Serve build_http_app() on a free local port, yielding its base URL"""
+    config = uvicorn.Config(server.build_http_app(), host="127.0.0.1", port=0, log_config=None)
+    http = uvicorn.Server(config)
+    serving = asyncio.create_task(http.serve())
+    while not http.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.01)
+    port = http.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        http.should_exit = True
+        await serving
+
+
+@asynccontextmanager
+async def client_session(url: str, transport: str):
+    connect = sse_client(f"{url}/sse") if transport == "sse" else streamablehttp_client(f"{url}/mcp")
+    async with connect as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+            yield session
+
+
+async def current_role(client, **meta) -> str:
+    result = await client.call_tool("get_status", {}, meta=meta or None)
+    line = next(line for line in result.content[0].text.splitlines() if "**Current Role**" in line)
+    return line.rsplit(": ", 1)[1]
+
+
+async def test_sessions_share_tasks_but_keep_their_own_roles(load_server):
+    server = load_server()
+    async with running_http_app(server) as url:
+        async with client_session(url, "streamable") as first, client_session(url, "sse") as second:
+            created = await call_tool(first, "create_task", title="From first", description="Made by the first session")
+            assert created.startswith("✅ Task TASK-001 created"), created
+
+            switched = await call_tool(first, "switch_role", role="coder", reason="Implement TASK-001")
+            assert switched == "✅ Switched to coder role"
+            assert await current_role(first) == "coder"
+            assert await current_role(second) == "orchestrator"
+
+            # The coder role may not create tasks; the other session still can
+            refused = await call_tool(first, "create_task", title="Refused", description="Coders cannot create tasks")
+            assert refused.startswith("❌")
+            created = await call_tool(second, "create_task", title="From second", description="Made by the second session")
+            assert created.startswith("✅ Task TASK-002 created"), created
+
+            # Both sessions see every task in the one shared store
+            for client in (first, second):
+                listing = await call_tool(client, "list_tasks")
+                assert "**TASK-001**: From first" in listing
+                assert "**TASK-002**: From second" in listing
+
+    assert sorted(server.tasks) == ["TASK-001", "TASK-002"]
+
+
+async def test_agent_ids_keep_their_role_across_sessions(load_server):
+    server = load_server()
+    async with running_http_app(server) as url:
+        async with client_session(url, "streamable") as first:
+            result = await first.call_tool("switch_role", {"role": "architect"}, meta={"agent_id": "planner"})
+            assert result.content[0].text == "✅ Switched to architect role"
+            assert await current_role(first, agent_id="planner") == "architect"
+            # The session itself, without the agent id, was not switched
+            assert await current_role(first) == "orchestrator"
+
+        # A new connection naming the same agent finds it in the same role
+        async with client_session(url, "streamable") as second:
+            assert await current_role(second, agent_id="planner") == "architect"
+            assert await current_role(second, agent_id="reviewer") == "orchestrator"
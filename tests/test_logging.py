@@ -0,0 +1,48 @@
+"""Records handed to the log writer thread"""
+
+import json
+import logging
+import queue
+
+
+def queued_logger(server, name: str):
+    records = queue.Queue()
+    handler = server.NonBlockingQueueHandler(records)
+    log = logging.getLogger(name)
+    log.addHandler(handler)
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    return log, handler, records
+
+
+def test_message_is_rendered_before_its_arguments_change(load_server):
+    server = load_server()
+    log, handler, records = queued_logger(server, "test-rendered-message")
+    task_ids = ["TASK-001"]
+
+    log.info("Saving %s", task_ids, extra={"task_id": "TASK-001"})
+    task_ids.append("TASK-002")
+
+    record = records.get_nowait()
+    assert (record.msg, record.args) == ("Saving ['TASK-001']", None)
+    entry = json.loads(server.JsonLogFormatter().format(record))
+    assert (entry["message"], entry["task_id"]) == ("Saving ['TASK-001']", "TASK-001")
+    log.removeHandler(handler)
+
+
+def test_traceback_is_rendered_by_the_caller(load_server):
+    server = load_server()
+    log, handler, records = queued_logger(server, "test-rendered-traceback")
+
+    try:
+        raise ValueError("broken")
+    except ValueError:
+        log.exception("Save failed")
+
+    record = records.get_nowait()
+    assert record.exc_info is None
+    entry = json.loads(server.JsonLogFormatter().format(record))
+    assert entry["message"] == "Save failed"
+    assert entry["exception"].endswith("ValueError: broken")
+    assert logging.Formatter("%(message)s").format(record).endswith("ValueError: broken")
+    log.removeHandler(handler)
@@ -0,0 +1,120 @@
+"""Paging through list_tasks and resources/list with cursors"""
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from conftest import call_tool, next_cursor
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_tasks(client, count: int):
+    for number in range(1, count + 1):
+        text = await call_tool(client, "create_task", title=f"Task {number}", description=f"Task number {number}")
+        assert text.startswith("✅"), text
+
+
+def listed_ids(text: str) -> list:
+    return [line.split("**")[1] for line in text.splitlines() if line.startswith("**TASK-")]
+
+
+async def test_list_tasks_pages_through_every_task(load_server):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await create_tasks(client, 7)
+
+        first = await call_tool(client, "list_tasks", limit=3)
+        assert listed_ids(first) == ["TASK-001", "TASK-002", "TASK-003"]
+        assert "(3 of 7 found)" in first
+
+        middle = await call_tool(client, "list_tasks", limit=3, cursor=next_cursor(first))
+        assert listed_ids(middle) == ["TASK-004", "TASK-005", "TASK-006"]
+
+        last = await call_tool(client, "list_tasks", limit=3, cursor=next_cursor(middle))
+        assert listed_ids(last) == ["TASK-007"]
+        assert next_cursor(last) is None
+
+
+async def test_list_tasks_pages_in_descending_order(load_server):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await create_tasks(client, 5)
+
+        first = await call_tool(client, "list_tasks", limit=2, order="desc")
+        assert listed_ids(first) == ["TASK-005", "TASK-004"]
+        second = await call_tool(client, "list_tasks", limit=2, order="desc", cursor=next_cursor(first))
+        assert listed_ids(second) == ["TASK-003", "TASK-002"]
+
+
+async def test_list_tasks_rejects_invalid_cursor(load_server):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await create_tasks(client, 2)
+
+        text = await call_tool(client, "list_tasks", cursor="not-a-cursor")
+        assert text.startswith("❌ Error: Invalid cursor")
+
+
+async def test_list_tasks_rejects_cursor_for_other_order(load_server):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await create_tasks(client, 3)
+
+        first = await call_tool(client, "list_tasks", limit=1)
+        text = await call_tool(client, "list_tasks", limit=1, order="desc", cursor=next_cursor(first))
+        assert text.startswith("❌ Error: Cursor was issued for a different sort order or filter")
+
+
+async def test_list_tasks_cursor_survives_deleted_tasks(load_server):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await create_tasks(client, 7)
+        first = await call_tool(client, "list_tasks", limit=3)
+
+        # The cursor's own task and the first task of the next page disappear
+        del server.tasks["TASK-003"]
+        del server.tasks["TASK-004"]
+
+        second = await call_tool(client, "list_tasks", limit=3, cursor=next_cursor(first))
+        assert listed_ids(second) == ["TASK-005", "TASK-006", "TASK-007"]
+        assert next_cursor(second) is None
+
+
+async def test_list_tasks_cursor_sees_tasks_added_after_it(load_server):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await create_tasks(client, 3)
+        first = await call_tool(client, "list_tasks", limit=2)
+        await call_tool(client, "create_task", title="Task 4", description="Added while paging")
+
+        second = await call_tool(client, "list_tasks", limit=2, cursor=next_cursor(first))
+        assert listed_ids(second) == ["TASK-003", "TASK-004"]
+
+
+async def test_resources_list_pages_with_cursors(load_server):
+    server = load_server(TASK_LIST_PAGE_SIZE=2)
+    async with create_connected_server_and_client_session(server.server) as client:
+        await create_tasks(client, 5)
+
+        uris = []
+        cursor = None
+        pages = 0
+        while True:
+            result = await client.list_resources(cursor=cursor)
+            uris.extend(str(resource.uri) for resource in result.resources)
+            pages += 1
+            cursor = result.nextCursor
+            if cursor is None:
+                break
+
+        assert pages == 3
+        assert uris == [str(server.task_uri(f"TASK-{number:03d}")) for number in range(1, 6)]
+
+
+async def test_resources_list_rejects_invalid_cursor(load_server):
+    server = load_server()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await create_tasks(client, 1)
+
+        with pytest.raises(Exception, match="Invalid cursor"):
+            await client.list_resources(cursor="not-a-cursor")
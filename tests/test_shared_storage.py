@@ -0,0 +1,182 @@
+"""Two servers in one process sharing a working directory (TASK_STORAGE_MODE=shared); see test_shared_storage_processes for OS processes"""
+
+import threading
+from contextlib import AsyncExitStack
+
+import anyio
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from conftest import call_tool
+
+pytestmark = pytest.mark.anyio
+
+SHARED = {"TASK_STORAGE_MODE": "shared", "TASK_STORAGE_POLL_INTERVAL": 0}
+
+
+async def connect(stack: AsyncExitStack, *servers):
+    return [
+        await stack.enter_async_context(create_connected_server_and_client_session(server.server))
+        for server in servers
+    ]
+
+
+async def test_stale_write_gets_a_conflict_and_the_stored_task(load_server, monkeypatch):
+    first, second = load_server(**SHARED), load_server(**SHARED)
+    async with AsyncExitStack() as stack:
+        first_client, second_client = await connect(stack, first, second)
+        await call_tool(first_client, "create_task", title="Shared", description="Written by both")
+        assert "TASK-001" in await call_tool(second_client, "list_tasks")
+
+        # The first process saves while the second is between its check for changes and its save
+        monkeypatch.setattr(second.storage, "has_external_changes", lambda: False)
+        await call_tool(first_client, "assign_task", task_id="TASK-001", role="coder")
+        refused = await call_tool(second_client, "write_comment", task_id="TASK-001", comment="Stale")
+        assert refused.startswith("❌ Conflict on task TASK-001: it is at version 2, expected 1"), refused
+
+        # The conflict reloaded the stored task, so a retry builds on the first process's change
+        assert second.tasks["TASK-001"].assigned_role == second.RoleType.CODER
+        retried = await call_tool(second_client, "write_comment", task_id="TASK-001", comment="Retried")
+        assert retried.startswith("✅"), retried
+
+    reloaded = load_server(**SHARED).tasks["TASK-001"]
+    assert reloaded.version == 3
+    assert reloaded.assigned_role.value == "coder"
+    assert [comment["comment"] for comment in reloaded.comments] == ["Retried"]
+
+
+async def test_changes_from_both_processes_survive_compaction(load_server):
+    env = dict(SHARED, TASK_JOURNAL_COMPACT_THRESHOLD=3)
+    first, second = load_server(**env), load_server(**env)
+    async with AsyncExitStack() as stack:
+        first_client, second_client = await connect(stack, first, second)
+        created = await call_tool(first_client, "create_task", title="From first", description="One")
+        assert created.startswith("✅ Task TASK-001 created"), created
+        created = await call_tool(second_client, "create_task", title="From second", description="Two")
+        assert created.startswith("✅ Task TASK-002 created"), created
+
+        for round_number in range(4):
+            for client, name in ((first_client, "first"), (second_client, "second")):
+                for task_id in ("TASK-001", "TASK-002"):
+                    text = await call_tool(client, "write_comment", task_id=task_id, comment=f"{name} {round_number}")
+                    assert text.startswith("✅"), text
+
+        # Each process has taken in the other's comments
+        await call_tool(first_client, "list_tasks")
+        await call_tool(second_client, "list_tasks")
+        for task_id in ("TASK-001", "TASK-002"):
+            assert first.tasks[task_id].version == second.tasks[task_id].version == 9
+
+    reloaded = load_server(**env)
+    for task_id in ("TASK-001", "TASK-002"):
+        comments = [comment["comment"] for comment in reloaded.tasks[task_id].comments]
+        assert comments == [f"{name} {number}" for number in range(4) for name in ("first", "second")]
+
+
+async def test_card_fields_reach_the_other_process(load_server, monkeypatch):
+    first, second = load_server(**SHARED), load_server(**SHARED)
+    monkeypatch.setattr(first, "create_trello_card", lambda task: f"card-{task.id}")
+    first.trello_mode = first.TrelloMode.DIRECT_API
+    async with AsyncExitStack() as stack:
+        first_client, second_client = await connect(stack, first, second)
+        await call_tool(first_client, "create_task", title="Carded", description="Gets a card")
+        await call_tool(second_client, "list_tasks")
+
+        await first.trello_outbox.flush(["TASK-001"])
+        task = first.tasks["TASK-001"]
+        assert (task.version, task.sync_revision) == (1, 1)
+
+        # The card write is a new sync revision, so the second process takes it in...
+        await call_tool(second_client, "list_tasks")
+        assert second.tasks["TASK-001"].trello_card_id == "card-TASK-001"
+
+        # ...while the version clients read before the card write still holds, and the
+        # second process's own later change keeps the card
+        text = await call_tool(second_client, "write_comment", task_id="TASK-001", comment="Still carded",
+                               expected_version=1)
+        assert text.startswith("✅"), text
+
+    reloaded = load_server(**SHARED).tasks["TASK-001"]
+    assert reloaded.trello_card_id == "card-TASK-001"
+    assert reloaded.trello_synced_hash is not None
+    assert [comment["comment"] for comment in reloaded.comments] == ["Still carded"]
+
+
+async def test_write_over_unseen_card_fields_gets_a_conflict(load_server, monkeypatch):
+    first, second = load_server(**SHARED), load_server(**SHARED)
+    monkeypatch.setattr(first, "create_trello_card", lambda task: f"card-{task.id}")
+    first.trello_mode = first.TrelloMode.DIRECT_API
+    async with AsyncExitStack() as stack:
+        first_client, second_client = await connect(stack, first, second)
+        await call_tool(first_client, "create_task", title="Carded", description="Gets a card")
+        await call_tool(second_client, "list_tasks")
+
+        # The second process saves before it has taken in the card write
+        monkeypatch.setattr(second.storage, "has_external_changes", lambda: False)
+        await first.trello_outbox.flush(["TASK-001"])
+        refused = await call_tool(second_client, "write_comment", task_id="TASK-001", comment="Stale")
+        assert refused.startswith("❌ Conflict on task TASK-001: another writer saved its Trello card fields"), refused
+
+        retried = await call_tool(second_client, "write_comment", task_id="TASK-001", comment="Retried")
+        assert retried.startswith("✅"), retried
+
+    reloaded = load_server(**SHARED).tasks["TASK-001"]
+    assert (reloaded.version, reloaded.sync_revision) == (2, 1)
+    assert reloaded.trello_card_id == "card-TASK-001"
+    assert [comment["comment"] for comment in reloaded.comments] == ["Retried"]
+
+
+async def test_card_write_keeps_changes_taken_in_while_it_was_in_flight(load_server, monkeypatch):
+    first, second = load_server(**SHARED), load_server(**SHARED)
+    entered, release = threading.Event(), threading.Event()
+
+    def slow_create_card(task):
+        entered.set()
+        release.wait(5)
+        return f"card-{task.id}"
+
+    monkeypatch.setattr(first, "create_trello_card", slow_create_card)
+    first.trello_mode = first.TrelloMode.DIRECT_API
+    async with AsyncExitStack() as stack:
+        first_client, second_client = await connect(stack, first, second)
+        await call_tool(first_client, "create_task", title="Carded", description="Gets a card")
+        await call_tool(second_client, "list_tasks")
+
+        flush = first.asyncio.create_task(first.trello_outbox.flush(["TASK-001"]))
+        while not entered.is_set():
+            await anyio.sleep(0.01)
+        # While the card is created, the second process changes the task and the first takes that in
+        await call_tool(second_client, "assign_task", task_id="TASK-001", role="coder")
+        await call_tool(second_client, "write_comment", task_id="TASK-001", comment="From second")
+        await call_tool(first_client, "list_tasks")
+        release.set()
+        await flush
+
+        task = first.tasks["TASK-001"]
+        assert (task.assigned_role, task.trello_card_id) == (first.RoleType.CODER, "card-TASK-001")
+        # The new card shows the task before the assignment, so it still needs an update
+        assert "TASK-001" in first.trello_outbox.entries
+
+    reloaded = load_server(**SHARED).tasks["TASK-001"]
+    assert (reloaded.version, reloaded.sync_revision) == (3, 1)
+    assert reloaded.assigned_role.value == "coder"
+    assert [comment["comment"] for comment in reloaded.comments] == ["From second"]
+    assert reloaded.trello_card_id == "card-TASK-001"
+
+
+async def test_save_of_a_replaced_task_object_gets_a_conflict(load_server):
+    first, second = load_server(**SHARED), load_server(**SHARED)
+    async with AsyncExitStack() as stack:
+        first_client, second_client = await connect(stack, first, second)
+        await call_tool(first_client, "create_task", title="Shared", description="Replaced in memory")
+        await call_tool(second_client, "list_tasks")
+
+        stale = first.tasks["TASK-001"]
+        await call_tool(second_client, "assign_task", task_id="TASK-001", role="coder")
+        await call_tool(first_client, "list_tasks")
+        assert first.tasks["TASK-001"] is not stale
+
+        # The first process has seen the stored revision, but the copy builds on an older one
+        first.touch_task(stale)
+        with pytest.raises(first.TaskVersionConflict):
+            first.storage.save_changed_tasks([first.storage_copy(stale)])
@@ -0,0 +1,76 @@
+"""Shared storage mode (TASK_STORAGE_MODE=shared) used by separate OS processes"""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from conftest import call_tool
+
+pytestmark = pytest.mark.anyio
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SRC = os.path.join(ROOT, "src")
+SHARED = {"TASK_STORAGE_MODE": "shared", "TASK_STORAGE_POLL_INTERVAL": 0, "TASK_JOURNAL_COMPACT_THRESHOLD": 5}
+
+# Appends comments to TASK-001 through the storage backend, retrying conflicts like a client would
+COMMENT_WORKER = """
+import sys, time
+sys.path.insert(0, sys.argv[1])
+from task_orchectrator_mcp import server
+
+name, count, start_at = sys.argv[2], int(sys.argv[3]), float(sys.argv[4])
+server.load_tasks_locally()
+time.sleep(max(0.0, start_at - time.time()))
+for number in range(count):
+    while True:
+        server.apply_external_changes(server.storage.take_external_changes())
+        task = server.storage_copy(server.tasks["TASK-001"])
+        task.comments.append({"role": "coder", "comment": f"{name} {number}", "timestamp": ""})
+        server.touch_task(task)
+        try:
+            server.storage.save_changed_tasks([task])
+        except server.TaskVersionConflict:
+            continue
+        server.tasks["TASK-001"] = task
+        break
+"""
+
+
+async def test_two_processes_lose_no_comments(load_server, tmp_path):
+    server = load_server(**SHARED)
+    async with create_connected_server_and_client_session(server.server) as client:
+        await call_tool(client, "create_task", title="Hot", description="Commented on by both workers")
+
+    count = 40
+    env = {**os.environ, **{name: str(value) for name, value in SHARED.items()}}
+    # Both workers start appending at the same moment, once their imports are done
+    start_at = str(time.time() + 2)
+    workers = [
+        subprocess.Popen([sys.executable, "-c", COMMENT_WORKER, SRC, name, str(count), start_at],
+                         cwd=tmp_path, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for name in ("first", "second")
+    ]
+    for worker in workers:
+        _, err = worker.communicate(timeout=120)
+        assert worker.returncode == 0, err
+
+    task = load_server(**SHARED).tasks["TASK-001"]
+    comments = [comment["comment"] for comment in task.comments]
+    assert task.version == 1 + 2 * count
+    for name in ("first", "second"):
+        assert [comment for comment in comments if comment.startswith(name)] == [f"{name} {n}" for n in range(count)]
+
+
+def test_shared_storage_stress_benchmark_finds_no_lost_updates(tmp_path):
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "shared_storage.py"),
+         "--processes", "3", "--rounds", "3", "--compact-threshold", "5", "--segment-bytes", "512"],
+        cwd=tmp_path, env={**os.environ, "TMPDIR": str(tmp_path)},
+        capture_output=True, text=True, timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "All 9 tasks, 9 hot task comments and 36 transitions were saved" in result.stderr
@@ -0,0 +1,62 @@
+"""Role transitions are recorded only for changes that were saved"""
+
+import json
+import sqlite3
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from conftest import call_tool
+
+pytestmark = pytest.mark.anyio
+
+
+def bump_stored_version(server, task_id: str):
+    """Change a task behind the server's back, as another process sharing tasks.db would"""
+    with sqlite3.connect(server.TASKS_DB_FILE) as db:
+        db.execute("UPDATE tasks SET version = version + 1 WHERE id = ?", (task_id,))
+
+
+async def test_conflicting_assignment_records_no_transition(load_server):
+    server = load_server(TASK_STORAGE_MODE="sqlite")
+    async with create_connected_server_and_client_session(server.server) as client:
+        await call_tool(client, "create_task", title="Task", description="Contended")
+        bump_stored_version(server, "TASK-001")
+
+        refused = await call_tool(client, "assign_task", task_id="TASK-001", role="coder")
+        assert refused.startswith("❌ Conflict on task TASK-001"), refused
+        assert len(server.transitions) == 0
+        assert server.tasks["TASK-001"].assigned_role is None
+
+        assigned = await call_tool(client, "assign_task", task_id="TASK-001", role="coder")
+        assert assigned == "✅ Task TASK-001 assigned to coder"
+        assert [transition.task_id for transition in server.transitions.latest(10)] == ["TASK-001"]
+
+
+async def test_conflicting_batch_records_no_transitions(load_server):
+    server = load_server(TASK_STORAGE_MODE="sqlite")
+    async with create_connected_server_and_client_session(server.server) as client:
+        for number in (1, 2):
+            await call_tool(client, "create_task", title=f"Task {number}", description="Contended")
+        bump_stored_version(server, "TASK-002")
+
+        refused = await call_tool(client, "assign_tasks", assignments=[
+            {"task_id": "TASK-001", "role": "coder"},
+            {"task_id": "TASK-002", "role": "devops"},
+        ])
+        assert refused.startswith("❌ Conflict on task TASK-002"), refused
+        assert len(server.transitions) == 0
+
+
+async def test_export_writes_the_transition_log_to_the_backup_file(load_server):
+    server = load_server(TASK_STORAGE_MODE="sqlite")
+    async with create_connected_server_and_client_session(server.server) as client:
+        await call_tool(client, "create_task", title="Task", description="Exported")
+        await call_tool(client, "assign_task", task_id="TASK-001", role="coder")
+
+        text = await call_tool(client, "export_tasks")
+        assert text.startswith("✅"), text
+
+    with open(server.TRANSITIONS_FILE, encoding="utf-8") as f:
+        exported = json.load(f)
+    assert [(item["task_id"], item["to_role"]) for item in exported] == [("TASK-001", "coder")]
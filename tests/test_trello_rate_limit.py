@@ -0,0 +1,119 @@
+"""Rate limiting and 429 retries of bulk Trello sync, against the benchmarks' fake Trello server"""
+
+import os
+import sys
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from conftest import call_tool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+from fake_trello import BOARD_ID, FakeTrello  # noqa: E402
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def fake_trello():
+    fake = FakeTrello().start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def connect_trello(load_server, fake_trello):
+    """Return a function that loads a server pointed at the fake Trello with the given settings"""
+
+    def connect(**env):
+        return load_server(
+            TRELLO_API_KEY="key",
+            TRELLO_TOKEN="token",
+            TRELLO_WORKING_BOARD_ID=BOARD_ID,
+            TRELLO_API_BASE_URL=fake_trello.base_url,
+            **env,
+        )
+
+    return connect
+
+
+async def create_tasks(client, count: int):
+    for number in range(1, count + 1):
+        await call_tool(client, "create_task", title=f"Task {number}", description="Needs a card",
+                        create_trello_card=False)
+
+
+async def init_trello(server):
+    await server.trello_executor.run(server.init_trello_client)
+    assert server.trello_mode == server.TrelloMode.DIRECT_API
+
+
+async def test_bulk_sync_retries_throttled_requests(connect_trello, fake_trello):
+    server = connect_trello()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await create_tasks(client, 5)
+        await init_trello(server)
+
+        fake_trello.throttle(3, retry_after="0")
+        text = await call_tool(client, "sync_to_trello", concurrency=2)
+
+        assert "5 created" in text, text
+        assert fake_trello.throttled == 3
+        assert server.trello_client.http_service.throttled == 3
+        # Each throttled request was sent again, not turned into a failure or a duplicate card
+        assert len(fake_trello.cards) == 5
+        assert all(server.tasks[f"TASK-00{number}"].trello_card_id for number in range(1, 6))
+
+
+async def test_retry_waits_for_retry_after(connect_trello, fake_trello):
+    server = connect_trello()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await create_tasks(client, 1)
+        await init_trello(server)
+
+        fake_trello.throttle(1, retry_after="1")
+        sent_before = len(fake_trello.request_times)
+        text = await call_tool(client, "sync_to_trello")
+
+        assert "1 created" in text, text
+        throttled_at, retried_at = fake_trello.request_times[sent_before:sent_before + 2]
+        assert retried_at - throttled_at >= 1.0
+
+
+async def test_bulk_sync_stays_within_rate_limit(connect_trello, fake_trello):
+    capacity, window = 10, 1.0
+    server = connect_trello(TRELLO_RATE_LIMIT_PER_TOKEN=capacity, TRELLO_SYNC_CONCURRENCY=8)
+    server.TRELLO_RATE_LIMIT_WINDOW = window
+    async with create_connected_server_and_client_session(server.server) as client:
+        await create_tasks(client, 30)
+        await init_trello(server)
+
+        sent_before = len(fake_trello.request_times)
+        text = await call_tool(client, "sync_to_trello")
+
+        assert "30 created" in text, text
+        assert len(fake_trello.cards) == 30
+        # A full bucket allows a burst of `capacity` requests; after that the refill rate
+        # bounds every interval, so no window may hold more than twice the capacity and
+        # the requests after the burst take at least one refill interval each
+        times = sorted(fake_trello.request_times)
+        sent = times[sent_before:]
+        for index, started in enumerate(times):
+            in_window = sum(1 for moment in times[index:] if moment - started < window)
+            assert in_window <= 2 * capacity
+        assert sent[-1] - sent[0] >= (len(sent) - capacity) * window / capacity * 0.9
+
+
+async def test_bulk_sync_bounds_requests_in_flight(connect_trello, fake_trello):
+    server = connect_trello()
+    async with create_connected_server_and_client_session(server.server) as client:
+        await create_tasks(client, 12)
+        await init_trello(server)
+
+        fake_trello.latency = 0.02
+        fake_trello.max_in_flight = 0
+        text = await call_tool(client, "sync_to_trello", concurrency=3)
+
+        assert "12 created" in text, text
+        assert 1 < fake_trello.max_in_flight <= 3
@@ -0,0 +1,106 @@
+"""Card writes from the Trello outbox worker and sync_to_trello"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from conftest import call_tool
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeTrello:
+    """Stands in for the Trello API calls, slowly enough for two writers to overlap"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.created = []
+        self.updated = []
+        self._lock = threading.Lock()
+
+    def create_card(self, task):
+        time.sleep(self.delay)
+        with self._lock:
+            self.created.append(task.id)
+            return f"card-{task.id}-{len(self.created)}"
+
+    def update_card(self, task):
+        time.sleep(self.delay)
+        with self._lock:
+            self.updated.append(task.id)
+        return True
+
+
+@pytest.fixture
+def trello_server(load_server, monkeypatch):
+    server = load_server()
+    fake = FakeTrello()
+    monkeypatch.setattr(server, "create_trello_card", fake.create_card)
+    monkeypatch.setattr(server, "update_trello_card", fake.update_card)
+    server.trello_mode = server.TrelloMode.DIRECT_API
+    server.trello_board = object()
+    return server, fake
+
+
+async def test_outbox_and_sync_create_one_card_per_task(trello_server):
+    server, fake = trello_server
+    async with create_connected_server_and_client_session(server.server) as client:
+        for number in range(1, 4):
+            await call_tool(client, "create_task", title=f"Task {number}", description="Needs a card")
+        assert sorted(server.trello_outbox.entries) == ["TASK-001", "TASK-002", "TASK-003"]
+
+        flush = server.asyncio.create_task(server.trello_outbox.flush(list(server.trello_outbox.entries)))
+        text = await call_tool(client, "sync_to_trello")
+        await flush
+
+        assert text.startswith("✅"), text
+        assert sorted(fake.created) == ["TASK-001", "TASK-002", "TASK-003"]
+        assert not server.trello_outbox.entries
+        for task_id in ("TASK-001", "TASK-002", "TASK-003"):
+            assert server.tasks[task_id].trello_card_id.startswith(f"card-{task_id}-")
+
+
+async def test_sync_to_trello_skips_cards_that_are_current(trello_server):
+    server, fake = trello_server
+    async with create_connected_server_and_client_session(server.server) as client:
+        await call_tool(client, "create_task", title="Task", description="Needs a card")
+
+        first = await call_tool(client, "sync_to_trello")
+        second = await call_tool(client, "sync_to_trello")
+
+        assert "1 created" in first
+        assert "1 skipped" in second
+        assert fake.created == ["TASK-001"]
+        assert fake.updated == []
+
+
+async def test_outbox_keeps_entry_until_card_is_saved(load_server, monkeypatch):
+    server = load_server(TASK_STORAGE_MODE="sqlite")
+    fake = FakeTrello(delay=0)
+    monkeypatch.setattr(server, "create_trello_card", fake.create_card)
+    monkeypatch.setattr(server, "update_trello_card", fake.update_card)
+    server.trello_mode = server.TrelloMode.DIRECT_API
+    async with create_connected_server_and_client_session(server.server) as client:
+        await call_tool(client, "create_task", title="Task", description="Needs a card")
+
+    # Another writer changes the task while its card is being created
+    with sqlite3.connect(server.TASKS_DB_FILE) as db:
+        db.execute("UPDATE tasks SET description = 'Changed elsewhere', version = version + 1 WHERE id = 'TASK-001'")
+
+    await server.trello_outbox.flush(["TASK-001"])
+    assert "TASK-001" in server.trello_outbox.entries
+    task = server.tasks["TASK-001"]
+    assert task.description == "Changed elsewhere"
+    assert task.trello_card_id == "card-TASK-001-1"
+
+    server.trello_outbox.entries["TASK-001"]["next_attempt_at"] = 0.0
+    await server.trello_outbox.flush(["TASK-001"])
+    assert not server.trello_outbox.entries
+    assert fake.created == ["TASK-001"]
+    assert fake.updated == ["TASK-001"]
+    with sqlite3.connect(server.TASKS_DB_FILE) as db:
+        stored = db.execute("SELECT description, trello_card_id FROM tasks WHERE id = 'TASK-001'").fetchone()
+    assert stored == ("Changed elsewhere", "card-TASK-001-1")